@@ -0,0 +1,188 @@
+"""benchmarks/analytics.py
+The columnar NumPy analytics against the same aggregations in SQL.
+
+    python benchmarks/analytics.py --size 1000000
+    python benchmarks/analytics.py --size 100000 --output results/analytics.json
+
+Times building the snapshot, an incremental refresh after new sessions, and
+each report over the full history and over the last 90 days, NumPy and SQL
+side by side. The two results are compared and any difference is fatal.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import timedelta
+
+from apologies_for_being_human import columnar, db
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from datagen import END
+from run import measure, prepare_db
+
+WEEKDAY = "(CAST(strftime('%w', {}) AS INTEGER) + 6) % 7"  # Monday is 0
+LENGTH_BUCKET = (
+    "CASE WHEN duration < 15 THEN 0 WHEN duration < 30 THEN 1 "
+    "WHEN duration < 60 THEN 2 WHEN duration < 90 THEN 3 ELSE 4 END"
+)
+
+
+def _grouped(conn, sql, params, size):
+    values = [0.0] * size
+    for key, value in conn.execute(sql, params):
+        values[key] = value
+    return values
+
+
+def sql_session_report(conn, since=None):
+    where, params = ("WHERE start_date >= ?", (since,)) if since else ("", ())
+    by_hour = _grouped(
+        conn,
+        "SELECT CAST(substr(start_time, 12, 2) AS INTEGER), total(duration) "
+        f"FROM tasks {where} GROUP BY 1",
+        params,
+        24,
+    )
+    by_weekday = _grouped(
+        conn,
+        f"SELECT {WEEKDAY.format('start_time')}, total(duration) "
+        f"FROM tasks {where} GROUP BY 1",
+        params,
+        7,
+    )
+    lengths = {
+        bucket: (sessions, distractions)
+        for bucket, sessions, distractions in conn.execute(
+            f"SELECT {LENGTH_BUCKET}, count(*), total(distractions) "
+            f"FROM tasks {where} GROUP BY 1",
+            params,
+        )
+    }
+    by_task_year = {}
+    for name, year, minutes in conn.execute(
+        "SELECT n.task_name, substr(t.start_time, 1, 4), total(t.duration) "
+        "FROM tasks t JOIN task_names n ON n.task_name_id = t.task_name_id "
+        f"{where.replace('start_date', 't.start_date')} GROUP BY 1, 2",
+        params,
+    ):
+        by_task_year.setdefault(name, {})[year] = minutes
+    return by_hour, by_weekday, lengths, by_task_year
+
+
+def sql_checkin_report(conn, since=None):
+    where, params = ("WHERE checkin_date >= ?", (since,)) if since else ("", ())
+    by_weekday = {
+        day: completed / total
+        for day, total, completed in conn.execute(
+            f"SELECT {WEEKDAY.format('checkin_time')}, count(*), total(success) "
+            f"FROM checkin_records {where} GROUP BY 1",
+            params,
+        )
+    }
+    by_task = {
+        name: completed / total
+        for name, total, completed in conn.execute(
+            "SELECT ct.checkin_task_name, count(*), total(cr.success) "
+            "FROM checkin_records cr JOIN checkin_tasks ct "
+            "ON ct.checkin_task_id = cr.checkin_task_id "
+            f"{where.replace('checkin_date', 'cr.checkin_date')} GROUP BY 1",
+            params,
+        )
+    }
+    return by_weekday, by_task
+
+
+def _close(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=0.01)
+
+
+def check(snapshot, conn, since):
+    """Fail loudly if NumPy and SQL disagree."""
+    focus = columnar.session_report(snapshot, since=since)
+    by_hour, by_weekday, lengths, by_task_year = sql_session_report(conn, since)
+    assert all(map(_close, focus["minutes_by_hour"], by_hour)), "minutes by hour"
+    assert all(map(_close, focus["minutes_by_weekday"], by_weekday)), "by weekday"
+    for bucket, row in enumerate(focus["distractions_by_length"]):
+        sessions, distractions = lengths.get(bucket, (0, 0))
+        assert row["sessions"] == sessions, f"sessions of length {row['length']}"
+        if sessions:
+            assert _close(
+                row["distractions_per_session"], round(distractions / sessions, 3)
+            ), f"distractions of length {row['length']}"
+    assert focus["minutes_by_task_year"].keys() == by_task_year.keys(), "tasks"
+    for name, years in by_task_year.items():
+        ours = focus["minutes_by_task_year"][name]
+        assert ours.keys() == years.keys(), f"years of {name}"
+        assert all(_close(ours[y], years[y]) for y in years), f"minutes of {name}"
+
+    checkins = columnar.checkin_report(snapshot, since=since)
+    by_weekday, by_task = sql_checkin_report(conn, since)
+    for day, rate in by_weekday.items():
+        assert _close(checkins["success_rate_by_weekday"][day], round(rate, 4))
+    assert checkins["success_rate_by_task"].keys() == by_task.keys()
+    for name, rate in by_task.items():
+        assert _close(checkins["success_rate_by_task"][name], round(rate, 4))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar analytics.")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--budget", type=float, default=2.0, help="seconds spent per benchmark"
+    )
+    parser.add_argument("--new-sessions", type=int, default=1000)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    prepare_db(args.size, args.seed)
+    conn = db.connect_db()
+    results = {}
+
+    _, results["snapshot build"] = timed(lambda: columnar.refresh(conn, rebuild=True))
+    _, results["refresh, nothing new"] = timed(lambda: columnar.refresh(conn))
+    start = END - timedelta(days=1)
+    for i in range(args.new_sessions):
+        begin = start + timedelta(minutes=i)
+        db.log_task("benchmark", begin, begin + timedelta(seconds=50), i % 3)
+    _, results[f"refresh, {args.new_sessions} new sessions"] = timed(
+        lambda: columnar.refresh(conn)
+    )
+    snapshot = columnar.load(conn, refresh_first=False)
+
+    recent = (END - timedelta(days=90)).date().isoformat()
+    for label, since in (("all history", None), ("last 90 days", recent)):
+        check(snapshot, conn, since)
+        for name, func in (
+            ("numpy", lambda s=since: columnar.report(snapshot, since=s)),
+            (
+                "sql",
+                lambda s=since: (
+                    sql_session_report(conn, s),
+                    sql_checkin_report(conn, s),
+                ),
+            ),
+        ):
+            stats = measure(func, budget=args.budget, min_runs=3)
+            results[f"report, {label}, {name}"] = stats["median_ms"]
+
+    print(f"{len(snapshot)} sessions; NumPy and SQL results agree")
+    for name, ms in results.items():
+        print(f"  {name:<40} {ms:10.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"size": args.size, "results_ms": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""benchmarks/datagen.py
+Seeded synthetic data for benchmarks.
+
+Fills tasks and checkin_records with `size` rows each and checkin_tasks with
+one task per thousand rows (at least eight), spread over several years of
+history. The same size and seed always produce the same database.
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from apologies_for_being_human import db
+from apologies_for_being_human.connection import transaction
+
+END = datetime(2025, 1, 1)
+TASK_NAMES = 200
+BATCH = 50_000
+
+
+def _task_names(rng):
+    topics = ["thesis", "report", "email", "reading", "code", "review", "study"]
+    return [f"{rng.choice(topics)} {i:03d}" for i in range(TASK_NAMES)]
+
+
+def _sessions(rng, size, names, weights):
+    span_minutes = max(size * 60, 3 * 365 * 24 * 60)
+    for _ in range(size):
+        start = END - timedelta(minutes=rng.randrange(span_minutes))
+        length = rng.choice((15, 25, 25, 25, 45, 50, 90))
+        end = start + timedelta(minutes=length, seconds=rng.randrange(60))
+        yield (
+            rng.choices(names, weights)[0],
+            start.isoformat(),
+            end.isoformat(),
+            round((end - start).total_seconds() / 60, 2),
+            rng.randrange(7),
+        )
+
+
+def _checkins(rng, size, task_ids):
+    span_minutes = max(size * 60, 3 * 365 * 24 * 60)
+    for i in range(size):
+        checkin_time = END - timedelta(minutes=rng.randrange(span_minutes))
+        yield (
+            rng.choice(task_ids),
+            checkin_time.isoformat(),
+            rng.random() < 0.7,
+            "" if rng.random() < 0.8 else f"note {i}",
+        )
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(path, size, seed=0):
+    """Create a benchmark database at `path` (replacing any existing one)."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    db.DB_FILE = path
+    db.init_db()
+    conn = db.connect_db()
+
+    names = _task_names(rng)
+    weights = [1 / (rank + 1) for rank in range(len(names))]  # a few tasks dominate
+    with transaction(conn):
+        ids = db.resolve_task_names(conn, names)
+    for batch in _batched(_sessions(rng, size, names, weights)):
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO tasks (task_name_id, start_time, end_time, duration, "
+                "distractions) VALUES (?, ?, ?, ?, ?)",
+                [(ids[row[0]], *row[1:]) for row in batch],
+            )
+
+    checkin_task_count = max(8, size // 1000)
+    with transaction(conn):
+        for i in range(checkin_task_count):
+            db.create_checkin_task(f"habit {i:04d}", f"synthetic habit {i}")
+    task_ids = [row[0] for row in db.get_checkin_tasks()]
+    for batch in _batched(_checkins(rng, size, task_ids)):
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, "
+                "note) VALUES (?, ?, ?, ?)",
+                batch,
+            )
+
+    db.rebuild_rollups()
+    db.refresh_checkin_stats()
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.path, args.size, args.seed)
+    print(f"Wrote {args.size} sessions and check-ins to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
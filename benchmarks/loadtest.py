@@ -0,0 +1,160 @@
+"""benchmarks/loadtest.py
+Load test for the local HTTP API.
+
+    python benchmarks/loadtest.py --size 100000 --clients 50 --seconds 10
+    python benchmarks/loadtest.py --url http://127.0.0.1:8765 --etag
+
+Without --url a server is started in-process on a generated benchmark
+database. Each client keeps one keep-alive connection and cycles through the
+endpoints. --etag makes clients send If-None-Match, --writer commits a
+session every 100 ms in the background to show readers are not blocked.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+PATHS = (
+    "/api/stats",
+    "/api/sessions?limit=50",
+    "/api/checkin-tasks",
+    "/api/checkin-records?limit=50",
+    "/api/health",
+)
+
+
+async def _request(reader, writer, host, path, etag=None):
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length, tag = 0, None
+    for line in head.decode("latin-1").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "etag":
+            tag = value.strip()
+    if length:
+        await reader.readexactly(length)
+    return status, tag
+
+
+async def client(host, port, deadline, use_etag, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = PATHS[i % len(PATHS)]
+            i += 1
+            start = time.perf_counter()
+            status, tag = await _request(
+                reader, writer, host, path, etags.get(path) if use_etag else None
+            )
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if tag:
+                etags[path] = tag
+    finally:
+        writer.close()
+
+
+def writer_thread(stop, path):
+    from apologies_for_being_human import db
+
+    db.DB_FILE = path
+    start = datetime(2030, 1, 1)
+    n = 0
+    while not stop.wait(0.1):
+        begin = start + timedelta(minutes=30 * n)
+        db.log_task("loadtest", begin, begin + timedelta(minutes=25), 0)
+        n += 1
+    db.connect_db().execute(
+        "DELETE FROM tasks WHERE task_name_id = "
+        "(SELECT task_name_id FROM task_names WHERE task_name = 'loadtest')"
+    )
+    db.rebuild_rollups()
+
+
+async def run(args):
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from run import prepare_db
+
+        from apologies_for_being_human import db
+        from apologies_for_being_human.server import ApiServer
+
+        print(f"preparing {args.size} rows ...", flush=True)
+        prepare_db(args.size, args.seed)
+        db.init_db()
+        server = await ApiServer(port=0, workers=args.workers).start()
+        host, port = "127.0.0.1", server.port
+
+    stop = threading.Event()
+    writer = None
+    if args.writer:
+        from apologies_for_being_human import db
+
+        writer = threading.Thread(target=writer_thread, args=(stop, db.DB_FILE))
+        writer.start()
+
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                client(host, port, deadline, args.etag, latencies, statuses)
+                for _ in range(args.clients)
+            )
+        )
+    finally:
+        stop.set()
+        if writer is not None:
+            writer.join()
+        if server is not None:
+            server.close()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    print(f"{len(ms)} requests in {elapsed:.1f}s: {len(ms) / elapsed:.0f} req/s")
+    print(
+        f"latency ms: median {statistics.median(ms):.2f}  "
+        f"p95 {ms[int(len(ms) * 0.95)]:.2f}  p99 {ms[int(len(ms) * 0.99)]:.2f}  "
+        f"max {ms[-1]:.2f}"
+    )
+    print("statuses:", dict(sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="test a running server instead")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--etag", action="store_true", help="send If-None-Match")
+    parser.add_argument("--writer", action="store_true", help="write concurrently")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""benchmarks/run.py
+Benchmarks for the DB and UI hot paths.
+
+    python benchmarks/run.py --sizes 10000 100000 1000000
+    python benchmarks/run.py --sizes 10000 --compare benchmarks/results/old.json
+
+Databases are generated once per size and seed under benchmarks/.data and
+reused. Results are written as JSON (one record per benchmark and size) so
+runs can be diffed with --compare.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from rich.console import Console
+
+from apologies_for_being_human import core, db, query_cache
+from apologies_for_being_human.statistics import get_checkin_task_statistics
+from apologies_for_being_human.timer import SessionTimer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, ".data")
+RESULTS_DIR = os.path.join(HERE, "results")
+
+sys.path.insert(0, HERE)
+from datagen import END, generate
+
+
+def measure(func, budget=0.5, min_runs=3, max_runs=1000):
+    """Call `func` repeatedly within `budget` seconds; return timing stats in ms."""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_runs and (
+        len(samples) < min_runs or time.perf_counter() < deadline
+    ):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def prepare_db(size, seed):
+    path = os.path.join(DATA_DIR, f"bench-{size}-{seed}.db")
+    reuse = False
+    if os.path.exists(path):
+        with sqlite3.connect(path) as conn:
+            reuse = conn.execute("PRAGMA user_version").fetchone()[0] == (
+                db.SCHEMA_VERSION
+            )
+    if not reuse:
+        print(f"  generating {size} rows ...", flush=True)
+        generate(path, size, seed)
+    db.DB_FILE = path
+    return path
+
+
+def db_benchmarks():
+    task_name = db.get_logs(1)[0][0]
+    day = db.get_logs(1)[0][1][:10]
+    checkin_task_id = db.get_checkin_tasks()[0][0]
+    deep_cursor = (END.isoformat(), 0)
+    middle = db.get_sessions_by_date(day)
+    if middle:
+        deep_cursor = (middle[0][1], 1 << 62)
+    return {
+        "init_db (existing)": db.init_db,
+        "get_logs(20)": lambda: db.get_logs(20),
+        "get_all_sessions": db.get_all_sessions,
+        "get_sessions_by_date": lambda: db.get_sessions_by_date(day),
+        "get_sessions_by_task": lambda: db.get_sessions_by_task(task_name),
+        "get_distinct_tasks": db.get_distinct_tasks,
+        "get_checkin_tasks": db.get_checkin_tasks,
+        "get_checkin_records (all)": db.get_checkin_records,
+        "get_checkin_records (task)": lambda: db.get_checkin_records(checkin_task_id),
+        "get_checkin_records (date)": lambda: db.get_checkin_records(date=day),
+        "get_session_page (first)": lambda: db.get_session_page(page_size=10),
+        "get_session_page (deep)": lambda: db.get_session_page(
+            deep_cursor, page_size=10
+        ),
+        "get_checkin_record_page (first)": lambda: db.get_checkin_record_page(),
+        "get_checkin_task_statistics": get_checkin_task_statistics,
+    }
+
+
+def uncached(func):
+    """Time the query itself: cached results are dropped before every call."""
+
+    def call():
+        query_cache.clear()
+        return func()
+
+    return call
+
+
+def ui_benchmarks():
+    console = Console(file=io.StringIO(), width=120, force_terminal=True)
+    page = db.get_session_page(page_size=core.PAGE_SIZE).rows
+
+    def render_view_log_page():
+        console.file.seek(0)
+        console.file.truncate()
+        console.print(core._session_table(page))
+
+    return {"view_log page render": render_view_log_page}
+
+
+def tick_benchmark(ticks=2000):
+    """Per-frame cost of the focus session loop, driven by a fake clock."""
+    console = Console(file=io.StringIO(), width=120, force_terminal=True)
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    duration = float(ticks)
+    timer = SessionTimer(
+        duration,
+        core.reminder_timings(duration),
+        refresh_hz=1,
+        clock=lambda: now[0],
+        sleep=sleep,
+    )
+    with core.make_focus_progress(console) as progress:
+        task = progress.add_task("Focusing...", total=duration)
+        start = time.perf_counter()
+        for tick in timer.ticks():
+            progress.update(task, completed=tick.elapsed)
+            progress.refresh()
+        elapsed = time.perf_counter() - start
+    frames = ticks + 1
+    return {"runs": frames, "mean_ms": elapsed * 1000 / frames}
+
+
+def run(sizes, seed, budget):
+    results = []
+    for size in sizes:
+        print(f"size {size}", flush=True)
+        prepare_db(size, seed)
+        benchmarks = {
+            **{name: uncached(func) for name, func in db_benchmarks().items()},
+            **ui_benchmarks(),
+        }
+        for name, func in benchmarks.items():
+            stats = measure(func, budget=budget)
+            results.append({"benchmark": name, "size": size, **stats})
+            print(f"  {name:<36} {stats['median_ms']:10.3f} ms", flush=True)
+        stats = tick_benchmark()
+        results.append({"benchmark": "focus session tick", "size": size, **stats})
+        print(f"  {'focus session tick':<36} {stats['mean_ms']:10.3f} ms", flush=True)
+        unindexed = db.find_unindexed_queries()
+        if unindexed:
+            print(f"  WARNING: queries not served by an index: {sorted(unindexed)}")
+        results.append(
+            {
+                "benchmark": "unindexed hot queries",
+                "size": size,
+                "count": len(unindexed),
+            }
+        )
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["benchmark"], result["size"]))
+        key = "median_ms" if "median_ms" in result else "mean_ms"
+        if not old or key not in result or not old.get(key):
+            continue
+        ratio = result[key] / old[key]
+        flag = "  SLOWER" if ratio > 1.2 else ""
+        print(
+            f"  {result['benchmark']:<36} {result['size']:>8}  "
+            f"{old[key]:10.3f} -> {result[key]:10.3f} ms  x{ratio:.2f}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--budget", type=float, default=0.5, help="seconds spent per benchmark"
+    )
+    parser.add_argument("--output", help="result file (default: results/<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    results = run(args.sizes, args.seed, args.budget)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "created": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""benchmarks/startup.py
+Cold-start measurement: import time and time to first menu.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --exe dist/apologies_for_being_human.exe
+
+Each run starts a fresh process. "import" times importing the main menu
+module; "first menu" times from process start until the main menu panel has
+been written to stdout. With --exe the PyInstaller --onefile build from
+package.cmd is measured instead of the source tree.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MENU_MARKER = b"Apologies for Being Human"
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "import apologies_for_being_human.main_menu; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def time_import(env):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def time_first_menu(command, cwd, env):
+    """Milliseconds from spawn until the menu panel appears on stdout."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    seen = b""
+    try:
+        while MENU_MARKER not in seen:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("program exited before showing the menu")
+            seen += chunk
+        return (time.perf_counter() - start) * 1000
+    finally:
+        process.kill()
+        process.wait()
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--exe", help="measure a built executable instead")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    command = (
+        [args.exe] if args.exe else [sys.executable, "-m", "apologies_for_being_human"]
+    )
+    results = {}
+    # Point APOLOGIES_DB into a scratch directory so the real database is
+    # never touched; the first launch creates it and the timed ones reuse it,
+    # like a normal second launch.
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(os.environ, APOLOGIES_DB=os.path.join(cwd, "startup.db"))
+        time_first_menu(command, cwd, env)
+        if not args.exe:
+            results["import"] = summarize([time_import(env) for _ in range(args.runs)])
+        results["first menu"] = summarize(
+            [time_first_menu(command, cwd, env) for _ in range(args.runs)]
+        )
+
+    for name, stats in results.items():
+        print(
+            f"{name:<12} median {stats['median_ms']:8.1f} ms  min {stats['min_ms']:8.1f} ms"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
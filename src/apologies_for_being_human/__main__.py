@@ -1,7 +1,18 @@
-from apologies_for_being_human.main_menu import main_menu
+import sys
+
 
 def main():
+    # Imported here so `python -m` and the console script share one lazy path;
+    # subcommands skip the Rich menu entirely.
+    if len(sys.argv) > 1:
+        from apologies_for_being_human.cli import main as cli_main
+
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from apologies_for_being_human.main_menu import main_menu
+
     main_menu()
-    
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,189 @@
+"""assistant/analytics.py
+Focus analytics over the daily/weekly rollup tables: trends, rolling
+averages and a calendar heatmap.
+"""
+
+from datetime import date, timedelta
+
+from rich.console import Group
+from rich.panel import Panel
+from rich.prompt import IntPrompt
+from rich.table import Table
+from rich.text import Text
+
+from apologies_for_being_human.db import connect_db, get_distinct_tasks
+from apologies_for_being_human.task_index import ask_task_name
+
+MAX_DAYS = 100 * 366  # anything longer predates every possible session
+HEAT_STYLES = ("grey30", "green4", "green3", "green1", "bold bright_green")
+WEEKDAY_LABELS = ("Mon", "", "Wed", "", "Fri", "", "Sun")
+
+
+def get_daily_focus(start, end, task_name=None):
+    """Map ISO day -> (minutes, sessions, distractions) for start..end inclusive."""
+    sql = (
+        "SELECT day, SUM(minutes), SUM(sessions), SUM(distractions) FROM focus_daily "
+        "WHERE day BETWEEN ? AND ?"
+    )
+    params = [start.isoformat(), end.isoformat()]
+    if task_name is not None:
+        sql += " AND task_name = ?"
+        params.append(task_name)
+    sql += " GROUP BY day"
+    return {row[0]: row[1:] for row in connect_db().execute(sql, params)}
+
+
+def get_weekly_focus(start, end, task_name=None):
+    """Return (week_start, minutes, sessions, distractions) rows, oldest first."""
+    sql = (
+        "SELECT week_start, SUM(minutes), SUM(sessions), SUM(distractions) "
+        "FROM focus_weekly WHERE week_start BETWEEN ? AND ?"
+    )
+    params = [start.isoformat(), end.isoformat()]
+    if task_name is not None:
+        sql += " AND task_name = ?"
+        params.append(task_name)
+    sql += " GROUP BY week_start ORDER BY week_start"
+    return connect_db().execute(sql, params).fetchall()
+
+
+def rolling_average(values, window):
+    """Trailing mean over `window` items; shorter windows at the start."""
+    averages, total = [], 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        averages.append(total / min(i + 1, window))
+    return averages
+
+
+def _heat_level(minutes, thresholds):
+    if not minutes:
+        return 0
+    for level, threshold in enumerate(thresholds, start=1):
+        if minutes <= threshold:
+            return level
+    return len(thresholds)
+
+
+def render_heatmap(daily, start, end):
+    """Calendar heatmap, one column per week and one row per weekday."""
+    first_monday = start - timedelta(days=start.weekday())
+    weeks = (end - first_monday).days // 7 + 1
+    values = sorted(m for m, _, _ in daily.values() if m)
+    # Quartiles of active days, so one marathon day does not wash out the rest.
+    thresholds = (
+        [values[min(len(values) - 1, len(values) * q // 4)] for q in (1, 2, 3, 4)]
+        if values
+        else [0, 0, 0, 0]
+    )
+
+    months = Text("    ")
+    last_month, column = None, 0
+    for week in range(weeks):
+        monday = first_monday + timedelta(weeks=week)
+        if monday.month != last_month and week >= column:
+            label = monday.strftime("%b")
+            months.append(label)
+            column = week + len(label) + 1
+            last_month = monday.month
+        elif week >= column:
+            months.append(" ")
+            column = week + 1
+
+    lines = [months]
+    for weekday in range(7):
+        line = Text()
+        line.append(f"{WEEKDAY_LABELS[weekday]:<4}", style="dim")
+        for week in range(weeks):
+            day = first_monday + timedelta(weeks=week, days=weekday)
+            if day < start or day > end:
+                line.append(" ")
+                continue
+            minutes = daily.get(day.isoformat(), (0, 0, 0))[0]
+            line.append("■", style=HEAT_STYLES[_heat_level(minutes, thresholds)])
+        lines.append(line)
+
+    legend = Text()
+    legend.append("    less ", style="dim")
+    for style in HEAT_STYLES:
+        legend.append("■", style=style)
+    legend.append(" more", style="dim")
+    lines.append(legend)
+    return Group(*lines)
+
+
+def display_focus_analytics(console):
+    tasks = get_distinct_tasks()
+    if len(tasks) <= 30:
+        console.print(f"[dim]Tasks: {', '.join(tasks)}[/dim]")
+    task_name = ask_task_name(
+        console,
+        "Task to analyse (Enter for all tasks, Tab completes)",
+        existing_only=True,
+        allow_empty=True,
+    )
+    while True:
+        days = IntPrompt.ask("How many days back?", default=365, console=console)
+        if 1 <= days <= MAX_DAYS:
+            break
+        console.print(f"[red]Please enter a number from 1 to {MAX_DAYS}.[/red]")
+
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    daily = get_daily_focus(start, end, task_name)
+    series = [
+        daily.get((start + timedelta(days=i)).isoformat(), (0, 0, 0))[0] or 0
+        for i in range(days)
+    ]
+    week_avg = rolling_average(series, 7)
+    month_avg = rolling_average(series, 28)
+    total_minutes = sum(series)
+    sessions = sum(row[1] for row in daily.values())
+    distractions = sum(row[2] for row in daily.values())
+    active_days = sum(1 for value in series if value)
+
+    title = f"Focus over the last {days} days" + (
+        f" — {task_name}" if task_name else ""
+    )
+    console.print(Panel(render_heatmap(daily, start, end), title=title))
+
+    best_day = max(daily.items(), key=lambda item: item[1][0] or 0, default=None)
+    summary = Table.grid(padding=(0, 2))
+    summary.add_row("Total focus", f"{total_minutes / 60:.1f} h in {sessions} sessions")
+    summary.add_row(
+        "Active days", f"{active_days} of {days} ({active_days * 100 / days:.0f}%)"
+    )
+    summary.add_row(
+        "Distractions",
+        f"{distractions} ({distractions / sessions:.2f} per session)"
+        if sessions
+        else "0",
+    )
+    summary.add_row("7-day average", f"{week_avg[-1]:.1f} min/day")
+    summary.add_row("28-day average", f"{month_avg[-1]:.1f} min/day")
+    if best_day:
+        summary.add_row("Best day", f"{best_day[0]} ({best_day[1][0]:.0f} min)")
+    console.print(summary)
+
+    weekly = get_weekly_focus(end - timedelta(weeks=12), end, task_name)
+    table = Table(title="Last 12 weeks", title_style="bold green")
+    table.add_column("Week")
+    table.add_column("Minutes", justify="right")
+    table.add_column("4-week avg", justify="right")
+    table.add_column("Sessions", justify="right")
+    table.add_column("Distractions", justify="right")
+    averages = rolling_average([row[1] for row in weekly], 4)
+    for (week_start, minutes, count, week_distractions), average in zip(
+        weekly, averages
+    ):
+        year, week, _ = date.fromisoformat(week_start).isocalendar()
+        table.add_row(
+            f"{year}-W{week:02d}",
+            f"{minutes:.0f}",
+            f"{average:.0f}",
+            str(count),
+            str(week_distractions),
+        )
+    console.print(table)
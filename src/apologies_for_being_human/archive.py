@@ -0,0 +1,390 @@
+"""assistant/archive.py
+Cold-data archival: sessions and check-ins older than a retention window move
+out of the hot tables into one gzipped JSONL segment per kind and month.
+
+Segments live in `<database name>-archive/` next to the database and use the
+export columns, so any segment can also be fed to `import`. The
+archive_segments table is the manifest: one row per segment with its file
+and the min/max date and id it holds. Readers consult the manifest first and
+open only the segments a date range or cursor can reach. Segment files are
+never modified in place; re-archiving a month writes a new file and swaps
+the manifest row, so decoded segments can be cached by file name.
+
+The focus rollups and check-in summaries stay in the database and keep
+counting archived rows. Archived check-in notes leave the full-text index.
+A row synced in from another device keeps its `origin` in the segment, so
+sync never pushes it back out.
+"""
+
+import bisect
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from apologies_for_being_human.connection import transaction
+
+DEFAULT_RETENTION_DAYS = 365
+SEGMENT_CACHE_SIZE = 32  # decoded month segments kept in memory
+
+KINDS = ("sessions", "checkins")
+COLUMNS = {
+    "sessions": (
+        "task_id",
+        "task_name",
+        "start_time",
+        "end_time",
+        "duration",
+        "distractions",
+    ),
+    "checkins": (
+        "checkin_record_id",
+        "checkin_task_id",
+        "checkin_task_name",
+        "checkin_time",
+        "success",
+        "note",
+    ),
+}
+# Hot rows in segment column order and their origin, plus what identifies and
+# dates them.
+_HOT = {
+    "sessions": {
+        "select": (
+            "SELECT t.task_id, n.task_name, t.start_time, t.end_time, t.duration, "
+            "t.distractions, t.origin FROM tasks t "
+            "JOIN task_names n ON n.task_name_id = t.task_name_id "
+            "WHERE t.start_date >= ? AND t.start_date < ? "
+            "ORDER BY t.start_time, t.task_id"
+        ),
+        "months": (
+            "SELECT DISTINCT substr(start_date, 1, 7) FROM tasks WHERE start_date < ?"
+        ),
+        "delete": "DELETE FROM tasks WHERE start_date >= ? AND start_date < ?",
+    },
+    "checkins": {
+        "select": (
+            "SELECT cr.checkin_record_id, cr.checkin_task_id, ct.checkin_task_name, "
+            "cr.checkin_time, cr.success, cr.note, cr.origin FROM checkin_records cr "
+            "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
+            "WHERE cr.checkin_date >= ? AND cr.checkin_date < ? "
+            "ORDER BY cr.checkin_time, cr.checkin_record_id"
+        ),
+        "months": (
+            "SELECT DISTINCT substr(checkin_date, 1, 7) FROM checkin_records "
+            "WHERE checkin_date < ?"
+        ),
+        "delete": (
+            "DELETE FROM checkin_records WHERE checkin_date >= ? AND checkin_date < ?"
+        ),
+    },
+}
+TIME_COLUMN = {"sessions": 2, "checkins": 3}
+TASK_COLUMN = {"sessions": 1, "checkins": 2}  # the task name
+
+
+def _sort_key(kind):
+    time_column = TIME_COLUMN[kind]
+    return lambda row: (row[time_column], row[0])
+
+
+def archive_dir(conn):
+    """The segment directory of the database `conn` is connected to."""
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.splitext(path)[0] + "-archive"
+
+
+def find_segments(conn, kind, start=None, end=None):
+    """[(month, path)] of segments holding dates in [start, end], oldest first."""
+    rows = conn.execute(
+        "SELECT month, file FROM archive_segments "
+        "WHERE kind = ? AND max_date >= ? AND min_date <= ? ORDER BY month",
+        (kind, start or "", end or "9999"),
+    ).fetchall()
+    if not rows:
+        return []
+    directory = archive_dir(conn)
+    return [(month, os.path.join(directory, file)) for month, file in rows]
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def load_segment(path):
+    """All rows of a segment as tuples in segment column order, sorted by
+    (time, id). Files never change, so the result is cached by path."""
+    kind = os.path.basename(path).split("-", 1)[0]
+    columns = COLUMNS[kind]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        text = f.read().rstrip("\n")
+    # One parse of the whole file; json.dumps escapes newlines inside values.
+    records = json.loads(f"[{text.replace(chr(10), ',')}]")
+    rows = [tuple(record[column] for column in columns) for record in records]
+    if kind == "checkins":
+        rows = [row[:4] + (int(row[4]),) + row[5:] for row in rows]
+    return tuple(rows)
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def segment_origins(path):
+    """{id: origin device} of the rows of a segment that were synced in."""
+    id_column = COLUMNS[os.path.basename(path).split("-", 1)[0]][0]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if '"origin"' in line]
+    return {
+        record[id_column]: record["origin"] for record in records if "origin" in record
+    }
+
+
+def _matches(kind, row, task=None, day=None, checkin_task_id=None):
+    if task is not None and row[TASK_COLUMN[kind]] != task:
+        return False
+    if day is not None and row[TIME_COLUMN[kind]][:10] != day:
+        return False
+    return checkin_task_id is None or row[1] == checkin_task_id
+
+
+def page_rows(
+    conn,
+    kind,
+    cursor,
+    descending,
+    limit,
+    bound=None,
+    task=None,
+    day=None,
+    checkin_task_id=None,
+):
+    """Up to `limit` archived rows strictly after `cursor` in (time, id)
+    order, in segment column order. Rows at or past `bound`, the last key a
+    page already has, are not needed and not read.
+
+    Segments are visited outward from the cursor and each is entered with a
+    binary search, so a page costs the same at any depth.
+    """
+    start = end = day
+    if descending:
+        if cursor is not None:
+            end = min(end or "9999", cursor[0][:10])
+        if bound is not None:
+            start = max(start or "", bound[0][:10])
+    else:
+        if cursor is not None:
+            start = max(start or "", cursor[0][:10])
+        if bound is not None:
+            end = min(end or "9999", bound[0][:10])
+    if start and end and start > end:
+        return []
+    segments = find_segments(conn, kind, start, end)
+    if descending:
+        segments.reverse()
+    key = _sort_key(kind)
+    found = []
+    for _, path in segments:
+        rows = load_segment(path)
+        if descending:
+            stop = (
+                len(rows)
+                if cursor is None
+                else bisect.bisect_left(rows, tuple(cursor), key=key)
+            )
+            candidates = (rows[i] for i in range(stop - 1, -1, -1))
+        else:
+            begin = (
+                0
+                if cursor is None
+                else bisect.bisect_right(rows, tuple(cursor), key=key)
+            )
+            candidates = (rows[i] for i in range(begin, len(rows)))
+        for row in candidates:
+            if bound is not None and (
+                key(row) <= tuple(bound) if descending else key(row) >= tuple(bound)
+            ):
+                break
+            if _matches(kind, row, task, day, checkin_task_id):
+                found.append(row)
+                if len(found) >= limit:
+                    return found
+    return found
+
+
+def iter_archived(
+    conn, kind, since=None, until=None, task=None, after_id=None, local_only=False
+):
+    """Archived rows for export: segment by segment, each in id order.
+    With `local_only`, rows synced in from another device are left out."""
+    for _, path in find_segments(conn, kind, since, until):
+        rows = sorted(load_segment(path), key=lambda row: row[0])
+        foreign = segment_origins(path) if local_only else ()
+        for row in rows:
+            if row[0] in foreign:
+                continue
+            day = row[TIME_COLUMN[kind]][:10]
+            if since and day < since or until and day > until:
+                continue
+            if after_id and row[0] <= after_id:
+                continue
+            if _matches(kind, row, task):
+                yield row
+
+
+def iter_checkin_history(conn, checkin_task_ids=None):
+    """(checkin_task_id, checkin_time, success) of every archived check-in."""
+    wanted = None if checkin_task_ids is None else set(checkin_task_ids)
+    for _, path in find_segments(conn, "checkins"):
+        for row in load_segment(path):
+            if wanted is None or row[1] in wanted:
+                yield row[1], row[3], row[4]
+
+
+def session_totals(conn):
+    """{(day, task name): [minutes, sessions, distractions]} of archived
+    sessions, for rebuilding the focus rollups."""
+    totals = defaultdict(lambda: [0.0, 0, 0])
+    for _, path in find_segments(conn, "sessions"):
+        for _, name, start_time, _, duration, distractions in load_segment(path):
+            entry = totals[start_time[:10], name]
+            entry[0] += duration
+            entry[1] += 1
+            entry[2] += distractions
+    return totals
+
+
+def _month_bounds(month):
+    first = date.fromisoformat(f"{month}-01")
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first.isoformat(), following.isoformat()
+
+
+def _write_segment(path, kind, rows, origins):
+    columns = COLUMNS[kind]
+    tmp_path = path + ".part"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+        for row in rows:
+            record = dict(zip(columns, row))
+            if kind == "checkins":
+                record["success"] = bool(record["success"])
+            if row[0] in origins:
+                record["origin"] = origins[row[0]]
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def archive_month(conn, kind, month):
+    """Move the hot rows of one month into its segment; returns the count.
+
+    Runs under the write lock, so no row can arrive between reading and
+    deleting. The new segment file is complete before the manifest points
+    at it, and the old file is removed only after the commit.
+    """
+    first, following = _month_bounds(month)
+    hot = _HOT[kind]
+    directory = archive_dir(conn)
+    os.makedirs(directory, exist_ok=True)
+    with transaction(conn):
+        rows = conn.execute(hot["select"], (first, following)).fetchall()
+        moved = len(rows)
+        if not moved:
+            return 0
+        origins = {row[0]: row[-1] for row in rows if row[-1] is not None}
+        rows = [row[:-1] for row in rows]
+        previous = conn.execute(
+            "SELECT file, generation FROM archive_segments WHERE kind = ? AND month = ?",
+            (kind, month),
+        ).fetchone()
+        generation = previous[1] + 1 if previous else 1
+        if previous:
+            previous_path = os.path.join(directory, previous[0])
+            rows = sorted(
+                load_segment(previous_path) + tuple(rows), key=_sort_key(kind)
+            )
+            origins.update(segment_origins(previous_path))
+        file = f"{kind}-{month}-{generation}.jsonl.gz"
+        _write_segment(os.path.join(directory, file), kind, rows, origins)
+        try:
+            conn.execute(hot["delete"], (first, following))
+            ids = [row[0] for row in rows]
+            days = [row[TIME_COLUMN[kind]][:10] for row in rows]
+            conn.execute(
+                "INSERT OR REPLACE INTO archive_segments (kind, month, file, "
+                "generation, rows, min_date, max_date, min_id, max_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    month,
+                    file,
+                    generation,
+                    len(rows),
+                    min(days),
+                    max(days),
+                    min(ids),
+                    max(ids),
+                    datetime.now().isoformat(),
+                ),
+            )
+        except BaseException:
+            os.remove(os.path.join(directory, file))
+            raise
+    if previous:
+        try:
+            os.remove(os.path.join(directory, previous[0]))
+        except FileNotFoundError:
+            pass
+    return moved
+
+
+def retention_days_from_env(default=DEFAULT_RETENTION_DAYS):
+    """APOLOGIES_ARCHIVE_DAYS, or `default` when unset.
+
+    Read when archiving runs rather than at import, so a bad value only
+    stops `archive` and not every command that imports the database.
+    """
+    value = os.environ.get("APOLOGIES_ARCHIVE_DAYS", "").strip()
+    if not value:
+        return default
+    try:
+        days = int(value)
+    except ValueError:
+        days = 0
+    if days < 1:
+        raise ValueError(
+            f"APOLOGIES_ARCHIVE_DAYS={value!r} is not a positive number of days"
+        )
+    return days
+
+
+def retention_cutoff(retention_days=None, today=None):
+    """First day of the month `retention_days` ago; older rows get archived.
+
+    `retention_days` defaults to retention_days_from_env().
+    """
+    if retention_days is None:
+        retention_days = retention_days_from_env()
+    if retention_days < 1:
+        raise ValueError("the retention window must be at least one day")
+    day = (today or date.today()) - timedelta(days=retention_days)
+    return day.replace(day=1).isoformat()
+
+
+def archive_old_data(conn, retention_days=None, today=None):
+    """Archive every whole month older than the retention window.
+
+    Returns {kind: {month: rows moved}}.
+    """
+    cutoff = retention_cutoff(retention_days, today)
+    moved = {}
+    for kind in KINDS:
+        months = sorted(row[0] for row in conn.execute(_HOT[kind]["months"], (cutoff,)))
+        moved[kind] = {month: archive_month(conn, kind, month) for month in months}
+    return moved
+
+
+def get_segments(conn):
+    """The manifest as [(kind, month, file, rows, min_date, max_date)]."""
+    return conn.execute(
+        "SELECT kind, month, file, rows, min_date, max_date "
+        "FROM archive_segments ORDER BY kind, month"
+    ).fetchall()
@@ -0,0 +1,759 @@
+"""assistant/cli.py
+Non-interactive subcommands for scripts, cron jobs and status bars.
+
+Each command runs one query and exits. Nothing here imports Rich or builds
+a console, so a status-bar poll stays cheap.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from apologies_for_being_human import db
+
+SESSION_FIELDS = ("task_name", "start_time", "end_time", "duration", "distractions")
+
+
+def _emit(args, payload, lines):
+    if args.json:
+        json.dump(payload, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        for line in lines:
+            print(line)
+
+
+def _fail(message):
+    print(f"error: {message}", file=sys.stderr)
+    return 1
+
+
+def run_headless_session(
+    task_name,
+    duration_minutes,
+    quiet=False,
+    out=sys.stderr,
+    resume=None,
+    distractions=0,
+):
+    """Run a focus session without a console UI; returns the stopped
+    journal.JournaledSession.
+
+    Progress and reminders go to `out` (stderr, so stdout stays parseable).
+    Ctrl+C ends the session early and keeps the time measured so far.
+    `resume` is an orphaned journal.ActiveSession to continue, and
+    `distractions` those reported up front. The caller logs the session
+    with finish().
+    """
+    from apologies_for_being_human.journal import JournaledSession
+
+    session = JournaledSession(
+        task_name,
+        duration_minutes * 60,
+        resume=resume,
+        distractions=distractions,
+        quotes=not quiet,
+    )
+    try:
+        for tick in session.ticks():
+            if quiet:
+                continue
+            if tick.reminder is not None:
+                out.write(f"\r\033[K{session.reminder()}\n")
+            minutes, seconds = divmod(int(tick.remaining + 0.5), 60)
+            out.write(f"\r\033[K{task_name}: {minutes:02d}:{seconds:02d} left")
+            out.flush()
+    except KeyboardInterrupt:
+        if not quiet:
+            out.write("\nSession interrupted.")
+    finally:
+        session.stop()
+        if not quiet:
+            out.write("\n")
+    return session
+
+
+def _finish_session(args, session):
+    end_time = session.finish()
+    if end_time is None:
+        return _fail("this session was already logged by another process")
+    elapsed = session.elapsed()
+    payload = {
+        "task_name": session.task_name,
+        "start_time": session.journal.start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "duration": round(elapsed / 60, 2),
+        "distractions": session.distractions,
+    }
+    _emit(
+        args,
+        payload,
+        [f"Logged {payload['duration']:g} min on {session.task_name}."],
+    )
+    return 0
+
+
+def cmd_session_start(args):
+    session = run_headless_session(
+        args.task,
+        args.minutes,
+        quiet=args.quiet or not sys.stderr.isatty(),
+        distractions=args.distractions,
+    )
+    return _finish_session(args, session)
+
+
+def _pick_orphan(session_id):
+    from apologies_for_being_human.journal import find_orphans
+
+    orphans = find_orphans()
+    if session_id is None:
+        return orphans[0] if orphans else None
+    return next((s for s in orphans if s.session_id == session_id), None)
+
+
+def cmd_session_resume(args):
+    session = _pick_orphan(args.id)
+    if session is None:
+        return _fail("no unfinished session to resume")
+    resumed = run_headless_session(
+        session.task_name,
+        session.duration_seconds / 60,
+        quiet=args.quiet or not sys.stderr.isatty(),
+        resume=session,
+        distractions=args.distractions,
+    )
+    return _finish_session(args, resumed)
+
+
+def cmd_session_recover(args):
+    from apologies_for_being_human.journal import (
+        describe_orphan,
+        discard_orphan,
+        finalize_orphan,
+        find_orphans,
+    )
+
+    sessions = find_orphans()
+    if args.id is not None:
+        sessions = [s for s in sessions if s.session_id == args.id]
+    results, lines = [], []
+    for session in sessions:
+        if args.discard:
+            discard_orphan(session)
+            logged = False
+        else:
+            logged = finalize_orphan(session) is not None
+        results.append(
+            {
+                "id": session.session_id,
+                "task_name": session.task_name,
+                "start_time": session.start_time.isoformat(),
+                "duration": round(session.elapsed_seconds / 60, 2),
+                "logged": logged,
+            }
+        )
+        action = "logged" if logged else "discarded"
+        lines.append(f"{action}: {describe_orphan(session)}")
+    _emit(args, results, lines or ["No unfinished sessions."])
+    return 0
+
+
+def _orphan_hint(args):
+    """One stderr line when a crashed session is waiting to be recovered."""
+    if args.command == "tui" or getattr(args, "session_command", "start") != "start":
+        return
+    from apologies_for_being_human.journal import find_orphans
+
+    count = len(find_orphans())
+    if count:
+        print(
+            f"note: {count} unfinished session(s) from an earlier run; "
+            "see `session resume` and `session recover`",
+            file=sys.stderr,
+        )
+
+
+def cmd_log(args):
+    if args.date:
+        rows = db.get_sessions_by_date(args.date)[: args.limit]
+    elif args.task:
+        from apologies_for_being_human.task_index import get_task_index
+
+        index = get_task_index()
+        task_name = index.lookup(args.task)
+        if task_name is None:
+            suggestions = index.suggest(args.task)
+            hint = f"; did you mean {', '.join(suggestions)}?" if suggestions else ""
+            return _fail(f"no task {args.task!r}{hint}")
+        rows = db.get_session_page(page_size=args.limit, task_name=task_name).rows
+    else:
+        rows = db.get_logs(limit=args.limit)
+    _emit(
+        args,
+        [dict(zip(SESSION_FIELDS, row)) for row in rows],
+        [
+            f"{start}\t{duration:g} min\t{distractions} distractions\t{task}"
+            for task, start, _, duration, distractions in rows
+        ],
+    )
+    return 0
+
+
+def _resolve_checkin_task(task):
+    tasks = db.get_checkin_tasks()
+    if task.isdigit():
+        by_id = {row[0]: row for row in tasks}
+        return by_id.get(int(task))
+    by_name = {row[1].lower(): row for row in tasks}
+    return by_name.get(task.lower())
+
+
+def cmd_checkin(args):
+    task = _resolve_checkin_task(args.task)
+    if task is None:
+        return _fail(f"no check-in task {args.task!r}")
+    db.log_checkin(task[0], not args.fail, args.note)
+    _emit(
+        args,
+        {
+            "checkin_task_id": task[0],
+            "checkin_task_name": task[1],
+            "success": not args.fail,
+            "note": args.note,
+        },
+        [f"Checked in: {task[1]} ({'done' if not args.fail else 'missed'})"],
+    )
+    return 0
+
+
+def cmd_stats(args):
+    from apologies_for_being_human.statistics import get_today_summary
+
+    payload = get_today_summary()
+    today = payload["today"]
+    lines = [
+        f"Today: {today['focus_minutes']:g} min focused in {today['sessions']} sessions"
+    ]
+    lines += [
+        f"{'✓' if c['checked_in_today'] else '·'} {c['name']}: "
+        f"{c['completion_rate']}% done, streak {c['current_streak']}"
+        for c in payload["checkins"]
+    ]
+    _emit(args, payload, lines)
+    return 0
+
+
+def cmd_export(args):
+    from apologies_for_being_human.exporter import export
+
+    report = export(
+        args.kind,
+        args.path,
+        since=args.since,
+        until=args.until,
+        task=args.task,
+        incremental=args.incremental,
+        state_name=args.state_name,
+    )
+    if args.path != "-":
+        _emit(
+            args,
+            {"kind": report.kind, "path": report.path, "rows": report.rows},
+            [f"Exported {report.rows} {report.kind} to {report.path}"],
+        )
+    return 0
+
+
+def cmd_import(args):
+    from apologies_for_being_human.importer import import_file
+
+    report = import_file(args.path, kind=args.kind, skip_existing=args.skip_existing)
+    _emit(
+        args,
+        {
+            "kind": report.kind,
+            "read": report.read,
+            "inserted": report.inserted,
+            "skipped": report.skipped,
+            "invalid": report.invalid,
+            "errors": report.errors,
+        },
+        [
+            (
+                f"Imported {report.inserted} {report.kind} (read {report.read}, "
+                f"{report.skipped} already present, {report.invalid} invalid)"
+            )
+        ]
+        + [f"line {line}: {message}" for line, message in report.errors[:10]],
+    )
+    return 0
+
+
+def cmd_archive(args):
+    from apologies_for_being_human import archive
+
+    conn = db.connect_db()
+    if not args.list:
+        moved = archive.archive_old_data(conn, args.retention_days)
+        lines = [
+            f"{kind} {month}: archived {count} rows"
+            for kind, months in moved.items()
+            for month, count in months.items()
+        ]
+        if args.vacuum:
+            conn.execute("VACUUM")
+        _emit(args, moved, lines or ["Nothing older than the retention window."])
+        return 0
+    segments = archive.get_segments(conn)
+    _emit(
+        args,
+        [
+            dict(zip(("kind", "month", "file", "rows", "min_date", "max_date"), row))
+            for row in segments
+        ],
+        [
+            f"{kind} {month}\t{rows} rows\t{file}"
+            for kind, month, file, rows, _, _ in segments
+        ]
+        or ["No archived months."],
+    )
+    return 0
+
+
+def cmd_sync(args):
+    from apologies_for_being_human import sync
+
+    if args.new_device_id:
+        device_id = sync.new_device_id()
+        _emit(args, {"device_id": device_id}, [f"This database is now {device_id}."])
+        return 0
+    if args.status:
+        device_id, next_seq = sync.get_device()[:2]
+        peers = sync.get_peers()
+        _emit(
+            args,
+            {
+                "device_id": device_id,
+                "segments_pushed": next_seq - 1,
+                "peers": [
+                    {"device_id": peer, "last_seq": seq, "updated_at": when}
+                    for peer, seq, when in peers
+                ],
+            },
+            [f"device {device_id}, {next_seq - 1} segments pushed"]
+            + [f"  from {peer}: through #{seq} ({when})" for peer, seq, when in peers],
+        )
+        return 0
+    try:
+        report = sync.sync(
+            args.folder, send=not args.pull_only, receive=not args.push_only
+        )
+    except (ValueError, RuntimeError, OSError) as e:
+        return _fail(str(e))
+    lines = []
+    for device, count in report.pulled.items():
+        lines.append(f"Pulled {count} segment(s) from {device}")
+    for kind in ("checkin_tasks", "sessions", "checkins"):
+        counts = [
+            f"{getattr(report, outcome).get(kind, 0)} {outcome}"
+            for outcome in ("inserted", "merged", "skipped")
+        ]
+        if report.pulled:
+            lines.append(f"  {kind}: {', '.join(counts)}")
+    if report.segment:
+        pushed = ", ".join(f"{n} {kind}" for kind, n in report.pushed.items())
+        lines.append(f"Pushed {report.segment} ({pushed})")
+    _emit(
+        args,
+        {
+            "device_id": report.device_id,
+            "pulled": report.pulled,
+            "inserted": report.inserted,
+            "merged": report.merged,
+            "skipped": report.skipped,
+            "segment": report.segment,
+            "pushed": report.pushed,
+        },
+        lines or ["Already in sync."],
+    )
+    return 0
+
+
+def cmd_search(args):
+    from apologies_for_being_human import search
+
+    if args.rebuild:
+        db.rebuild_search_index()
+        if not args.query:
+            _emit(args, {"rebuilt": True}, ["Search index rebuilt."])
+            return 0
+    if not args.query:
+        return _fail("nothing to search for")
+    if args.json:
+        markers = ("<mark>", "</mark>")
+    elif sys.stdout.isatty():
+        markers = ("\033[1;33m", "\033[0m")
+    else:
+        markers = ("[", "]")
+    try:
+        hits = search.search(
+            " ".join(args.query),
+            kinds=args.kind or search.KINDS,
+            limit=args.limit,
+            markers=markers,
+        )
+    except RuntimeError as e:
+        return _fail(str(e))
+    _emit(
+        args,
+        [
+            {
+                "kind": hit.kind,
+                "ref": hit.ref,
+                "snippet": hit.snippet,
+                "score": round(hit.score, 4),
+                **hit.detail,
+            }
+            for hit in hits
+        ],
+        [f"{hit.kind}\t{hit.snippet}\t{search.describe(hit)}" for hit in hits],
+    )
+    return 0
+
+
+def cmd_profiles(args):
+    from apologies_for_being_human.config import active_profile, list_profiles
+
+    current = active_profile()
+    profiles = list_profiles()
+    _emit(
+        args,
+        {"active": current, "database": db.database_path(), "profiles": profiles},
+        [f"database: {db.database_path()}"]
+        + [
+            f"{'*' if name == current else ' '} {name}\t{path}"
+            for name, path in profiles.items()
+        ],
+    )
+    return 0
+
+
+def cmd_report(args):
+    from apologies_for_being_human.config import list_profiles
+    from apologies_for_being_human.reporting import cross_profile_report
+
+    profiles = list_profiles()
+    if args.profiles:
+        wanted = args.profiles.split(",")
+        unknown = [name for name in wanted if name not in profiles]
+        if unknown:
+            return _fail(f"unknown profile(s): {', '.join(unknown)}")
+        profiles = {name: profiles[name] for name in wanted}
+    report = cross_profile_report(profiles, start=args.since, end=args.until)
+    payload = {
+        "profiles": report["profiles"],
+        "start": report["start"],
+        "end": report["end"],
+        "focus": [
+            dict(zip(("profile", "minutes", "sessions", "distractions"), row))
+            for row in report["focus"]
+        ],
+        "daily": report["daily"],
+        "checkins": [
+            dict(
+                zip(
+                    (
+                        "profile",
+                        "name",
+                        "total",
+                        "completed",
+                        "completion_rate",
+                        "current_streak",
+                        "longest_streak",
+                    ),
+                    row,
+                )
+            )
+            for row in report["checkins"]
+        ],
+    }
+    lines = [f"Focus {report['start']} .. {report['end']}"]
+    lines += [
+        f"  {profile}: {minutes or 0:g} min in {sessions or 0} sessions"
+        for profile, minutes, sessions, _ in report["focus"]
+    ]
+    lines.append("Check-ins")
+    lines += [
+        f"  [{profile}] {name}: {rate:.1f}% of {total}, streak {current}"
+        for profile, name, total, _, rate, current, _ in report["checkins"]
+        if total
+    ]
+    _emit(args, payload, lines)
+    return 0
+
+
+def cmd_analytics(args):
+    try:
+        from apologies_for_being_human import columnar
+    except ImportError:
+        return _fail(
+            "analytics needs NumPy: pip install apologies_for_being_human[analytics]"
+        )
+
+    conn = db.connect_db()
+    columnar.refresh(conn, rebuild=args.rebuild)
+    snapshot = columnar.load(conn, refresh_first=False)
+    report = columnar.report(snapshot, args.since, args.until, args.task)
+    focus, checkins = report["focus"], report["checkins"]
+    weekdays = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+    lines = [
+        (
+            f"{focus['minutes']:.0f} min in {focus['sessions']} sessions, "
+            f"{focus['distractions']} distractions"
+        )
+    ]
+    if focus["sessions"]:
+        hours = focus["minutes_by_hour"]
+        best = sorted(range(24), key=hours.__getitem__, reverse=True)[:3]
+        lines.append(
+            "Most focused hours: "
+            + ", ".join(f"{h:02d}:00 ({hours[h]:.0f} min)" for h in best)
+        )
+        lines.append(
+            "By weekday: "
+            + ", ".join(
+                f"{day} {minutes:.0f}"
+                for day, minutes in zip(weekdays, focus["minutes_by_weekday"])
+            )
+        )
+        lines.append("Distractions by session length:")
+        lines += [
+            f"  {row['length']:>6} min: {row['sessions']} sessions, "
+            f"{row['distractions_per_session']:g}/session, "
+            f"{row['distractions_per_hour']:g}/hour"
+            for row in focus["distractions_by_length"]
+        ]
+    if checkins["checkins"]:
+        lines.append(
+            f"Check-ins: {checkins['checkins']}, "
+            f"{checkins['success_rate']:.1%} successful"
+        )
+        lines.append(
+            "  by weekday: "
+            + ", ".join(
+                f"{day} {rate:.0%}"
+                for day, rate in zip(weekdays, checkins["success_rate_by_weekday"])
+            )
+        )
+    _emit(args, report, lines)
+    return 0
+
+
+def cmd_serve(args):
+    from apologies_for_being_human.server import serve
+
+    serve(args.host, args.port, args.workers)
+    return 0
+
+
+def cmd_tui(args):
+    from apologies_for_being_human.tui import run_tui
+
+    run_tui()
+    return 0
+
+
+def _date_arg(value):
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected YYYY-MM-DD")
+    return value
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--json", action="store_true", help="print machine-readable JSON"
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="apologies_for_being_human",
+        description="Run without arguments for the interactive menu.",
+    )
+    parser.add_argument("--profile", help="use this profile's database")
+    parser.add_argument("--db", help="use this database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    session = commands.add_parser("session", help="focus sessions")
+    session_commands = session.add_subparsers(dest="session_command", required=True)
+    start = session_commands.add_parser(
+        "start", parents=[common], help="run a focus session and log it"
+    )
+    start.add_argument("task")
+    start.add_argument("--minutes", type=float, default=25)
+    start.add_argument("--distractions", type=int, default=0)
+    start.add_argument("--quiet", action="store_true", help="no countdown output")
+    start.set_defaults(func=cmd_session_start)
+    resume = session_commands.add_parser(
+        "resume", parents=[common], help="continue a session left by a crash"
+    )
+    resume.add_argument("--id", type=int, help="session id (default: the oldest)")
+    resume.add_argument("--distractions", type=int, default=0)
+    resume.add_argument("--quiet", action="store_true", help="no countdown output")
+    resume.set_defaults(func=cmd_session_resume)
+    recover = session_commands.add_parser(
+        "recover",
+        parents=[common],
+        help="log sessions left by a crash with their checkpointed time",
+    )
+    recover.add_argument("--id", type=int, help="only this session")
+    recover.add_argument(
+        "--discard", action="store_true", help="delete them instead of logging"
+    )
+    recover.set_defaults(func=cmd_session_recover)
+
+    log = commands.add_parser("log", parents=[common], help="list logged sessions")
+    log.add_argument("--limit", type=int, default=20)
+    log.add_argument("--date", type=_date_arg)
+    log.add_argument("--task")
+    log.set_defaults(func=cmd_log)
+
+    checkin = commands.add_parser("checkin", parents=[common], help="record a check-in")
+    checkin.add_argument("task", help="check-in task id or name")
+    checkin.add_argument("--fail", action="store_true", help="record as not done")
+    checkin.add_argument("--note", default="")
+    checkin.set_defaults(func=cmd_checkin)
+
+    stats = commands.add_parser(
+        "stats", parents=[common], help="today's focus and check-in statistics"
+    )
+    stats.set_defaults(func=cmd_stats)
+
+    export = commands.add_parser(
+        "export", parents=[common], help="export to CSV/JSONL (.gz to compress)"
+    )
+    export.add_argument("kind", choices=["sessions", "checkins"])
+    export.add_argument("path", help="output file, or - for JSONL on stdout")
+    export.add_argument("--since", type=_date_arg)
+    export.add_argument("--until", type=_date_arg)
+    export.add_argument("--task")
+    export.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rows added since the last incremental export with these filters",
+    )
+    export.add_argument("--state-name", help="name of the incremental export mark")
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser(
+        "import", parents=[common], help="import sessions or check-ins from CSV/JSONL"
+    )
+    import_.add_argument("path")
+    import_.add_argument("--kind", choices=["sessions", "checkins"])
+    import_.add_argument("--skip-existing", action="store_true")
+    import_.set_defaults(func=cmd_import)
+
+    archive = commands.add_parser(
+        "archive",
+        parents=[common],
+        help="move old sessions and check-ins into monthly archive files",
+    )
+    archive.add_argument(
+        "--retention-days",
+        type=int,
+        default=None,
+        help="keep this many days in the database (default: 365, or "
+        "APOLOGIES_ARCHIVE_DAYS)",
+    )
+    archive.add_argument("--vacuum", action="store_true", help="shrink the file after")
+    archive.add_argument("--list", action="store_true", help="list archived months")
+    archive.set_defaults(func=cmd_archive)
+
+    sync = commands.add_parser(
+        "sync", parents=[common], help="sync with other machines through a folder"
+    )
+    sync.add_argument(
+        "folder", nargs="?", help="shared folder (default: APOLOGIES_SYNC_DIR)"
+    )
+    direction = sync.add_mutually_exclusive_group()
+    direction.add_argument("--push-only", action="store_true")
+    direction.add_argument("--pull-only", action="store_true")
+    sync.add_argument("--status", action="store_true", help="show the sync state")
+    sync.add_argument(
+        "--new-device-id",
+        action="store_true",
+        help="give a copied database its own device id",
+    )
+    sync.set_defaults(func=cmd_sync)
+
+    search = commands.add_parser(
+        "search", parents=[common], help="full-text search of task names and notes"
+    )
+    search.add_argument("query", nargs="*")
+    search.add_argument(
+        "--kind",
+        action="append",
+        choices=["task", "note", "checkin_task"],
+        help="limit to a kind of result (repeatable)",
+    )
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument(
+        "--rebuild", action="store_true", help="rebuild the search index first"
+    )
+    search.set_defaults(func=cmd_search)
+
+    profiles = commands.add_parser(
+        "profiles", parents=[common], help="list profiles and the active database"
+    )
+    profiles.set_defaults(func=cmd_profiles)
+
+    report = commands.add_parser(
+        "report", parents=[common], help="focus and check-ins across all profiles"
+    )
+    report.add_argument("--profiles", help="comma-separated names (default: all)")
+    report.add_argument("--since", type=_date_arg, help="default: 6 days ago")
+    report.add_argument("--until", type=_date_arg, help="default: today")
+    report.set_defaults(func=cmd_report)
+
+    analytics = commands.add_parser(
+        "analytics",
+        parents=[common],
+        help="focus patterns over all history (needs NumPy)",
+    )
+    analytics.add_argument("--since", type=_date_arg)
+    analytics.add_argument("--until", type=_date_arg)
+    analytics.add_argument("--task", help="focus figures for one task only")
+    analytics.add_argument(
+        "--rebuild", action="store_true", help="rebuild the columnar snapshot first"
+    )
+    analytics.set_defaults(func=cmd_analytics)
+
+    server = commands.add_parser("serve", help="local read-only HTTP/JSON API")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=8765)
+    server.add_argument("--workers", type=int, help="query threads (default: CPUs)")
+    server.set_defaults(func=cmd_serve, json=False)
+
+    tui = commands.add_parser("tui", help="full-screen mode")
+    tui.set_defaults(func=cmd_tui, json=False)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.db or args.profile:
+            db.use_database(args.db, args.profile)
+        db.init_db()
+        _orphan_hint(args)
+        return args.func(args)
+    except BrokenPipeError:
+        # Output piped into `head` and friends; stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as e:
+        return _fail(str(e))
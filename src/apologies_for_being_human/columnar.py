@@ -0,0 +1,462 @@
+"""assistant/columnar.py
+Columnar snapshot of sessions and check-ins for vectorized analytics.
+
+Needs NumPy (`pip install apologies_for_being_human[analytics]`).
+
+Every session and check-in, archived months included, is kept as typed
+arrays in `<database name>-columnar/`, one raw file per column, and
+memory-mapped on load:
+
+    sessions: task_id, start, end (epoch seconds), duration (minutes),
+              distractions, task (task_name_id)
+    checkins: checkin_record_id, time (epoch seconds), task
+              (checkin_task_id), success
+
+Times are local wall-clock times counted as if they were UTC, so the hour
+and weekday of a timestamp come straight out of integer division.
+
+A refresh appends only rows past the last task_id and checkin_record_id.
+Two checks catch rows changed or deleted in place, after which the snapshot
+is rebuilt. The per-table edit counters of db.get_row_edits() move on any
+update to a column the snapshot holds, such as a sync merge that only moves
+an end time. And the snapshot's totals are compared with the focus rollups
+and check-in summaries, which every writer keeps current; the difference is
+recorded at build time and moves when rows are deleted (a cleanup).
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from apologies_for_being_human import archive
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.db import connect_db, get_row_edits
+
+FORMAT = 1
+FETCH_SIZE = 50_000
+
+SESSION_COLUMNS = {
+    "task_id": np.int64,
+    "start": np.int64,
+    "end": np.int64,
+    "duration": np.float64,
+    "distractions": np.int32,
+    "task": np.int32,
+}
+CHECKIN_COLUMNS = {
+    "checkin_record_id": np.int64,
+    "time": np.int64,
+    "task": np.int32,
+    "success": np.bool_,
+}
+COLUMNS = {"sessions": SESSION_COLUMNS, "checkins": CHECKIN_COLUMNS}
+
+_HOT = {
+    "sessions": (
+        "SELECT task_id, CAST(strftime('%s', start_time) AS INTEGER), "
+        "CAST(strftime('%s', end_time) AS INTEGER), duration, distractions, "
+        "task_name_id FROM tasks WHERE task_id > ? ORDER BY task_id"
+    ),
+    "checkins": (
+        "SELECT checkin_record_id, CAST(strftime('%s', checkin_time) AS INTEGER), "
+        "checkin_task_id, success FROM checkin_records "
+        "WHERE checkin_record_id > ? ORDER BY checkin_record_id"
+    ),
+}
+LENGTH_EDGES = (15, 30, 60, 90)  # minutes; session length buckets
+LENGTH_LABELS = ("<15", "15-30", "30-60", "60-90", "90+")
+
+
+def snapshot_dir(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return os.path.splitext(path)[0] + "-columnar"
+
+
+def _epoch_seconds(times):
+    times = np.array(times, dtype="datetime64[us]").astype("datetime64[s]")
+    return times.astype(np.int64)
+
+
+class Snapshot:
+    """Memory-mapped columns plus the lookup tables for their codes."""
+
+    def __init__(self, sessions, checkins, task_names, checkin_task_names):
+        self.sessions = sessions  # column -> array
+        self.checkins = checkins
+        self.task_names = task_names  # task_name_id -> name
+        self.checkin_task_names = checkin_task_names  # checkin_task_id -> name
+
+    def __len__(self):
+        return len(self.sessions["task_id"])
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == FORMAT else None
+
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, "meta.json")
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(path + ".part", path)
+
+
+def _column_path(directory, kind, column, generation):
+    return os.path.join(directory, f"{kind}-{generation}.{column}.bin")
+
+
+def _map(directory, meta, kind):
+    count = meta["counts"][kind]
+    columns = {}
+    for column, dtype in COLUMNS[kind].items():
+        if count == 0:
+            columns[column] = np.empty(0, dtype)
+            continue
+        path = _column_path(directory, kind, column, meta["generation"])
+        columns[column] = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+    return columns
+
+
+def _append(directory, meta, kind, chunk):
+    """Append one chunk of columns; a crash leaves bytes past the count in
+    meta.json, which the next append cuts off first."""
+    count = meta["counts"][kind]
+    for column, dtype in COLUMNS[kind].items():
+        path = _column_path(directory, kind, column, meta["generation"])
+        values = np.ascontiguousarray(chunk[column], dtype=dtype)
+        with open(path, "ab") as f:
+            f.truncate(count * np.dtype(dtype).itemsize)
+            values.tofile(f)
+    meta["counts"][kind] = count + len(chunk["task"])
+
+
+def _chunks(rows, kind):
+    """Turn row tuples into column arrays, FETCH_SIZE rows at a time."""
+    names = list(COLUMNS[kind])
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= FETCH_SIZE:
+            yield dict(zip(names, map(list, zip(*batch))))
+            batch = []
+    if batch:
+        yield dict(zip(names, map(list, zip(*batch))))
+
+
+def _archived_rows(conn, kind, after_id):
+    files = [
+        row[0]
+        for row in conn.execute(
+            "SELECT file FROM archive_segments WHERE kind = ? AND max_id > ? "
+            "ORDER BY month",
+            (kind, after_id),
+        )
+    ]
+    if not files:
+        return
+    directory = archive.archive_dir(conn)
+    if kind == "sessions":
+        name_ids = dict(conn.execute("SELECT task_name, task_name_id FROM task_names"))
+        # Segment order is task_id, task_name, start, end, duration, distractions.
+        rows = (
+            (row[0], row[2], row[3], row[4], row[5], name_ids[row[1]])
+            for file in files
+            for row in archive.load_segment(os.path.join(directory, file))
+            if row[0] > after_id
+        )
+    else:
+        # checkin_record_id, checkin_task_id, name, time, success, note.
+        rows = (
+            (row[0], row[3], row[1], row[4])
+            for file in files
+            for row in archive.load_segment(os.path.join(directory, file))
+            if row[0] > after_id
+        )
+    for chunk in _chunks(rows, kind):
+        for column in ("start", "end", "time"):
+            if column in chunk:
+                chunk[column] = _epoch_seconds(chunk[column])
+        yield chunk
+
+
+def _hot_rows(conn, kind, after_id):
+    cursor = conn.execute(_HOT[kind], (after_id,))
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from _chunks(rows, kind)
+
+
+def _expected_totals(conn):
+    """What the rollups and summaries say the snapshot should add up to."""
+    sessions, minutes, distractions = conn.execute(
+        "SELECT total(sessions), total(minutes), total(distractions) FROM focus_weekly"
+    ).fetchone()
+    checkins, completed = conn.execute(
+        "SELECT total(total), total(completed) FROM checkin_task_stats"
+    ).fetchone()
+    return (int(sessions), minutes, int(distractions), int(checkins), int(completed))
+
+
+def _totals(directory, meta):
+    sessions = _map(directory, meta, "sessions")
+    checkins = _map(directory, meta, "checkins")
+    return (
+        len(sessions["task_id"]),
+        float(sessions["duration"].sum()),
+        int(sessions["distractions"].sum()),
+        len(checkins["task"]),
+        int(checkins["success"].sum()),
+    )
+
+
+def _offset(totals, expected):
+    return [want - have for have, want in zip(totals, expected)]
+
+
+def _consistent(offset, recorded):
+    """Counts must match exactly, minutes up to float summation order."""
+    return (
+        offset[0] == recorded[0]
+        and offset[2:] == recorded[2:]
+        and math.isclose(offset[1], recorded[1], abs_tol=0.005)
+    )
+
+
+def _new_meta(generation):
+    return {
+        "format": FORMAT,
+        "generation": generation,
+        "counts": {"sessions": 0, "checkins": 0},
+        "last_ids": {"sessions": 0, "checkins": 0},
+        "offset": None,
+        "row_edits": None,
+    }
+
+
+def _append_new_rows(conn, directory, meta):
+    added = {}
+    for kind, columns in COLUMNS.items():
+        id_column = next(iter(columns))
+        after_id = meta["last_ids"][kind]
+        added[kind] = 0
+        for source in (_archived_rows, _hot_rows):
+            for chunk in source(conn, kind, after_id):
+                _append(directory, meta, kind, chunk)
+                added[kind] += len(chunk[id_column])
+                meta["last_ids"][kind] = max(
+                    meta["last_ids"][kind], int(max(chunk[id_column]))
+                )
+    return added
+
+
+def refresh(conn=None, rebuild=False):
+    """Bring the snapshot up to date; returns {kind: rows appended}.
+
+    Runs under the database write lock, so it reads one consistent state and
+    two processes never append at once. Only rows past the last ids are read,
+    unless the edit counters or the totals check find the snapshot stale and
+    it is rebuilt.
+    """
+    conn = conn or connect_db()
+    directory = snapshot_dir(conn)
+    os.makedirs(directory, exist_ok=True)
+    with transaction(conn):
+        previous = _read_meta(directory)
+        row_edits = get_row_edits(conn)
+        meta = previous if previous and not rebuild else None
+        if meta is not None and meta.get("row_edits") != row_edits:
+            meta = None  # rows updated in place
+        if meta is not None:
+            added = _append_new_rows(conn, directory, meta)
+            offset = _offset(_totals(directory, meta), _expected_totals(conn))
+            if not _consistent(offset, meta["offset"]):
+                meta = None  # rows changed or removed in place
+        if meta is None:
+            meta = _new_meta(previous["generation"] + 1 if previous else 1)
+            added = _append_new_rows(conn, directory, meta)
+            meta["offset"] = _offset(_totals(directory, meta), _expected_totals(conn))
+            meta["row_edits"] = row_edits
+        _write_meta(directory, meta)
+    _remove_old_generations(directory, meta["generation"])
+    return added
+
+
+def _remove_old_generations(directory, generation):
+    for name in os.listdir(directory):
+        if name.endswith(".bin") and not name.split(".", 1)[0].endswith(
+            f"-{generation}"
+        ):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # still mapped elsewhere (Windows); removed next time
+
+
+def load(conn=None, refresh_first=True):
+    """The snapshot, refreshed first unless `refresh_first` is false."""
+    conn = conn or connect_db()
+    if refresh_first:
+        refresh(conn)
+    directory = snapshot_dir(conn)
+    meta = _read_meta(directory)
+    if meta is None:
+        refresh(conn)
+        meta = _read_meta(directory)
+    return Snapshot(
+        _map(directory, meta, "sessions"),
+        _map(directory, meta, "checkins"),
+        _lookup(conn, "SELECT task_name_id, task_name FROM task_names"),
+        _lookup(conn, "SELECT checkin_task_id, checkin_task_name FROM checkin_tasks"),
+    )
+
+
+def _lookup(conn, sql):
+    rows = conn.execute(sql).fetchall()
+    names = np.empty(max((row[0] for row in rows), default=0) + 1, dtype=object)
+    for code, name in rows:
+        names[code] = name
+    return names
+
+
+# ---- aggregations -----------------------------------------------------------
+
+
+def _day_bounds(since=None, until=None):
+    low = _epoch_seconds([since])[0] if since else None
+    high = _epoch_seconds([until])[0] + 86400 if until else None
+    return low, high
+
+
+def _mask(times, codes, since, until, code):
+    mask = np.ones(len(times), dtype=bool)
+    low, high = _day_bounds(since, until)
+    if low is not None:
+        mask &= times >= low
+    if high is not None:
+        mask &= times < high
+    if code is not None:
+        mask &= codes == code
+    return mask
+
+
+def _weekday(times):
+    # 1970-01-01 was a Thursday; Monday is 0.
+    return (times // 86400 + 3) % 7
+
+
+def _code_of(names, name):
+    matches = np.flatnonzero(names == name)
+    return int(matches[0]) if len(matches) else -1
+
+
+def session_report(snapshot, since=None, until=None, task=None):
+    """Focus totals, minutes by hour and weekday, distractions against
+    session length, and minutes per task per year. `since` and `until` are
+    ISO dates (inclusive); `task` a task name."""
+    columns = snapshot.sessions
+    code = None if task is None else _code_of(snapshot.task_names, task)
+    mask = _mask(columns["start"], columns["task"], since, until, code)
+    start = columns["start"][mask]
+    duration = columns["duration"][mask]
+    distractions = columns["distractions"][mask]
+    codes = columns["task"][mask]
+
+    hours = (start // 3600) % 24
+    by_hour = np.bincount(hours, weights=duration, minlength=24)
+    by_weekday = np.bincount(_weekday(start), weights=duration, minlength=7)
+
+    buckets = np.digitize(duration, LENGTH_EDGES)
+    bucket_sessions = np.bincount(buckets, minlength=len(LENGTH_LABELS))
+    bucket_minutes = np.bincount(
+        buckets, weights=duration, minlength=len(LENGTH_LABELS)
+    )
+    bucket_distractions = np.bincount(
+        buckets, weights=distractions, minlength=len(LENGTH_LABELS)
+    )
+    lengths = [
+        {
+            "length": label,
+            "sessions": int(bucket_sessions[i]),
+            "distractions_per_session": (
+                round(bucket_distractions[i] / bucket_sessions[i], 3)
+                if bucket_sessions[i]
+                else 0.0
+            ),
+            "distractions_per_hour": (
+                round(bucket_distractions[i] * 60 / bucket_minutes[i], 3)
+                if bucket_minutes[i]
+                else 0.0
+            ),
+        }
+        for i, label in enumerate(LENGTH_LABELS)
+    ]
+
+    by_task_year = {}
+    if len(start):
+        years = start.astype("datetime64[s]").astype("datetime64[Y]").astype(np.int64)
+        first_year = int(years.min())
+        span = int(years.max()) - first_year + 1
+        grid = np.bincount(
+            codes.astype(np.int64) * span + (years - first_year),
+            weights=duration,
+            minlength=len(snapshot.task_names) * span,
+        ).reshape(-1, span)
+        for task_code, year in zip(*np.nonzero(grid)):
+            name = snapshot.task_names[task_code]
+            by_task_year.setdefault(name, {})[str(1970 + first_year + int(year))] = (
+                round(float(grid[task_code, year]), 2)
+            )
+
+    return {
+        "sessions": int(mask.sum()),
+        "minutes": round(float(duration.sum()), 2),
+        "distractions": int(distractions.sum()),
+        "minutes_by_hour": [round(float(m), 2) for m in by_hour],
+        "minutes_by_weekday": [round(float(m), 2) for m in by_weekday],
+        "distractions_by_length": lengths,
+        "minutes_by_task_year": by_task_year,
+    }
+
+
+def checkin_report(snapshot, since=None, until=None):
+    """Check-in counts and success rates overall, by weekday and by task."""
+    columns = snapshot.checkins
+    mask = _mask(columns["time"], columns["task"], since, until, None)
+    success = columns["success"][mask]
+    codes = columns["task"][mask]
+    weekday = _weekday(columns["time"][mask])
+
+    def rates(keys, size):
+        totals = np.bincount(keys, minlength=size)
+        done = np.bincount(keys, weights=success, minlength=size)
+        return totals, np.divide(done, totals, out=np.zeros(size), where=totals > 0)
+
+    _, weekday_rates = rates(weekday, 7)
+    task_totals, task_rates = rates(codes, len(snapshot.checkin_task_names))
+    return {
+        "checkins": int(mask.sum()),
+        "success_rate": round(float(success.mean()), 4) if len(success) else 0.0,
+        "success_rate_by_weekday": [round(float(r), 4) for r in weekday_rates],
+        "success_rate_by_task": {
+            snapshot.checkin_task_names[code]: round(float(task_rates[code]), 4)
+            for code in np.flatnonzero(task_totals)
+        },
+    }
+
+
+def report(snapshot=None, since=None, until=None, task=None):
+    """Both reports over a (freshly refreshed) snapshot."""
+    snapshot = snapshot if snapshot is not None else load()
+    return {
+        "focus": session_report(snapshot, since, until, task),
+        "checkins": checkin_report(snapshot, since, until),
+    }
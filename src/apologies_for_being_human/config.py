@@ -0,0 +1,119 @@
+"""assistant/config.py
+Where the database lives: environment, profiles and the config file.
+
+The path is resolved in this order:
+
+1. APOLOGIES_DB, an explicit file path.
+2. A named profile from APOLOGIES_PROFILE, or `profile = "..."` in the
+   config file. Profiles listed under `[profiles]` map to their own file;
+   any other name gets `<data dir>/profiles/<name>.db`.
+3. `logs/apologies_for_being_human.db` in the working directory, if it
+   already exists (the location used by earlier versions).
+4. `apologies_for_being_human.db` in the per-user data directory.
+
+The config file is TOML at APOLOGIES_CONFIG, or `config.toml` in the
+per-user config directory, for example:
+
+    profile = "work"
+
+    [profiles]
+    work = "~/Documents/focus/work.db"
+    personal = "~/focus/personal.db"
+"""
+
+import os
+import re
+import sys
+
+APP_NAME = "apologies_for_being_human"
+DB_FILENAME = "apologies_for_being_human.db"
+LEGACY_DB_FILE = os.path.join("logs", DB_FILENAME)
+
+_PROFILE_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def _user_dir(kind):
+    """Per-user config or data directory for this platform."""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.join(home, "AppData", "Roaming")
+    elif sys.platform == "darwin":
+        base = os.path.join(home, "Library", "Application Support")
+    elif kind == "config":
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(home, ".config")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+    return os.path.join(base, APP_NAME)
+
+
+def config_file():
+    return os.environ.get("APOLOGIES_CONFIG") or os.path.join(
+        _user_dir("config"), "config.toml"
+    )
+
+
+def data_dir():
+    return _user_dir("data")
+
+
+def load_config(path=None):
+    """The parsed config file, or {} when it does not exist."""
+    path = path or config_file()
+    if not os.path.exists(path):
+        return {}
+    import tomllib  # only paid for when a config file exists
+
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"invalid config file {path}: {e}")
+
+
+def _expand(path):
+    return os.path.abspath(os.path.expanduser(os.path.expandvars(path)))
+
+
+def profile_path(name, config=None):
+    """The database file of profile `name`."""
+    if not _PROFILE_NAME_RE.match(name):
+        raise ValueError(f"invalid profile name {name!r}")
+    config = load_config() if config is None else config
+    configured = config.get("profiles", {}).get(name)
+    if configured:
+        return _expand(configured)
+    return os.path.join(data_dir(), "profiles", f"{name}.db")
+
+
+def list_profiles(config=None):
+    """{name: path} for the configured profiles and any found in the data dir."""
+    config = load_config() if config is None else config
+    profiles = {}
+    directory = os.path.join(data_dir(), "profiles")
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".db"):
+                profiles[filename[:-3]] = os.path.join(directory, filename)
+    for name, path in config.get("profiles", {}).items():
+        profiles[name] = _expand(path)
+    return profiles
+
+
+def active_profile(config=None):
+    """Name of the selected profile, or None when no profile is in use."""
+    config = load_config() if config is None else config
+    return os.environ.get("APOLOGIES_PROFILE") or config.get("profile") or None
+
+
+def resolve_db_path(profile=None):
+    """Path of the database to use; see the module docstring for the order."""
+    explicit = os.environ.get("APOLOGIES_DB")
+    if explicit and profile is None:
+        return _expand(explicit)
+    config = load_config()
+    profile = profile or active_profile(config)
+    if profile:
+        return profile_path(profile, config)
+    if os.path.exists(LEGACY_DB_FILE):
+        return os.path.abspath(LEGACY_DB_FILE)
+    return os.path.join(data_dir(), DB_FILENAME)
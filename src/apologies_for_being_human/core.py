@@ -2,8 +2,9 @@
 Core functions are defined here.
 """
 
-import time
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+from functools import partial
 
 from rich.table import Table, Column
 from rich.prompt import Prompt
@@ -18,21 +19,21 @@ from rich.progress import (
 from rich.text import Text
 
 from apologies_for_being_human.db import (
-    log_task,
-    get_all_sessions,
-    get_sessions_by_date,
-    get_sessions_by_task,
-    get_distinct_tasks,
+    Page,
+    get_session_page,
     get_logs,
     create_checkin_task as db_create_checkin_task,
     get_checkin_tasks,
     log_checkin,
-    get_checkin_records,
+    get_checkin_record_page,
 )
-from apologies_for_being_human.prompts import gentle_prompt
+from apologies_for_being_human.instrumentation import measure
+from apologies_for_being_human.task_index import ask_task_name
+from apologies_for_being_human.timer import DEFAULT_REFRESH_HZ
 
 
 latest_reminder = {"text": "Stay focused..."}
+PAGE_SIZE = 10
 
 
 class ReminderColumn(ProgressColumn):
@@ -55,56 +56,58 @@ class ReminderColumn(ProgressColumn):
         )
 
 
-def start_focus_session(task_name, duration_minutes, console):
-    duration_seconds = duration_minutes * 60
-    start_time = datetime.now()
-    console.print(
-        f"\n[bold green]🎯 Starting session:[/bold green] {task_name} ({duration_minutes} min)"
-    )
-
-    default_interval = 2 * 60
-    prompts_count = max(1, int(duration_seconds / default_interval))
-    timings = [
-        duration_seconds / (prompts_count + 1) * (i + 1) for i in range(prompts_count)
-    ]
-    next_reminder_index = 0
-
-    reminder_column = ReminderColumn(lambda: latest_reminder["text"])
-
-    with Progress(
+def make_focus_progress(console):
+    """The session progress display; refreshed manually on timer frames."""
+    return Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         TimeRemainingColumn(),
-        reminder_column,
+        ReminderColumn(lambda: latest_reminder["text"]),
         console=console,
         transient=True,
-    ) as progress:
+        auto_refresh=False,
+    )
+
+
+def start_focus_session(
+    task_name, duration_minutes, console, refresh_hz=DEFAULT_REFRESH_HZ, resume=None
+):
+    """Run a session with a progress bar and log it.
+
+    `resume` is an orphaned journal.ActiveSession to continue from its last
+    checkpoint instead of starting afresh.
+    """
+    from apologies_for_being_human.journal import JournaledSession
+
+    console.print(
+        f"\n[bold green]🎯 {'Resuming' if resume else 'Starting'} session:[/bold green] "
+        f"{task_name} ({duration_minutes:g} min)"
+    )
+    duration_seconds = duration_minutes * 60
+    session = JournaledSession(
+        task_name, duration_seconds, resume=resume, refresh_hz=refresh_hz
+    )
+
+    with make_focus_progress(console) as progress:
         task = progress.add_task("Focusing...", total=duration_seconds)
 
-        elapsed_time = 0
         try:
-            while not progress.finished:
-                time.sleep(1)
-                elapsed_time += 1
-                progress.update(task, advance=1)
-
-                if (
-                    next_reminder_index < len(timings)
-                    and elapsed_time >= timings[next_reminder_index]
-                ):
-                    try:
-                        quote_text = gentle_prompt(task_name, return_str=True)
-                    except Exception:
-                        quote_text = (
-                            "Even a small step forward counts. You've got this!"
-                        )
-                    latest_reminder["text"] = quote_text
-                    next_reminder_index += 1
+            for tick in session.ticks():
+                if tick.reminder is not None:
+                    latest_reminder["text"] = session.reminder()
+                with measure("render.focus_frame"):
+                    progress.update(task, completed=tick.elapsed)
+                    progress.refresh()
         except KeyboardInterrupt:
             console.print("\n[red]⛔ Session interrupted by user.[/red]")
+        finally:
+            # Log what the timer measured, so the stored duration matches the
+            # bar. The journal keeps that time safe while the question below
+            # is open.
+            elapsed = session.stop()
 
-    end_time = datetime.now()
+    end_time = session.journal.start_time + timedelta(seconds=elapsed)
     console.print(
         f"\n[green]✅ Session complete! End time: {end_time.strftime('%H:%M:%S')}[/green]"
     )
@@ -128,7 +131,44 @@ def start_focus_session(task_name, duration_minutes, console):
             console.print("[red]Please enter a valid number.[/red]")
 
     latest_reminder["text"] = "Stay focused..."
-    log_task(task_name, start_time, end_time, distractions)
+    session.distractions += distractions
+    if session.finish() is None:
+        console.print("[yellow]This session was already logged elsewhere.[/yellow]")
+
+
+def recover_sessions(console):
+    """Offer to resume, log or discard sessions left behind by a crash."""
+    from apologies_for_being_human.journal import (
+        describe_orphan,
+        discard_orphan,
+        finalize_orphan,
+        find_orphans,
+    )
+
+    for session in find_orphans():
+        console.print(
+            f"[yellow]Unfinished session found:[/yellow] {describe_orphan(session)}"
+        )
+        choice = Prompt.ask(
+            "[r]esume it, [l]og the time so far, or [d]iscard it",
+            choices=["r", "l", "d"],
+            default="l",
+        )
+        if choice == "r":
+            start_focus_session(
+                session.task_name,
+                session.duration_seconds / 60,
+                console=console,
+                resume=session,
+            )
+        elif choice == "l":
+            finalize_orphan(session)
+            console.print(
+                f"[green]Logged {session.elapsed_seconds / 60:.1f} min "
+                f"on {session.task_name}.[/green]"
+            )
+        else:
+            discard_orphan(session)
 
 
 def view_log(console):
@@ -140,7 +180,7 @@ def view_log(console):
     )
 
     if choice == "all":
-        rows = get_all_sessions()
+        fetch_page = partial(get_session_page, page_size=PAGE_SIZE)
     elif choice == "date":
         while True:
             date_str = Prompt.ask("Enter date (YYYY-MM-DD)")
@@ -149,40 +189,200 @@ def view_log(console):
                 break
             except ValueError:
                 console.print("[red]Invalid date format. Please use YYYY-MM-DD[/red]")
-        rows = get_sessions_by_date(date_str)
+        fetch_page = partial(
+            get_session_page, page_size=PAGE_SIZE, date=date_str, descending=False
+        )
     elif choice == "task":
-        tasks = get_distinct_tasks()
-        task_name = Prompt.ask("Select task", choices=tasks)
-        rows = get_sessions_by_task(task_name)
+        task_name = ask_task_name(console, "Select task", existing_only=True)
+        fetch_page = partial(get_session_page, page_size=PAGE_SIZE, task_name=task_name)
     else:
         n = int(Prompt.ask("How many recent entries?", default="20"))
         rows = get_logs(limit=n)
+        fetch_page = partial(_list_page, rows)
+
+    browse_pages(console, fetch_page, _session_table)
+
+
+def _session_table(rows):
+    table = Table(title="📘 Task Sessions", title_style="bold green")
+    table.add_column("Task")
+    table.add_column("Start", no_wrap=True, min_width=20)
+    table.add_column("End", no_wrap=True, min_width=20)
+    table.add_column("Duration (min)")
+    table.add_column("Distractions")
+
+    for task, start, end, duration, distractions in rows:
+        table.add_row(task, start, end, str(duration), str(distractions))
+    return table
 
-    if not rows:
+
+def _list_page(rows, cursor, backward, page_size=PAGE_SIZE):
+    """Page through an in-memory list, using row offsets as cursors."""
+    if cursor is None:
+        start = 0
+    elif backward:
+        start = max(0, cursor[0] - page_size)
+    else:
+        start = cursor[0] + 1
+    end = min(start + page_size, cursor[0] if backward else len(rows))
+    return Page(
+        rows=rows[start:end],
+        first_key=(start,),
+        last_key=(end - 1,),
+        has_previous=start > 0,
+        has_next=end < len(rows),
+    )
+
+
+def browse_pages(console, fetch_page, render):
+    """Show one page at a time; `fetch_page(cursor, backward)` returns a Page."""
+    page = fetch_page(None, False)
+    if not page.rows:
         console.print("[yellow]No matching records.[/yellow]")
         return
 
-    page_size = 10
-    total = len(rows)
-    for offset in range(0, total, page_size):
-        chunk = rows[offset : offset + page_size]
-        table = Table(title="📘 Task Sessions", title_style="bold green")
-        table.add_column("Task")
-        table.add_column("Start", no_wrap=True, min_width=20)
-        table.add_column("End", no_wrap=True, min_width=20)
-        table.add_column("Duration (min)")
-        table.add_column("Distractions")
-
-        for task, start, end, duration, distractions in chunk:
-            table.add_row(task, start, end, str(duration), str(distractions))
-
-        console.print(table)
-
-        if offset + page_size < total:
-            Prompt.ask(
-                f"Showing {offset + 1}–{min(offset + page_size, total)} of {total}. Press Enter to continue",
-                default="",
+    while True:
+        console.print(render(page.rows))
+        choices = []
+        if page.has_next:
+            choices.append("n")
+        if page.has_previous:
+            choices.append("p")
+        if not choices:
+            return
+        choices.append("q")
+        action = Prompt.ask(
+            "[n]ext page, [p]revious page or [q]uit",
+            choices=choices,
+            default=choices[0],
+        )
+        if action == "q":
+            return
+        if action == "n":
+            next_page = fetch_page(page.last_key, False)
+        else:
+            next_page = fetch_page(page.first_key, True)
+        if not next_page.rows:
+            return
+        page = next_page
+
+
+def import_history(console):
+    from apologies_for_being_human.importer import import_file
+
+    path = Prompt.ask("Path of the CSV or JSONL file to import").strip().strip('"')
+    if not os.path.isfile(path):
+        console.print(f"[red]File not found: {path}[/red]")
+        return
+    kind = Prompt.ask(
+        "What does the file contain?",
+        choices=["auto", "sessions", "checkins"],
+        default="auto",
+    )
+    skip_existing = (
+        Prompt.ask(
+            "Skip rows that are already in the database? (slower)",
+            choices=["yes", "no"],
+            default="yes",
+        )
+        == "yes"
+    )
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("{task.fields[rows]} rows"),
+        console=console,
+        transient=True,
+    ) as progress:
+        bar = progress.add_task("Importing...", total=None, rows=0)
+
+        def on_progress(report):
+            progress.update(
+                bar,
+                total=report.total_bytes,
+                completed=report.bytes_read,
+                rows=report.inserted,
+            )
+
+        try:
+            report = import_file(
+                path,
+                kind=None if kind == "auto" else kind,
+                skip_existing=skip_existing,
+                progress=on_progress,
+            )
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Import failed: {e}[/red]")
+            return
+
+    console.print(
+        f"[green]Imported {report.inserted} {report.kind}[/green] "
+        f"(read {report.read}, {report.skipped} already present, "
+        f"{report.invalid} invalid)"
+    )
+    for line_number, message in report.errors[:10]:
+        where = f"line {line_number}" if line_number else "row"
+        console.print(f"[yellow]{where}: {message}[/yellow]")
+    if report.invalid > 10:
+        console.print(f"[yellow]... and {report.invalid - 10} more[/yellow]")
+
+
+def _ask_optional_date(console, prompt):
+    while True:
+        date_str = Prompt.ask(prompt, default="").strip()
+        if not date_str:
+            return None
+        try:
+            datetime.strptime(date_str, "%Y-%m-%d")
+            return date_str
+        except ValueError:
+            console.print("[red]Invalid date format. Please use YYYY-MM-DD[/red]")
+
+
+def export_data(console):
+    from apologies_for_being_human.exporter import export
+
+    kind = Prompt.ask(
+        "What do you want to export?",
+        choices=["sessions", "checkins"],
+        default="sessions",
+    )
+    path = (
+        Prompt.ask(
+            "Output file (.csv, .jsonl, add .gz to compress)",
+            default=f"{kind}-{datetime.now():%Y%m%d}.csv",
+        )
+        .strip()
+        .strip('"')
+    )
+    incremental = (
+        Prompt.ask(
+            "Only rows added since the last incremental export?",
+            choices=["yes", "no"],
+            default="no",
+        )
+        == "yes"
+    )
+    since = _ask_optional_date(console, "From date (YYYY-MM-DD, Enter for no limit)")
+    until = _ask_optional_date(console, "To date (YYYY-MM-DD, Enter for no limit)")
+    task = Prompt.ask("Only this task name (Enter for all)", default="").strip() or None
+
+    try:
+        with console.status("Exporting..."):
+            report = export(
+                kind,
+                path,
+                since=since,
+                until=until,
+                task=task,
+                incremental=incremental,
             )
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Export failed: {e}[/red]")
+        return
+    console.print(f"[green]Exported {report.rows} {kind} to {report.path}[/green]")
 
 
 def create_checkin_task(console):
@@ -192,6 +392,14 @@ def create_checkin_task(console):
     console.print(f"[green]Check-in task '{task_name}' created successfully![/green]")
 
 
+def _checkin_task_ids(tasks):
+    """{lowercased name: checkin_task_id}; the first task wins on duplicates."""
+    ids = {}
+    for task_id, name, _ in tasks:
+        ids.setdefault(name.lower(), task_id)
+    return ids
+
+
 def checkin(console):
     tasks = get_checkin_tasks()
     if not tasks:
@@ -206,14 +414,12 @@ def checkin(console):
     task_input = Prompt.ask("Enter the task ID or name to check-in")
     try:
         task_id = int(task_input)
-        if task_id not in [task[0] for task in tasks]:
+        if task_id not in {task[0] for task in tasks}:
             console.print("[red]Invalid task ID.[/red]")
             return
     except ValueError:
-        task_names = [task[1].lower() for task in tasks]
-        if task_input.lower() in task_names:
-            task_id = tasks[task_names.index(task_input.lower())][0]
-        else:
+        task_id = _checkin_task_ids(tasks).get(task_input.lower())
+        if task_id is None:
             console.print("[red]Invalid task name.[/red]")
             return
     success = (
@@ -236,7 +442,8 @@ def view_checkin_records(console):
         default="all",
     )
     if choice == "all":
-        records = get_checkin_records()
+        task_id = None
+        date_str = None
     elif choice == "by_task":
         tasks = get_checkin_tasks()
         task_choices = [f"{task[0]}: {task[1]}" for task in tasks]
@@ -246,25 +453,32 @@ def view_checkin_records(console):
         task_input = Prompt.ask("Enter the task ID or name")
         try:
             task_id = int(task_input)
-            if task_id not in [task[0] for task in tasks]:
+            if task_id not in {task[0] for task in tasks}:
                 console.print("[red]Invalid task ID.[/red]")
                 return
         except ValueError:
-            task_names = [task[1].lower() for task in tasks]
-            if task_input.lower() in task_names:
-                task_id = tasks[task_names.index(task_input.lower())][0]
-            else:
+            task_id = _checkin_task_ids(tasks).get(task_input.lower())
+            if task_id is None:
                 console.print("[red]Invalid task name.[/red]")
                 return
-        records = get_checkin_records(checkin_task_id=task_id)
+        date_str = None
     elif choice == "by_date":
+        task_id = None
         date_str = Prompt.ask("Enter date (YYYY-MM-DD)")
-        records = get_checkin_records(date=date_str)
 
-    if not records:
-        console.print("[yellow]No records found.[/yellow]")
-        return
+    browse_pages(
+        console,
+        partial(
+            get_checkin_record_page,
+            page_size=PAGE_SIZE,
+            checkin_task_id=task_id,
+            date=date_str,
+        ),
+        _checkin_record_table,
+    )
+
 
+def _checkin_record_table(records):
     table = Table(title="📘 Check-in Records", title_style="bold green")
     table.add_column("Task Name")
     table.add_column("Check-in Time")
@@ -275,5 +489,4 @@ def view_checkin_records(console):
         task_name, checkin_time, success, note = record
         success_str = "Yes" if success else "No"
         table.add_row(task_name, checkin_time, success_str, note)
-
-    console.print(table)
+    return table
@@ -2,176 +2,1219 @@
 SQLite-based task logger
 """
 
-import sqlite3
 import os
-from datetime import datetime
+import sqlite3
+import uuid
+from dataclasses import dataclass
+from datetime import date as date_type, datetime, timedelta
+
+from apologies_for_being_human import archive
+from apologies_for_being_human.config import resolve_db_path
+from apologies_for_being_human.connection import get_connection, transaction
+from apologies_for_being_human.instrumentation import instrument_module
+from apologies_for_being_human.query_cache import cached, writes
+
+# Resolved on first use rather than at import: a bad profile name or config
+# file then fails the command that needs the database, with a clean error.
+DB_FILE = None
+
+
+def database_path():
+    """The database file of this process, resolved from config.py on first use."""
+    global DB_FILE
+    if DB_FILE is None:
+        DB_FILE = resolve_db_path()
+    return DB_FILE
 
-DB_FILE = os.path.join(os.getcwd(), "logs", "apologies_for_being_human.db")
+
+def use_database(path=None, profile=None):
+    """Switch this process to another database file or named profile."""
+    global DB_FILE
+    DB_FILE = os.path.abspath(path) if path else resolve_db_path(profile)
+    return DB_FILE
 
 
 def connect_db():
-    """Connect to the SQLite database."""
-    return sqlite3.connect(DB_FILE)
+    """Return this thread's shared connection to the SQLite database."""
+    return get_connection(database_path())
 
 
-def init_db():
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+def _migrate_base_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            duration REAL NOT NULL,
+            distractions INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS checkin_tasks (
+            checkin_task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            checkin_task_name TEXT UNIQUE NOT NULL,
+            description TEXT,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS checkin_records (
+            checkin_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            checkin_task_id INTEGER NOT NULL,
+            checkin_time TEXT NOT NULL,
+            success BOOLEAN NOT NULL,
+            note TEXT,
+            FOREIGN KEY (checkin_task_id) REFERENCES checkin_tasks (checkin_task_id)
+        )
+    """)
+
+
+def _migrate_date_columns_and_indexes(conn):
+    # Virtual generated columns cost no storage and can be indexed, which turns
+    # `date(start_time) = ?` style lookups into index seeks.
+    conn.execute(
+        "ALTER TABLE tasks ADD COLUMN start_date TEXT "
+        "GENERATED ALWAYS AS (substr(start_time, 1, 10)) VIRTUAL"
+    )
+    conn.execute(
+        "ALTER TABLE checkin_records ADD COLUMN checkin_date TEXT "
+        "GENERATED ALWAYS AS (substr(checkin_time, 1, 10)) VIRTUAL"
+    )
+    conn.execute("CREATE INDEX idx_tasks_start_time ON tasks (start_time)")
+    conn.execute(
+        "CREATE INDEX idx_tasks_task_name_start_time ON tasks (task_name, start_time)"
+    )
+    conn.execute("CREATE INDEX idx_tasks_start_date ON tasks (start_date, start_time)")
+    conn.execute(
+        "CREATE INDEX idx_checkin_records_task_time "
+        "ON checkin_records (checkin_task_id, checkin_time)"
+    )
+    conn.execute(
+        "CREATE INDEX idx_checkin_records_time ON checkin_records (checkin_time)"
+    )
+    conn.execute(
+        "CREATE INDEX idx_checkin_records_date "
+        "ON checkin_records (checkin_date, checkin_time)"
+    )
+
+
+def _migrate_export_state(conn):
+    # High-water marks for incremental exports, one row per named export.
+    conn.execute("""
+        CREATE TABLE export_state (
+            name TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            last_id INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+
+
+def _migrate_checkin_task_stats(conn):
+    # Per-task summary kept in step with checkin_records by log_checkin, so the
+    # statistics screen reads one row per task instead of aggregating history.
+    conn.execute("""
+        CREATE TABLE checkin_task_stats (
+            checkin_task_id INTEGER PRIMARY KEY
+                REFERENCES checkin_tasks (checkin_task_id),
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            last_checkin TEXT,
+            last_success_date TEXT,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            longest_streak INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    _write_checkin_stats(conn, compute_checkin_stats(conn, archived=False))
+
+
+def _migrate_focus_rollups(conn):
+    # Per-day and per-week focus totals by task, maintained by log_task and
+    # the importer so analytics never has to group the whole tasks table.
+    # Weeks are ISO weeks keyed by their Monday.
+    for table, key in (("focus_daily", "day"), ("focus_weekly", "week_start")):
+        conn.execute(f"""
+            CREATE TABLE {table} (
+                {key} TEXT NOT NULL,
                 task_name TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                duration REAL NOT NULL,
-                distractions INTEGER NOT NULL
-            )
+                minutes REAL NOT NULL,
+                sessions INTEGER NOT NULL,
+                distractions INTEGER NOT NULL,
+                PRIMARY KEY ({key}, task_name)
+            ) WITHOUT ROWID
         """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS checkin_tasks (
-                checkin_task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                checkin_task_name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                created_at TEXT NOT NULL
-            )
-        """)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS checkin_records (
-                checkin_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                checkin_task_id INTEGER NOT NULL,
-                checkin_time TEXT NOT NULL,
-                success BOOLEAN NOT NULL,
-                note TEXT,
-                FOREIGN KEY (checkin_task_id) REFERENCES checkin_tasks (checkin_task_id)
-            )
+        conn.execute(f"CREATE INDEX idx_{table}_task ON {table} (task_name, {key})")
+    # tasks still carries the name itself here; the catalog arrives in step 8.
+    for table, (key, expression) in _ROLLUP_KEYS.items():
+        conn.execute(
+            f"INSERT INTO {table} ({key}, task_name, minutes, sessions, distractions) "
+            f"SELECT {expression}, task_name, SUM(duration), COUNT(*), "
+            f"SUM(distractions) FROM tasks GROUP BY {expression}, task_name"
+        )
+
+
+def _migrate_seed_checkin_tasks(conn):
+    # Seeding used to run on every launch; as a migration it runs once.
+    initial_tasks = [
+        "Slept early yesterday, woke up early today, got 8 hours of sleep",
+        "Exercised as planned",
+        "Did algorithm or programming",
+        "Processed emails",
+        "Checked schedules and notes",
+        "Kept in mind that energy is finite, so I should not waste it",
+        "Nothing can really get me out of pain, so endure or be eliminated",
+        "Sorry for being human",
+    ]
+
+    for task_name in initial_tasks:
+        conn.execute(
+            "INSERT OR IGNORE INTO checkin_tasks (checkin_task_name, description, created_at) VALUES (?, ?, ?)",
+            (task_name, "", datetime.now().isoformat()),
+        )
+
+
+# One FTS5 index over task names, check-in notes and check-in task
+# names/descriptions. Rowids encode the source row (id * 4 + kind offset) so
+# triggers can find their document.
+SEARCH_RECORD_TRIGGERS = (
+    """CREATE TRIGGER search_notes_ai AFTER INSERT ON checkin_records
+       WHEN coalesce(NEW.note, '') <> ''
+       BEGIN
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.checkin_record_id * 4 + 1, NEW.note, 'note',
+                   NEW.checkin_record_id);
+       END""",
+    """CREATE TRIGGER search_notes_ad AFTER DELETE ON checkin_records
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.checkin_record_id * 4 + 1;
+       END""",
+    """CREATE TRIGGER search_notes_au AFTER UPDATE OF note ON checkin_records
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.checkin_record_id * 4 + 1;
+           INSERT INTO search_index (rowid, body, kind, ref)
+           SELECT NEW.checkin_record_id * 4 + 1, NEW.note, 'note',
+                  NEW.checkin_record_id
+           WHERE coalesce(NEW.note, '') <> '';
+       END""",
+    """CREATE TRIGGER search_checkin_tasks_ai AFTER INSERT ON checkin_tasks
+       BEGIN
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.checkin_task_id * 4 + 2,
+                   NEW.checkin_task_name || coalesce(' ' || nullif(NEW.description, ''), ''),
+                   'checkin_task', NEW.checkin_task_id);
+       END""",
+    """CREATE TRIGGER search_checkin_tasks_ad AFTER DELETE ON checkin_tasks
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.checkin_task_id * 4 + 2;
+       END""",
+    """CREATE TRIGGER search_checkin_tasks_au
+       AFTER UPDATE OF checkin_task_name, description ON checkin_tasks
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.checkin_task_id * 4 + 2;
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.checkin_task_id * 4 + 2,
+                   NEW.checkin_task_name || coalesce(' ' || nullif(NEW.description, ''), ''),
+                   'checkin_task', NEW.checkin_task_id);
+       END""",
+)
+# As shipped in migration 7, before the catalog: a task name was indexed
+# once, keyed by the first session that used it. Migration 8 drops these with
+# the old tasks table and indexes the catalog instead.
+_SESSION_TASK_NAME_TRIGGERS = (
+    """CREATE TRIGGER search_tasks_ai AFTER INSERT ON tasks
+       WHEN NOT EXISTS (SELECT 1 FROM tasks
+                        WHERE task_name = NEW.task_name AND task_id <> NEW.task_id)
+       BEGIN
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.task_id * 4, NEW.task_name, 'task', NEW.task_name);
+       END""",
+    """CREATE TRIGGER search_tasks_ad AFTER DELETE ON tasks
+       WHEN NOT EXISTS (SELECT 1 FROM tasks WHERE task_name = OLD.task_name)
+       BEGIN
+           DELETE FROM search_index WHERE kind = 'task' AND ref = OLD.task_name;
+       END""",
+    """CREATE TRIGGER search_tasks_au AFTER UPDATE OF task_name ON tasks
+       BEGIN
+           DELETE FROM search_index WHERE kind = 'task' AND ref = OLD.task_name
+               AND NOT EXISTS (SELECT 1 FROM tasks WHERE task_name = OLD.task_name);
+           INSERT INTO search_index (rowid, body, kind, ref)
+           SELECT NEW.task_id * 4, NEW.task_name, 'task', NEW.task_name
+           WHERE NOT EXISTS (SELECT 1 FROM search_index
+                             WHERE kind = 'task' AND ref = NEW.task_name);
+       END""",
+)
+# Task names are indexed from the task_names catalog (migration 8).
+SEARCH_TASK_NAME_TRIGGERS = (
+    """CREATE TRIGGER search_task_names_ai AFTER INSERT ON task_names
+       BEGIN
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.task_name_id * 4, NEW.task_name, 'task', NEW.task_name);
+       END""",
+    """CREATE TRIGGER search_task_names_ad AFTER DELETE ON task_names
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.task_name_id * 4;
+       END""",
+    """CREATE TRIGGER search_task_names_au AFTER UPDATE OF task_name ON task_names
+       BEGIN
+           DELETE FROM search_index WHERE rowid = OLD.task_name_id * 4;
+           INSERT INTO search_index (rowid, body, kind, ref)
+           VALUES (NEW.task_name_id * 4, NEW.task_name, 'task', NEW.task_name);
+       END""",
+)
+SEARCH_TABLE = """
+    CREATE VIRTUAL TABLE search_index USING fts5 (
+        body, kind UNINDEXED, ref UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+"""
+
+
+def has_search_index(conn=None):
+    conn = conn or connect_db()
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+        ).fetchone()
+        is not None
+    )
+
+
+def _fill_search_records(conn):
+    conn.execute("""
+        INSERT INTO search_index (rowid, body, kind, ref)
+        SELECT checkin_record_id * 4 + 1, note, 'note', checkin_record_id
+        FROM checkin_records WHERE coalesce(note, '') <> ''
+    """)
+    conn.execute("""
+        INSERT INTO search_index (rowid, body, kind, ref)
+        SELECT checkin_task_id * 4 + 2,
+               checkin_task_name || coalesce(' ' || nullif(description, ''), ''),
+               'checkin_task', checkin_task_id
+        FROM checkin_tasks
+    """)
+
+
+def _fill_search_task_names(conn):
+    conn.execute("""
+        INSERT INTO search_index (rowid, body, kind, ref)
+        SELECT task_name_id * 4, task_name, 'task', task_name FROM task_names
+    """)
+
+
+def _migrate_search_index(conn):
+    try:
+        conn.execute(SEARCH_TABLE)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: everything else keeps working and
+        # search reports itself unavailable.
+        if "fts5" not in str(e):
+            raise
+        return
+    for trigger in _SESSION_TASK_NAME_TRIGGERS + SEARCH_RECORD_TRIGGERS:
+        conn.execute(trigger)
+    conn.execute("""
+        INSERT INTO search_index (rowid, body, kind, ref)
+        SELECT min(task_id) * 4, task_name, 'task', task_name
+        FROM tasks GROUP BY task_name
+    """)
+    _fill_search_records(conn)
+
+
+def _migrate_task_catalog(conn):
+    # Session rows reference a catalog of distinct task names by integer id,
+    # instead of repeating the name; tasks is rebuilt in place, keeping ids.
+    conn.execute("""
+        CREATE TABLE task_names (
+            task_name_id INTEGER PRIMARY KEY,
+            task_name TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.execute("""
+        INSERT INTO task_names (task_name)
+        SELECT task_name FROM tasks GROUP BY task_name ORDER BY min(task_id)
+    """)
+    sequence = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'tasks'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE tasks_new (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_name_id INTEGER NOT NULL REFERENCES task_names (task_name_id),
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            duration REAL NOT NULL,
+            distractions INTEGER NOT NULL,
+            start_date TEXT GENERATED ALWAYS AS (substr(start_time, 1, 10)) VIRTUAL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO tasks_new
+            (task_id, task_name_id, start_time, end_time, duration, distractions)
+        SELECT t.task_id, n.task_name_id, t.start_time, t.end_time, t.duration,
+               t.distractions
+        FROM tasks t JOIN task_names n ON n.task_name = t.task_name
+        ORDER BY t.task_id
+    """)
+    conn.execute("DROP TABLE tasks")  # also drops its indexes and triggers
+    conn.execute("ALTER TABLE tasks_new RENAME TO tasks")
+    if sequence:
+        conn.execute(
+            "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'tasks'",
+            sequence,
+        )
+    conn.execute("CREATE INDEX idx_tasks_start_time ON tasks (start_time)")
+    conn.execute(
+        "CREATE INDEX idx_tasks_task_name_id_start_time "
+        "ON tasks (task_name_id, start_time)"
+    )
+    conn.execute("CREATE INDEX idx_tasks_start_date ON tasks (start_date, start_time)")
+    if has_search_index(conn):
+        # Databases indexed by the previous release keyed task names by session.
+        conn.execute("DELETE FROM search_index WHERE kind = 'task'")
+        for trigger in SEARCH_TASK_NAME_TRIGGERS:
+            conn.execute(trigger)
+        _fill_search_task_names(conn)
+
+
+def _migrate_active_sessions(conn):
+    # Journal of sessions still running; see journal.py. A row outliving its
+    # process is an orphan that the next launch resumes or logs.
+    conn.execute("""
+        CREATE TABLE active_sessions (
+            session_id INTEGER PRIMARY KEY,
+            task_name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            duration_seconds REAL NOT NULL,
+            elapsed_seconds REAL NOT NULL DEFAULT 0,
+            reminder_index INTEGER NOT NULL DEFAULT 0,
+            distractions INTEGER NOT NULL DEFAULT 0,
+            pid INTEGER NOT NULL,
+            checkpoint_time TEXT NOT NULL
+        )
+    """)
+
+
+def _migrate_archive_manifest(conn):
+    # One row per archived month segment; see archive.py.
+    conn.execute("""
+        CREATE TABLE archive_segments (
+            kind TEXT NOT NULL,
+            month TEXT NOT NULL,
+            file TEXT NOT NULL,
+            generation INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            min_date TEXT NOT NULL,
+            max_date TEXT NOT NULL,
+            min_id INTEGER NOT NULL,
+            max_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (kind, month)
+        ) WITHOUT ROWID
+    """)
+
+
+def _migrate_sync(conn):
+    # Multi-machine sync; see sync.py. `origin` is the device a row was synced
+    # from (NULL for rows created here), so synced rows are never sent back.
+    for table in ("tasks", "checkin_tasks", "checkin_records"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN origin TEXT")
+    conn.execute("""
+        CREATE TABLE sync_device (
+            device_id TEXT PRIMARY KEY,
+            next_seq INTEGER NOT NULL,
+            last_task_id INTEGER NOT NULL,
+            last_checkin_task_id INTEGER NOT NULL,
+            last_checkin_record_id INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        "INSERT INTO sync_device VALUES (?, 1, 0, 0, 0)", (uuid.uuid4().hex[:12],)
+    )
+    conn.execute("""
+        CREATE TABLE sync_peers (
+            device_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+ROW_EDIT_COLUMNS = {
+    "tasks": ("task_name_id", "start_time", "end_time", "duration", "distractions"),
+    "checkin_records": ("checkin_task_id", "checkin_time", "success"),
+}
+
+
+def _migrate_row_edits(conn):
+    # Updates in place to the columns derived data is built from (a sync
+    # merge, a correction, a task merge) bump a counter per table, so
+    # caches that only append new rows, like the columnar snapshot, can tell
+    # they went stale. Inserts and deletes do not count.
+    conn.execute("""
+        CREATE TABLE row_edits (
+            table_name TEXT PRIMARY KEY,
+            edits INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    for table, columns in ROW_EDIT_COLUMNS.items():
+        conn.execute("INSERT INTO row_edits VALUES (?, 0)", (table,))
+        changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+        conn.execute(f"""
+            CREATE TRIGGER {table}_edited AFTER UPDATE OF {", ".join(columns)}
+            ON {table} WHEN {changed} BEGIN
+                UPDATE row_edits SET edits = edits + 1 WHERE table_name = '{table}';
+            END
         """)
 
-        initial_tasks = [
-            "Slept early yesterday, woke up early today, got 8 hours of sleep",
-            "Exercised as planned",
-            "Did algorithm or programming",
-            "Processed emails",
-            "Checked schedules and notes",
-            "Kept in mind that energy is finite, so I should not waste it",
-            "Nothing can really get me out of pain, so endure or be eliminated",
-            "Sorry for being human",
-        ]
-
-        for task_name in initial_tasks:
-            conn.execute(
-                "INSERT OR IGNORE INTO checkin_tasks (checkin_task_name, description, created_at) VALUES (?, ?, ?)",
-                (task_name, "", datetime.now().isoformat()),
+
+def get_row_edits(conn=None):
+    """{table: edits} of the tables in ROW_EDIT_COLUMNS."""
+    conn = conn or connect_db()
+    return dict(conn.execute("SELECT table_name, edits FROM row_edits"))
+
+
+def rebuild_search_index():
+    """Recreate the full-text index from the tables and compact it."""
+    with transaction(connect_db()) as conn:
+        if has_search_index(conn):
+            conn.execute("DELETE FROM search_index")
+        else:
+            conn.execute(SEARCH_TABLE)
+            for trigger in SEARCH_RECORD_TRIGGERS + SEARCH_TASK_NAME_TRIGGERS:
+                conn.execute(trigger)
+        _fill_search_task_names(conn)
+        _fill_search_records(conn)
+    connect_db().execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+# Append-only: each entry upgrades the schema by one PRAGMA user_version step.
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_date_columns_and_indexes,
+    _migrate_export_state,
+    _migrate_checkin_task_stats,
+    _migrate_focus_rollups,
+    _migrate_seed_checkin_tasks,
+    _migrate_search_index,
+    _migrate_task_catalog,
+    _migrate_active_sessions,
+    _migrate_archive_manifest,
+    _migrate_sync,
+    _migrate_row_edits,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn=None):
+    conn = conn or connect_db()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn=None):
+    """Apply pending migrations in place, one transaction per step."""
+    conn = conn or connect_db()
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this program "
+            f"supports ({SCHEMA_VERSION}). Please upgrade."
+        )
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with transaction(conn):
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+
+def init_db():
+    """Bring the database up to date; a no-op beyond one PRAGMA when it already is."""
+    conn = connect_db()
+    if get_schema_version(conn) == SCHEMA_VERSION:
+        return
+    migrate(conn)
+
+
+def resolve_task_names(conn, names, ids=None):
+    """Map each of `names` to its task_name_id, adding unknown names to the
+    catalog. Pass the returned dict back as `ids` to skip repeat lookups."""
+    ids = {} if ids is None else ids
+    for name in names:
+        if name in ids:
+            continue
+        row = conn.execute(
+            "SELECT task_name_id FROM task_names WHERE task_name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            row = (
+                conn.execute(
+                    "INSERT INTO task_names (task_name) VALUES (?)", (name,)
+                ).lastrowid,
             )
+        ids[name] = row[0]
+    return ids
 
 
+@writes("tasks", "task_names", "focus_daily", "focus_weekly")
 def log_task(task_name, start_time, end_time, distractions):
     duration = round((end_time - start_time).total_seconds() / 60, 2)
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute(
-            "INSERT INTO tasks (task_name, start_time, end_time, duration, distractions) VALUES (?, ?, ?, ?, ?)",
+    with transaction(connect_db()) as conn:
+        cur = conn.execute(
+            "INSERT INTO tasks (task_name_id, start_time, end_time, duration, distractions) VALUES (?, ?, ?, ?, ?)",
             (
-                task_name,
+                resolve_task_names(conn, [task_name])[task_name],
                 start_time.isoformat(),
                 end_time.isoformat(),
                 duration,
                 distractions,
             ),
         )
+        apply_sessions_to_rollups(conn, after_task_id=cur.lastrowid - 1)
 
 
-def get_logs(limit=20):
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.execute(
-            "SELECT task_name, start_time, end_time, duration, distractions FROM tasks ORDER BY start_time DESC LIMIT ?",
-            (limit,),
+SESSIONS_FROM = "tasks t JOIN task_names n ON n.task_name_id = t.task_name_id"
+
+_ROLLUP_KEYS = {
+    "focus_daily": ("day", "start_date"),
+    "focus_weekly": ("week_start", "date(start_date, 'weekday 0', '-6 days')"),
+}
+
+
+def get_max_task_id(conn=None):
+    conn = conn or connect_db()
+    return conn.execute("SELECT coalesce(max(task_id), 0) FROM tasks").fetchone()[0]
+
+
+def apply_sessions_to_rollups(conn, after_task_id=0):
+    """Add sessions with task_id > `after_task_id` to the daily/weekly rollups.
+
+    Call inside the transaction that inserted them; only the new rows are read.
+    """
+    for table, (key, expression) in _ROLLUP_KEYS.items():
+        conn.execute(
+            f"INSERT INTO {table} ({key}, task_name, minutes, sessions, distractions) "
+            f"SELECT {expression}, n.task_name, SUM(t.duration), COUNT(*), "
+            f"SUM(t.distractions) FROM {SESSIONS_FROM} WHERE t.task_id > ? "
+            f"GROUP BY {expression}, t.task_name_id "
+            f"ON CONFLICT ({key}, task_name) DO UPDATE SET "
+            "minutes = minutes + excluded.minutes, "
+            "sessions = sessions + excluded.sessions, "
+            "distractions = distractions + excluded.distractions",
+            (after_task_id,),
         )
-        return cursor.fetchall()
 
 
-def get_all_sessions():
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute(
-            "SELECT task_name, start_time, end_time, duration, distractions FROM tasks ORDER BY start_time DESC"
+@writes("focus_daily", "focus_weekly")
+def rebuild_rollups():
+    """Recompute the daily and weekly rollups from the tasks table and the
+    archived sessions."""
+    with transaction(connect_db()) as conn:
+        for table in _ROLLUP_KEYS:
+            conn.execute(f"DELETE FROM {table}")
+        apply_sessions_to_rollups(conn)
+        weekly = {}
+        for (day, name), (minutes, sessions, distractions) in archive.session_totals(
+            conn
+        ).items():
+            entry = weekly.setdefault((_week_start(day), name), [0.0, 0, 0])
+            entry[0] += minutes
+            entry[1] += sessions
+            entry[2] += distractions
+            _add_to_rollup(
+                conn, "focus_daily", day, name, minutes, sessions, distractions
+            )
+        for (week, name), totals in weekly.items():
+            _add_to_rollup(conn, "focus_weekly", week, name, *totals)
+
+
+def _week_start(day):
+    day = date_type.fromisoformat(day)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def adjust_rollups(conn, task_name, day, minutes, sessions=0, distractions=0):
+    """Add (or, with negative values, take away) totals for one day and task
+    in both rollups; for sessions changed after they were counted."""
+    _add_to_rollup(conn, "focus_daily", day, task_name, minutes, sessions, distractions)
+    _add_to_rollup(
+        conn,
+        "focus_weekly",
+        _week_start(day),
+        task_name,
+        minutes,
+        sessions,
+        distractions,
+    )
+
+
+def _add_to_rollup(conn, table, key_value, task_name, minutes, sessions, distractions):
+    key = _ROLLUP_KEYS[table][0]
+    conn.execute(
+        f"INSERT INTO {table} ({key}, task_name, minutes, sessions, distractions) "
+        "VALUES (?, ?, ?, ?, ?) "
+        f"ON CONFLICT ({key}, task_name) DO UPDATE SET "
+        "minutes = minutes + excluded.minutes, "
+        "sessions = sessions + excluded.sessions, "
+        "distractions = distractions + excluded.distractions",
+        (key_value, task_name, minutes, sessions, distractions),
+    )
+
+
+SESSION_COLUMNS = (
+    "n.task_name, t.start_time, t.end_time, t.duration, t.distractions "
+    f"FROM {SESSIONS_FROM}"
+)
+CHECKIN_RECORD_COLUMNS = (
+    "ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
+    "FROM checkin_records cr "
+    "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id"
+)
+
+# Per-task filters compare integer ids; the name is looked up once per query.
+TASK_NAME_FILTER = (
+    "t.task_name_id = (SELECT task_name_id FROM task_names WHERE task_name = ?)"
+)
+
+SQL_LOGS = f"SELECT {SESSION_COLUMNS} ORDER BY t.start_time DESC LIMIT ?"
+SQL_ALL_SESSIONS = f"SELECT {SESSION_COLUMNS} ORDER BY t.start_time DESC"
+SQL_SESSIONS_BY_DATE = (
+    f"SELECT {SESSION_COLUMNS} WHERE t.start_date = ? ORDER BY t.start_time"
+)
+SQL_SESSIONS_BY_TASK = (
+    f"SELECT {SESSION_COLUMNS} WHERE {TASK_NAME_FILTER} ORDER BY t.start_time DESC"
+)
+SQL_DISTINCT_TASKS = "SELECT task_name FROM task_names ORDER BY task_name"
+SQL_CHECKIN_RECORDS = f"SELECT {CHECKIN_RECORD_COLUMNS} ORDER BY cr.checkin_time"
+SQL_CHECKIN_RECORDS_BY_TASK = (
+    f"SELECT {CHECKIN_RECORD_COLUMNS} "
+    "WHERE cr.checkin_task_id = ? ORDER BY cr.checkin_time"
+)
+SQL_CHECKIN_RECORDS_BY_DATE = (
+    f"SELECT {CHECKIN_RECORD_COLUMNS} "
+    "WHERE cr.checkin_date = ? ORDER BY cr.checkin_time"
+)
+SQL_CHECKIN_RECORDS_BY_TASK_AND_DATE = (
+    f"SELECT {CHECKIN_RECORD_COLUMNS} "
+    "WHERE cr.checkin_task_id = ? AND cr.checkin_date = ? ORDER BY cr.checkin_time"
+)
+
+SESSION_PAGE_SELECT = (
+    "SELECT n.task_name, t.start_time, t.end_time, t.duration, t.distractions, "
+    f"t.start_time, t.task_id FROM {SESSIONS_FROM}"
+)
+SESSION_PAGE_KEY = ("t.start_time", "t.task_id")
+CHECKIN_RECORD_PAGE_SELECT = (
+    "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note, "
+    "cr.checkin_time, cr.checkin_record_id "
+    "FROM checkin_records cr "
+    "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id"
+)
+CHECKIN_RECORD_PAGE_KEY = ("cr.checkin_time", "cr.checkin_record_id")
+
+
+@dataclass
+class Page:
+    """One keyset page; pass first_key/last_key back as the cursor to move."""
+
+    rows: list
+    first_key: tuple | None
+    last_key: tuple | None
+    has_previous: bool
+    has_next: bool
+
+
+def _page_sql(select, key, filters, cursor, descending):
+    conditions = list(filters)
+    if cursor is not None:
+        conditions.append(f"({key[0]}, {key[1]}) {'<' if descending else '>'} (?, ?)")
+    sql = select
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    order = "DESC" if descending else "ASC"
+    return sql + f" ORDER BY {key[0]} {order}, {key[1]} {order} LIMIT ?"
+
+
+# Archived rows (archive.COLUMNS order) in the shape of the page queries.
+_ARCHIVED_PAGE_ROW = {
+    "sessions": lambda row: (*row[1:6], row[2], row[0]),
+    "checkins": lambda row: (*row[2:6], row[3], row[0]),
+}
+
+
+def _merge_archived(kind, rows, cursor, descending, limit, filters):
+    """Merge the archived rows that belong on this page into `rows`."""
+    bound = tuple(rows[-1][-2:]) if len(rows) >= limit else None
+    archived = archive.page_rows(
+        connect_db(), kind, cursor, descending, limit, bound, **filters
+    )
+    if not archived:
+        return rows
+    rows = rows + [_ARCHIVED_PAGE_ROW[kind](row) for row in archived]
+    rows.sort(key=lambda row: (row[-2], row[-1]), reverse=descending)
+    return rows[:limit]
+
+
+def _fetch_page(
+    select,
+    key,
+    filters,
+    params,
+    cursor,
+    backward,
+    descending,
+    page_size,
+    archive_kind=None,
+    archive_filters=None,
+):
+    """Fetch one page by seeking past `cursor` on the (sort column, id) key.
+
+    Cost depends on the page size only, never on how deep the page is.
+    Going backward runs the same seek in the opposite direction. With
+    `archive_kind`, archived rows matching `archive_filters` are merged in.
+    """
+    query_descending = descending != backward
+    sql = _page_sql(select, key, filters, cursor, query_descending)
+    args = list(params)
+    if cursor is not None:
+        args.extend(cursor)
+    args.append(page_size + 1)
+    rows = connect_db().execute(sql, args).fetchall()
+    if archive_kind is not None:
+        rows = _merge_archived(
+            archive_kind,
+            rows,
+            cursor,
+            query_descending,
+            page_size + 1,
+            archive_filters or {},
         )
-        return cur.fetchall()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+    return Page(
+        rows=[row[:-2] for row in rows],
+        first_key=tuple(rows[0][-2:]) if rows else None,
+        last_key=tuple(rows[-1][-2:]) if rows else None,
+        has_previous=more if backward else cursor is not None,
+        has_next=cursor is not None if backward else more,
+    )
+
+
+def _session_filters(task_name, date):
+    filters, params = [], []
+    if task_name is not None:
+        filters.append(TASK_NAME_FILTER)
+        params.append(task_name)
+    if date is not None:
+        filters.append("t.start_date = ?")
+        params.append(date)
+    return filters, params
+
+
+def _checkin_record_filters(checkin_task_id, date):
+    filters, params = [], []
+    if checkin_task_id:
+        filters.append("cr.checkin_task_id = ?")
+        params.append(checkin_task_id)
+    if date:
+        filters.append("cr.checkin_date = ?")
+        params.append(date)
+    return filters, params
+
+
+# Queries that must be served from an index, with representative parameters.
+HOT_QUERIES = {
+    "get_logs": (SQL_LOGS, (20,)),
+    "get_all_sessions": (SQL_ALL_SESSIONS, ()),
+    "get_sessions_by_date": (SQL_SESSIONS_BY_DATE, ("2000-01-01",)),
+    "get_sessions_by_task": (SQL_SESSIONS_BY_TASK, ("",)),
+    "get_distinct_tasks": (SQL_DISTINCT_TASKS, ()),
+    "get_checkin_records": (SQL_CHECKIN_RECORDS, ()),
+    "get_checkin_records_by_task": (SQL_CHECKIN_RECORDS_BY_TASK, (1,)),
+    "get_checkin_records_by_date": (SQL_CHECKIN_RECORDS_BY_DATE, ("2000-01-01",)),
+    "get_checkin_records_by_task_and_date": (
+        SQL_CHECKIN_RECORDS_BY_TASK_AND_DATE,
+        (1, "2000-01-01"),
+    ),
+    "get_session_page": (
+        _page_sql(SESSION_PAGE_SELECT, SESSION_PAGE_KEY, [], ("", 0), True),
+        ("", 0, 11),
+    ),
+    "get_session_page_by_task": (
+        _page_sql(
+            SESSION_PAGE_SELECT, SESSION_PAGE_KEY, [TASK_NAME_FILTER], ("", 0), True
+        ),
+        ("", "", 0, 11),
+    ),
+    "get_checkin_record_page": (
+        _page_sql(
+            CHECKIN_RECORD_PAGE_SELECT, CHECKIN_RECORD_PAGE_KEY, [], ("", 0), False
+        ),
+        ("", 0, 11),
+    ),
+}
+
+
+def query_plan(sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for `sql`."""
+    rows = connect_db().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[-1] for row in rows]
+
 
+def find_unindexed_queries():
+    """Map each hot query that full-scans a table or sorts in a temp b-tree to its plan."""
+    problems = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = query_plan(sql, params)
+        if any(
+            (step.startswith("SCAN") and "INDEX" not in step) or "TEMP B-TREE" in step
+            for step in plan
+        ):
+            problems[name] = plan
+    return problems
 
+
+# With archived months present, the getters below go through the keyset
+# pages, which merge archived rows in; otherwise one query answers them.
+
+
+@cached("tasks", "task_names")
+def get_logs(limit=20):
+    conn = connect_db()
+    if archive.find_segments(conn, "sessions"):
+        return get_session_page(page_size=limit).rows
+    return conn.execute(SQL_LOGS, (limit,)).fetchall()
+
+
+def get_all_sessions():
+    conn = connect_db()
+    if archive.find_segments(conn, "sessions"):
+        return list(iter_sessions())
+    return conn.execute(SQL_ALL_SESSIONS).fetchall()
+
+
+@cached("tasks", "task_names")
 def get_sessions_by_date(date_str):
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute(
-            "SELECT task_name, start_time, end_time, duration, distractions FROM tasks "
-            "WHERE date(start_time) = ? ORDER BY start_time",
-            (date_str,),
-        )
-        return cur.fetchall()
+    conn = connect_db()
+    if archive.find_segments(conn, "sessions", date_str, date_str):
+        return list(iter_sessions(date=date_str, descending=False))
+    return conn.execute(SQL_SESSIONS_BY_DATE, (date_str,)).fetchall()
 
 
+@cached("tasks", "task_names")
 def get_sessions_by_task(task_name):
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute(
-            "SELECT task_name, start_time, end_time, duration, distractions FROM tasks "
-            "WHERE task_name = ? ORDER BY start_time DESC",
-            (task_name,),
-        )
-        return cur.fetchall()
+    conn = connect_db()
+    if archive.find_segments(conn, "sessions"):
+        return list(iter_sessions(task_name=task_name))
+    return conn.execute(SQL_SESSIONS_BY_TASK, (task_name,)).fetchall()
 
 
+@cached("task_names")
 def get_distinct_tasks():
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("SELECT DISTINCT task_name FROM tasks")
-        return [row[0] for row in cur.fetchall()]
+    conn = connect_db()
+    cur = conn.execute(SQL_DISTINCT_TASKS)
+    return [row[0] for row in cur.fetchall()]
 
 
+@writes("checkin_tasks")
 def create_checkin_task(checkin_task_name, description=""):
-    with sqlite3.connect(DB_FILE) as conn:
+    with transaction(connect_db()) as conn:
         conn.execute(
             "INSERT OR IGNORE INTO checkin_tasks (checkin_task_name, description, created_at) VALUES (?, ?, ?)",
             (checkin_task_name, description, datetime.now().isoformat()),
         )
 
 
+@cached("checkin_tasks")
 def get_checkin_tasks():
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute(
-            "SELECT checkin_task_id, checkin_task_name, description FROM checkin_tasks"
-        )
-        return cur.fetchall()
+    conn = connect_db()
+    cur = conn.execute(
+        "SELECT checkin_task_id, checkin_task_name, description FROM checkin_tasks"
+    )
+    return cur.fetchall()
 
 
+@writes("checkin_records", "checkin_task_stats")
 def log_checkin(checkin_task_id, success=True, note=""):
-    with sqlite3.connect(DB_FILE) as conn:
+    checkin_time = datetime.now().isoformat()
+    with transaction(connect_db()) as conn:
         conn.execute(
             "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, note) VALUES (?, ?, ?, ?)",
-            (checkin_task_id, datetime.now().isoformat(), success, note),
+            (checkin_task_id, checkin_time, success, note),
         )
+        apply_checkin_to_stats(conn, checkin_task_id, checkin_time, success)
 
 
-def get_checkin_records(checkin_task_id=None, date=None):
-    with sqlite3.connect(DB_FILE) as conn:
-        if checkin_task_id and date:
-            cur = conn.execute(
-                "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
-                "FROM checkin_records cr JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
-                "WHERE cr.checkin_task_id = ? AND date(cr.checkin_time) = ?",
-                (checkin_task_id, date),
-            )
-        elif checkin_task_id:
-            cur = conn.execute(
-                "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
-                "FROM checkin_records cr JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
-                "WHERE cr.checkin_task_id = ?",
-                (checkin_task_id,),
-            )
-        elif date:
-            cur = conn.execute(
-                "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
-                "FROM checkin_records cr JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
-                "WHERE date(cr.checkin_time) = ?",
-                (date,),
-            )
-        else:
-            cur = conn.execute(
-                "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
-                "FROM checkin_records cr JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id"
+CHECKIN_STATS_FIELDS = (
+    "total",
+    "completed",
+    "last_checkin",
+    "last_success_date",
+    "current_streak",
+    "longest_streak",
+)
+
+
+def apply_checkin_to_stats(conn, checkin_task_id, checkin_time, success):
+    """Fold one new check-in into checkin_task_stats in O(1)."""
+    row = conn.execute(
+        "SELECT last_checkin, last_success_date, current_streak, longest_streak "
+        "FROM checkin_task_stats WHERE checkin_task_id = ?",
+        (checkin_task_id,),
+    ).fetchone()
+    last_checkin, last_success, current, longest = row or (None, None, 0, 0)
+    day = checkin_time[:10]
+    if success and last_success is not None and day < last_success:
+        # A back-dated success can join or split runs; recount this task.
+        refresh_checkin_stats(conn, [checkin_task_id])
+        return
+    if success and day != last_success:
+        previous_day = (date_type.fromisoformat(day) - timedelta(days=1)).isoformat()
+        current = current + 1 if last_success == previous_day else 1
+        longest = max(longest, current)
+        last_success = day
+    conn.execute(
+        "INSERT INTO checkin_task_stats (checkin_task_id, total, completed, "
+        "last_checkin, last_success_date, current_streak, longest_streak) "
+        "VALUES (?, 1, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (checkin_task_id) DO UPDATE SET "
+        "total = total + 1, completed = completed + excluded.completed, "
+        "last_checkin = excluded.last_checkin, "
+        "last_success_date = excluded.last_success_date, "
+        "current_streak = excluded.current_streak, "
+        "longest_streak = excluded.longest_streak",
+        (
+            checkin_task_id,
+            1 if success else 0,
+            max(last_checkin or "", checkin_time),
+            last_success,
+            current,
+            longest,
+        ),
+    )
+
+
+def compute_checkin_stats(conn=None, checkin_task_ids=None, archived=True):
+    """Recompute summary rows from checkin_records and, with `archived`, the
+    archived check-ins; maps task id -> field tuple."""
+    conn = conn or connect_db()
+    where, params = "", []
+    if checkin_task_ids is not None:
+        ids = list(checkin_task_ids)
+        if not ids:
+            return {}
+        where = f"WHERE checkin_task_id IN ({', '.join('?' * len(ids))})"
+        params = ids
+    stats = {}
+    for task_id, total, completed, last_checkin in conn.execute(
+        "SELECT checkin_task_id, COUNT(*), SUM(success = 1), MAX(checkin_time) "
+        f"FROM checkin_records {where} GROUP BY checkin_task_id",
+        params,
+    ):
+        stats[task_id] = [total, completed, last_checkin, None, 0, 0]
+    success_days = {}
+    for task_id, day in conn.execute(
+        "SELECT DISTINCT checkin_task_id, checkin_date FROM checkin_records "
+        f"{where} {'AND' if where else 'WHERE'} success = 1",
+        params,
+    ):
+        success_days.setdefault(task_id, set()).add(day)
+    if archived:
+        for task_id, checkin_time, success in archive.iter_checkin_history(
+            conn, checkin_task_ids
+        ):
+            entry = stats.setdefault(task_id, [0, 0, None, None, 0, 0])
+            entry[0] += 1
+            entry[1] += success
+            entry[2] = max(entry[2] or "", checkin_time)
+            if success:
+                success_days.setdefault(task_id, set()).add(checkin_time[:10])
+    for task_id, days in success_days.items():
+        entry = stats[task_id]
+        previous = None
+        for day in sorted(days):
+            day = date_type.fromisoformat(day)
+            run = entry[4] + 1 if previous == day - timedelta(days=1) else 1
+            previous = day
+            entry[3] = day.isoformat()
+            entry[4] = run
+            entry[5] = max(entry[5], run)
+    return {task_id: tuple(entry) for task_id, entry in stats.items()}
+
+
+def _write_checkin_stats(conn, stats, checkin_task_ids=None):
+    if checkin_task_ids is None:
+        conn.execute("DELETE FROM checkin_task_stats")
+    else:
+        conn.executemany(
+            "DELETE FROM checkin_task_stats WHERE checkin_task_id = ?",
+            [(task_id,) for task_id in checkin_task_ids],
+        )
+    conn.executemany(
+        "INSERT INTO checkin_task_stats (checkin_task_id, total, completed, "
+        "last_checkin, last_success_date, current_streak, longest_streak) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(task_id, *fields) for task_id, fields in stats.items()],
+    )
+
+
+@writes("checkin_task_stats")
+def refresh_checkin_stats(conn=None, checkin_task_ids=None):
+    """Recompute the summary for the given tasks (all tasks when None)."""
+    conn = conn or connect_db()
+    with transaction(conn):
+        stats = compute_checkin_stats(conn, checkin_task_ids)
+        _write_checkin_stats(conn, stats, checkin_task_ids)
+
+
+@writes("checkin_task_stats")
+def rebuild_checkin_stats(verify_only=False):
+    """Compare checkin_task_stats with a full recompute and rebuild it.
+
+    Returns {checkin_task_id: (stored, expected)} for every task that differed.
+    With `verify_only` the table is left untouched.
+    """
+    conn = connect_db()
+    with transaction(conn):
+        expected = compute_checkin_stats(conn)
+        stored = {
+            row[0]: tuple(row[1:])
+            for row in conn.execute(
+                f"SELECT checkin_task_id, {', '.join(CHECKIN_STATS_FIELDS)} "
+                "FROM checkin_task_stats"
             )
-        return cur.fetchall()
+        }
+        mismatches = {
+            task_id: (stored.get(task_id), expected.get(task_id))
+            for task_id in stored.keys() | expected.keys()
+            if stored.get(task_id) != expected.get(task_id)
+        }
+        if mismatches and not verify_only:
+            _write_checkin_stats(conn, expected)
+    return mismatches
+
+
+@cached("checkin_records", "checkin_tasks")
+def get_checkin_records(checkin_task_id=None, date=None):
+    conn = connect_db()
+    if archive.find_segments(conn, "checkins", date, date):
+        return list(iter_checkin_records(checkin_task_id=checkin_task_id, date=date))
+    if checkin_task_id and date:
+        cur = conn.execute(
+            SQL_CHECKIN_RECORDS_BY_TASK_AND_DATE, (checkin_task_id, date)
+        )
+    elif checkin_task_id:
+        cur = conn.execute(SQL_CHECKIN_RECORDS_BY_TASK, (checkin_task_id,))
+    elif date:
+        cur = conn.execute(SQL_CHECKIN_RECORDS_BY_DATE, (date,))
+    else:
+        cur = conn.execute(SQL_CHECKIN_RECORDS)
+    return cur.fetchall()
+
+
+@cached("focus_daily")
+def get_focus_totals(day):
+    """(minutes, sessions, distractions) logged on `day` (YYYY-MM-DD)."""
+    return (
+        connect_db()
+        .execute(
+            "SELECT coalesce(SUM(minutes), 0), coalesce(SUM(sessions), 0), "
+            "coalesce(SUM(distractions), 0) FROM focus_daily WHERE day = ?",
+            (day,),
+        )
+        .fetchone()
+    )
+
+
+@cached("checkin_records")
+def get_checked_in_task_ids(day):
+    """Ids of check-in tasks with at least one record on `day`."""
+    conn = connect_db()
+    cur = conn.execute(
+        "SELECT DISTINCT checkin_task_id FROM checkin_records WHERE checkin_date = ?",
+        (day,),
+    )
+    ids = {row[0] for row in cur}
+    for _, path in archive.find_segments(conn, "checkins", day, day):
+        ids.update(
+            row[1] for row in archive.load_segment(path) if row[3].startswith(day)
+        )
+    return ids
+
+
+@cached("tasks", "task_names")
+def get_session_page(
+    cursor=None,
+    backward=False,
+    page_size=10,
+    task_name=None,
+    date=None,
+    descending=True,
+):
+    """Return the page of sessions after `cursor` (or before it when `backward`)."""
+    filters, params = _session_filters(task_name, date)
+    return _fetch_page(
+        SESSION_PAGE_SELECT,
+        SESSION_PAGE_KEY,
+        filters,
+        params,
+        cursor,
+        backward,
+        descending,
+        page_size,
+        "sessions",
+        {"task": task_name, "day": date},
+    )
+
+
+def iter_sessions(page_size=500, task_name=None, date=None, descending=True):
+    """Stream sessions page by page without loading the whole table."""
+    cursor = None
+    while True:
+        page = get_session_page(
+            cursor,
+            page_size=page_size,
+            task_name=task_name,
+            date=date,
+            descending=descending,
+        )
+        yield from page.rows
+        if not page.has_next:
+            return
+        cursor = page.last_key
+
+
+@cached("checkin_records", "checkin_tasks")
+def get_checkin_record_page(
+    cursor=None, backward=False, page_size=10, checkin_task_id=None, date=None
+):
+    """Return a page of check-in records in check-in time order."""
+    filters, params = _checkin_record_filters(checkin_task_id, date)
+    return _fetch_page(
+        CHECKIN_RECORD_PAGE_SELECT,
+        CHECKIN_RECORD_PAGE_KEY,
+        filters,
+        params,
+        cursor,
+        backward,
+        False,
+        page_size,
+        "checkins",
+        {"checkin_task_id": checkin_task_id or None, "day": date or None},
+    )
+
+
+def iter_checkin_records(page_size=500, checkin_task_id=None, date=None):
+    """Stream check-in records in time order, page by page."""
+    cursor = None
+    while True:
+        page = get_checkin_record_page(
+            cursor, page_size=page_size, checkin_task_id=checkin_task_id, date=date
+        )
+        yield from page.rows
+        if not page.has_next:
+            return
+        cursor = page.last_key
+
+
+instrument_module(globals(), "db")
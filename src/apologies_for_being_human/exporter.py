@@ -0,0 +1,226 @@
+"""assistant/exporter.py
+Streaming export of sessions and check-ins to CSV or JSONL, optionally gzipped.
+
+Rows are read straight off the SQLite cursor in small batches and written as
+they arrive, so memory use does not depend on the size of the database.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urlencode
+
+from apologies_for_being_human.archive import iter_archived
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.db import SESSIONS_FROM, TASK_NAME_FILTER, connect_db
+
+FETCH_SIZE = 1000
+WRITE_BUFFER = 1 << 20
+
+SESSION_COLUMNS = (
+    "task_id",
+    "task_name",
+    "start_time",
+    "end_time",
+    "duration",
+    "distractions",
+)
+CHECKIN_COLUMNS = (
+    "checkin_record_id",
+    "checkin_task_id",
+    "checkin_task_name",
+    "checkin_time",
+    "success",
+    "note",
+)
+
+_SOURCES = {
+    "sessions": {
+        "columns": SESSION_COLUMNS,
+        "select": (
+            "SELECT t.task_id, n.task_name, t.start_time, t.end_time, t.duration, "
+            f"t.distractions FROM {SESSIONS_FROM}"
+        ),
+        "id": "t.task_id",
+        "date": "t.start_date",
+        "task": TASK_NAME_FILTER,
+    },
+    "checkins": {
+        "columns": CHECKIN_COLUMNS,
+        "select": (
+            "SELECT cr.checkin_record_id, cr.checkin_task_id, ct.checkin_task_name, "
+            "cr.checkin_time, cr.success, cr.note "
+            "FROM checkin_records cr "
+            "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id"
+        ),
+        "id": "cr.checkin_record_id",
+        "date": "cr.checkin_date",
+        "task": "ct.checkin_task_name = ?",
+    },
+}
+
+
+@dataclass
+class ExportReport:
+    kind: str
+    path: str
+    rows: int = 0
+    last_id: int | None = None
+
+
+def _format_of(path):
+    name = path.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {path} (use .csv or .jsonl)")
+
+
+def state_key(name, since=None, until=None, task=None):
+    """The export_state row of an incremental export with these filters.
+
+    Rows a filter leaves out are still below the mark it advances to, so
+    each filter set keeps its own mark; an unfiltered export uses `name`.
+    """
+    filters = {"since": since, "until": until, "task": task}
+    filters = {key: value for key, value in filters.items() if value}
+    return f"{name}?{urlencode(filters)}" if filters else name
+
+
+def get_high_water(name):
+    """Return the last exported id stored for an incremental export, or 0."""
+    row = (
+        connect_db()
+        .execute("SELECT last_id FROM export_state WHERE name = ?", (name,))
+        .fetchone()
+    )
+    return row[0] if row else 0
+
+
+def _set_high_water(name, kind, last_id):
+    with transaction(connect_db()) as conn:
+        conn.execute(
+            "INSERT INTO export_state (name, kind, last_id, updated_at) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "last_id = excluded.last_id, updated_at = excluded.updated_at",
+            (name, kind, last_id, datetime.now().isoformat()),
+        )
+
+
+def iter_rows(kind, since=None, until=None, task=None, after_id=None):
+    """Yield export rows: archived months first (only the segments the date
+    range touches), then the hot table in id order straight from the cursor."""
+    source = _SOURCES[kind]
+    conditions, params = [], []
+    if since:
+        conditions.append(f"{source['date']} >= ?")
+        params.append(since)
+    if until:
+        conditions.append(f"{source['date']} <= ?")
+        params.append(until)
+    if task:
+        conditions.append(source["task"])
+        params.append(task)
+    if after_id:
+        conditions.append(f"{source['id']} > ?")
+        params.append(after_id)
+    sql = source["select"]
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {source['id']}"
+
+    conn = connect_db()
+    yield from iter_archived(conn, kind, since, until, task, after_id)
+    cursor = conn.execute(sql, params)
+    while True:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch:
+            return
+        yield from batch
+
+
+def export(
+    kind,
+    path,
+    fmt=None,
+    since=None,
+    until=None,
+    task=None,
+    incremental=False,
+    state_name=None,
+):
+    """Export `kind` ("sessions" or "checkins") to `path`.
+
+    `since`/`until` are inclusive YYYY-MM-DD bounds and `task` filters by
+    task name. With `incremental`, only rows after the stored high-water id
+    for `state_name` (default: the kind) and these filters are written, and
+    the mark advances once the file is complete.
+    """
+    if kind not in _SOURCES:
+        raise ValueError(f"Unknown export kind: {kind}")
+    fmt = fmt or ("jsonl" if path == "-" else _format_of(path))
+    columns = _SOURCES[kind]["columns"]
+    state_name = state_key(state_name or kind, since, until, task)
+    after_id = get_high_water(state_name) if incremental else None
+    report = ExportReport(kind=kind, path=path, last_id=after_id)
+
+    with ExitStack() as stack:
+        if path == "-":
+            out, tmp_path = sys.stdout, None
+        else:
+            tmp_path = path + ".part"
+            if path.lower().endswith(".gz"):
+                # Level 6 is several times faster than the default 9 for ~the
+                # same size; the buffer keeps zlib from being called per row.
+                binary = stack.enter_context(
+                    io.BufferedWriter(
+                        stack.enter_context(gzip.open(tmp_path, "wb", compresslevel=6)),
+                        WRITE_BUFFER,
+                    )
+                )
+            else:
+                binary = stack.enter_context(
+                    open(tmp_path, "wb", buffering=WRITE_BUFFER)
+                )
+            out = stack.enter_context(
+                io.TextIOWrapper(binary, encoding="utf-8", newline="")
+            )
+        try:
+            if fmt == "csv":
+                writer = csv.writer(out)
+                writer.writerow(columns)
+                write = writer.writerow
+            else:
+
+                def write(row):
+                    out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    out.write("\n")
+
+            for row in iter_rows(kind, since, until, task, after_id):
+                if kind == "checkins":
+                    row = row[:4] + (bool(row[4]),) + row[5:]
+                write(row)
+                report.rows += 1
+                report.last_id = max(report.last_id or 0, row[0])
+        except BaseException:
+            stack.close()
+            if tmp_path is not None:
+                os.remove(tmp_path)
+            raise
+        stack.close()  # complete the file before it takes the final name
+    if tmp_path is not None:
+        os.replace(tmp_path, path)
+    else:
+        out.flush()
+
+    if incremental and report.rows:
+        _set_high_water(state_name, kind, report.last_id)
+    return report
@@ -0,0 +1,350 @@
+"""assistant/importer.py
+Bulk import of historical sessions and check-ins from CSV or JSONL files.
+
+Input is streamed, validated row by row and written with executemany in
+fixed-size transactions, so large histories import without a commit per row.
+"""
+
+import csv
+import gzip
+import io
+import json
+import math
+import os
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.db import (
+    apply_sessions_to_rollups,
+    connect_db,
+    get_max_task_id,
+    refresh_checkin_stats,
+    resolve_task_names,
+)
+
+BATCH_SIZE = 10_000
+MAX_REPORTED_ERRORS = 100
+
+SESSION_FIELDS = ("task_name", "start_time", "end_time", "duration", "distractions")
+CHECKIN_FIELDS = ("checkin_task_name", "checkin_time", "success", "note")
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+_FALSE = {"0", "false", "no", "n", "f", ""}
+
+INSERT_SESSION = (
+    "INSERT INTO tasks (task_name_id, start_time, end_time, duration, distractions) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+INSERT_CHECKIN = (
+    "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, note) "
+    "VALUES (?, ?, ?, ?)"
+)
+# With skip_existing, rows already present (same task and start time) are left
+# alone so re-importing a file is harmless. The extra index probe per row makes
+# this several times slower, so it is opt-in.
+INSERT_SESSION_IF_NEW = (
+    "INSERT INTO tasks (task_name_id, start_time, end_time, duration, distractions) "
+    "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS "
+    "(SELECT 1 FROM tasks WHERE task_name_id = ? AND start_time = ?)"
+)
+INSERT_CHECKIN_IF_NEW = (
+    "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, note) "
+    "SELECT ?, ?, ?, ? WHERE NOT EXISTS "
+    "(SELECT 1 FROM checkin_records WHERE checkin_task_id = ? AND checkin_time = ?)"
+)
+
+
+class InvalidRow(ValueError):
+    """A row failed validation."""
+
+
+@dataclass
+class ImportReport:
+    kind: str
+    read: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)  # (line number, message)
+    bytes_read: int = 0
+    total_bytes: int = 0
+    checkin_task_ids: set = field(default_factory=set)  # tasks that got new rows
+
+
+def _parse_time(value, name):
+    if not value:
+        raise InvalidRow(f"missing {name}")
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise InvalidRow(f"invalid {name}: {value!r}")
+
+
+def _parse_int(value, name, default=None):
+    if value in (None, ""):
+        if default is None:
+            raise InvalidRow(f"missing {name}")
+        return default
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        raise InvalidRow(f"invalid {name}: {value!r}")
+    if number < 0:
+        raise InvalidRow(f"negative {name}: {value!r}")
+    return number
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else "").strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise InvalidRow(f"invalid success flag: {value!r}")
+
+
+def validate_session(row):
+    """Return a tasks row tuple for one input record."""
+    task_name = (row.get("task_name") or "").strip()
+    if not task_name:
+        raise InvalidRow("missing task_name")
+    start = _parse_time(row.get("start_time"), "start_time")
+    end = _parse_time(row.get("end_time"), "end_time")
+    if end < start:
+        raise InvalidRow("end_time is before start_time")
+    if row.get("duration") not in (None, ""):
+        try:
+            duration = round(float(row["duration"]), 2)
+        except (TypeError, ValueError):
+            raise InvalidRow(f"invalid duration: {row['duration']!r}")
+        if not math.isfinite(duration):
+            raise InvalidRow(f"invalid duration: {row['duration']!r}")
+        if duration < 0:
+            raise InvalidRow(f"negative duration: {row['duration']!r}")
+    else:
+        duration = round((end - start).total_seconds() / 60, 2)
+    distractions = _parse_int(row.get("distractions"), "distractions", default=0)
+    return (task_name, start.isoformat(), end.isoformat(), duration, distractions)
+
+
+def validate_checkin(row):
+    """Return (task name, checkin_time, success, note) for one input record."""
+    task_name = (row.get("checkin_task_name") or row.get("task_name") or "").strip()
+    if not task_name:
+        raise InvalidRow("missing checkin_task_name")
+    checkin_time = _parse_time(row.get("checkin_time"), "checkin_time")
+    success = _parse_bool(row.get("success", True))
+    note = row.get("note") or ""
+    return (task_name, checkin_time.isoformat(), success, str(note))
+
+
+def detect_kind(columns):
+    """Guess whether records are sessions or check-ins from their field names."""
+    columns = set(columns)
+    if "checkin_time" in columns:
+        return "checkins"
+    if {"task_name", "start_time", "end_time"} <= columns:
+        return "sessions"
+    raise ValueError(
+        f"Cannot tell sessions from check-ins by columns: {sorted(columns)}"
+    )
+
+
+def _read_records(text_stream, fmt):
+    """Yield (line number, dict) pairs from a CSV or JSONL stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(text_stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(text_stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            yield line_number, record
+
+
+def _format_of(path):
+    name = path.lower().removesuffix(".gz")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {path} (use .csv or .jsonl)")
+
+
+class _CheckinTaskResolver:
+    """In-memory name -> checkin_task_id map, creating unknown tasks on demand."""
+
+    def __init__(self, conn, create_missing=True):
+        self.conn = conn
+        self.create_missing = create_missing
+        self.clear()
+
+    def clear(self):
+        """Re-read the tasks, e.g. after tasks created in a batch were rolled back."""
+        self.ids = {
+            name.lower(): task_id
+            for task_id, name in self.conn.execute(
+                "SELECT checkin_task_id, checkin_task_name FROM checkin_tasks"
+            )
+        }
+
+    def resolve(self, name, created_at):
+        task_id = self.ids.get(name.lower())
+        if task_id is None:
+            if not self.create_missing:
+                raise InvalidRow(f"unknown check-in task: {name!r}")
+            cur = self.conn.execute(
+                "INSERT INTO checkin_tasks (checkin_task_name, description, created_at) "
+                "VALUES (?, '', ?)",
+                (name, created_at),
+            )
+            task_id = self.ids[name.lower()] = cur.lastrowid
+        return task_id
+
+
+def import_file(
+    path,
+    kind=None,
+    batch_size=BATCH_SIZE,
+    create_missing_tasks=True,
+    skip_existing=False,
+    progress=None,
+):
+    """Import sessions or check-ins from `path` (.csv/.jsonl, optionally .gz).
+
+    `kind` is "sessions" or "checkins"; it is detected from the first record
+    when omitted. `progress(report)` is called after every committed batch.
+    With `skip_existing`, rows matching an existing task/check-in at the same
+    time are skipped instead of duplicated.
+    """
+    fmt = _format_of(path)
+    report = ImportReport(kind=kind or "", total_bytes=os.path.getsize(path))
+    conn = connect_db()
+    gzipped = path.lower().endswith(".gz")
+    with (
+        open(path, "rb") as raw,
+        gzip.open(raw) if gzipped else nullcontext(raw) as binary,
+        io.TextIOWrapper(binary, encoding="utf-8-sig", newline="") as text,
+    ):
+        records = _read_records(text, fmt)
+        resolver = None
+        batch = []  # (line number, validated row)
+        for line_number, record in records:
+            report.read += 1
+            if not isinstance(record, dict):
+                _record_error(report, line_number, f"unreadable record: {record}")
+                continue
+            if not report.kind:
+                report.kind = detect_kind(record.keys())
+            try:
+                if report.kind == "sessions":
+                    batch.append((line_number, validate_session(record)))
+                else:
+                    batch.append((line_number, validate_checkin(record)))
+            except InvalidRow as e:
+                _record_error(report, line_number, str(e))
+                continue
+            if len(batch) >= batch_size:
+                resolver = _write_batch(
+                    conn,
+                    report,
+                    batch,
+                    resolver,
+                    create_missing_tasks,
+                    skip_existing,
+                )
+                batch = []
+                report.bytes_read = raw.tell()
+                if progress is not None:
+                    progress(report)
+        if batch:
+            _write_batch(
+                conn, report, batch, resolver, create_missing_tasks, skip_existing
+            )
+        report.bytes_read = report.total_bytes
+        if progress is not None:
+            progress(report)
+    return report
+
+
+def _record_error(report, line_number, message):
+    report.invalid += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append((line_number, message))
+
+
+def _write_batch(conn, report, batch, resolver, create_missing_tasks, skip_existing):
+    """Write one batch of (line number, row); returns the resolver to reuse.
+
+    The resolver of a sessions import is its {name: task_name_id}, of a
+    check-ins import a _CheckinTaskResolver. Ids it hands out for new names
+    are only valid once the batch commits, so a rollback clears it.
+    """
+    if resolver is None:
+        if report.kind == "sessions":
+            resolver = {}
+        else:
+            resolver = _CheckinTaskResolver(conn, create_missing_tasks)
+    try:
+        with transaction(conn):
+            if report.kind == "sessions":
+                inserted, written = _write_sessions(
+                    conn, batch, resolver, skip_existing
+                )
+            else:
+                inserted, written = _write_checkins(
+                    conn, report, batch, resolver, skip_existing
+                )
+    except BaseException:
+        resolver.clear()
+        raise
+    report.inserted += inserted
+    report.skipped += written - inserted
+    return resolver
+
+
+def _write_sessions(conn, batch, ids, skip_existing):
+    last_task_id = get_max_task_id(conn)
+    resolve_task_names(conn, {row[0] for _, row in batch}, ids)
+    rows = [(ids[row[0]], *row[1:]) for _, row in batch]
+    if skip_existing:
+        cur = conn.executemany(INSERT_SESSION_IF_NEW, (row + row[:2] for row in rows))
+    else:
+        cur = conn.executemany(INSERT_SESSION, rows)
+    # rowcount, unlike total_changes, leaves out rows written by triggers.
+    inserted = cur.rowcount
+    apply_sessions_to_rollups(conn, after_task_id=last_task_id)
+    return inserted, len(rows)
+
+
+def _write_checkins(conn, report, batch, resolver, skip_existing):
+    rows, task_ids = [], set()
+    for line_number, (name, checkin_time, success, note) in batch:
+        try:
+            task_id = resolver.resolve(name, checkin_time)
+        except InvalidRow as e:
+            _record_error(report, line_number, str(e))
+            continue
+        rows.append((task_id, checkin_time, success, note))
+        task_ids.add(task_id)
+    if skip_existing:
+        cur = conn.executemany(INSERT_CHECKIN_IF_NEW, (row + row[:2] for row in rows))
+    else:
+        cur = conn.executemany(INSERT_CHECKIN, rows)
+    # One recount per touched task, committed with the batch, so the streaks
+    # and totals match the rows even if a later batch fails.
+    if task_ids:
+        refresh_checkin_stats(conn, task_ids)
+    report.checkin_task_ids |= task_ids
+    return cur.rowcount, len(rows)
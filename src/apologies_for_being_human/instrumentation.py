@@ -0,0 +1,224 @@
+"""assistant/instrumentation.py
+Opt-in latency and counter metrics for DB queries, LLM calls and rendering.
+
+Set APOLOGIES_METRICS to a file path to enable it. A `.prom` path is
+rewritten with a Prometheus text snapshot; any other path gets one JSON line
+appended per process. When the variable is unset, `timed` returns the
+function unchanged and `measure` returns a shared no-op context, so the
+cost is one attribute lookup.
+"""
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+METRICS_FILE = os.environ.get("APOLOGIES_METRICS", "")
+ENABLED = bool(METRICS_FILE)
+MAX_SAMPLES = 2048  # reservoir per timer; percentiles stay cheap for long runs
+PERCENTILES = (50, 90, 99)
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+
+
+class _Timer:
+    __slots__ = ("count", "max", "samples", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            i = random.randrange(self.count)
+            if i < MAX_SAMPLES:
+                self.samples[i] = seconds
+
+
+def record(name, seconds):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = _Timer()
+        timer.add(seconds)
+
+
+def count(name, n=1):
+    """Bump a counter such as "llm.fallback_cli"; no-op when disabled."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Measure:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+
+def measure(name):
+    """Context manager timing its block under `name`."""
+    return _Measure(name) if ENABLED else _NULL
+
+
+def timed(name=None):
+    """Decorator timing every call; returns `func` itself when disabled."""
+
+    def decorate(func):
+        if not ENABLED:
+            return func
+        metric = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(metric, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_module(namespace, prefix):
+    """Wrap the public functions defined in a module namespace with `timed`."""
+    if not ENABLED:
+        return
+    module = namespace["__name__"]
+    for attr, value in list(namespace.items()):
+        if (
+            not attr.startswith("_")
+            and callable(value)
+            and getattr(value, "__module__", None) == module
+            and not isinstance(value, type)
+        ):
+            namespace[attr] = timed(f"{prefix}.{attr}")(value)
+
+
+def _percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(len(sorted_samples) * p / 100))
+    return sorted_samples[index]
+
+
+def snapshot():
+    """Current metrics: {"timers": {name: stats}, "counters": {name: n}}."""
+    with _lock:
+        timers = {}
+        for name, timer in sorted(_timers.items()):
+            samples = sorted(timer.samples)
+            stats = {
+                "count": timer.count,
+                "total_ms": round(timer.total * 1000, 3),
+                "max_ms": round(timer.max * 1000, 3),
+            }
+            for p in PERCENTILES:
+                stats[f"p{p}_ms"] = round(_percentile(samples, p) * 1000, 3)
+            timers[name] = stats
+        return {"timers": timers, "counters": dict(sorted(_counters.items()))}
+
+
+def _prometheus(metrics):
+    lines = ["# TYPE apologies_latency_seconds summary"]
+    for name, stats in metrics["timers"].items():
+        label = f'name="{name}"'
+        for p in PERCENTILES:
+            lines.append(
+                f'apologies_latency_seconds{{{label},quantile="{p / 100}"}} '
+                f"{stats[f'p{p}_ms'] / 1000:.9g}"
+            )
+        lines.append(
+            f"apologies_latency_seconds_sum{{{label}}} {stats['total_ms'] / 1000:.9g}"
+        )
+        lines.append(f"apologies_latency_seconds_count{{{label}}} {stats['count']}")
+    lines.append("# TYPE apologies_events_total counter")
+    for name, value in metrics["counters"].items():
+        lines.append(f'apologies_events_total{{name="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None):
+    """Write the current snapshot to `path` (default: APOLOGIES_METRICS)."""
+    path = path or METRICS_FILE
+    metrics = snapshot()
+    if not metrics["timers"] and not metrics["counters"]:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith(".prom"):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_prometheus(metrics))
+        os.replace(tmp, path)
+    else:
+        stamp = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid()}
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(stamp | metrics) + "\n")
+
+
+def display_diagnostics(console):
+    """Hidden menu screen: the live metrics of this process."""
+    from rich.table import Table
+
+    if not ENABLED:
+        console.print(
+            "[yellow]Metrics are off. Set APOLOGIES_METRICS=metrics.jsonl "
+            "(or a .prom file) and restart.[/yellow]"
+        )
+        return
+    metrics = snapshot()
+    table = Table(title="Timings", title_style="bold green")
+    table.add_column("Name")
+    table.add_column("Count", justify="right")
+    table.add_column("Total ms", justify="right")
+    for p in PERCENTILES:
+        table.add_column(f"p{p} ms", justify="right")
+    table.add_column("Max ms", justify="right")
+    for name, stats in metrics["timers"].items():
+        table.add_row(
+            name,
+            str(stats["count"]),
+            f"{stats['total_ms']:.1f}",
+            *(f"{stats[f'p{p}_ms']:.2f}" for p in PERCENTILES),
+            f"{stats['max_ms']:.1f}",
+        )
+    console.print(table)
+
+    counters = Table(title="Counters", title_style="bold green")
+    counters.add_column("Name")
+    counters.add_column("Value", justify="right")
+    for name, value in metrics["counters"].items():
+        counters.add_row(name, str(value))
+    console.print(counters)
+    console.print(f"[dim]Written to {METRICS_FILE} on exit.[/dim]")
+
+
+if ENABLED:
+    atexit.register(write_metrics)
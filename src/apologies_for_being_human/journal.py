@@ -0,0 +1,339 @@
+"""assistant/journal.py
+Crash-safe journal of focus sessions in progress.
+
+A running session owns one row of active_sessions. Its elapsed time,
+reminder position and distraction count are checkpointed at most once every
+CHECKPOINT_SECONDS: one single-row UPDATE, committed on its own into the WAL
+without an fsync, so even a session of many hours costs a few hundred tiny
+writes. Finishing logs the session and deletes the row in one transaction.
+
+A row whose process is gone (a crash, a closed terminal, a killed binary) is
+an orphan. The next launch offers to resume it, or to log the time up to its
+last checkpoint.
+
+JournaledSession is the session loop the menu, the CLI and the TUI share.
+"""
+
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from apologies_for_being_human import db
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.timer import (
+    DEFAULT_REFRESH_HZ,
+    SessionTimer,
+    reminder_timings,
+)
+
+
+def _checkpoint_seconds_from_env(default=30.0):
+    """APOLOGIES_CHECKPOINT_SECONDS, or `default` with a warning when unusable."""
+    value = os.environ.get("APOLOGIES_CHECKPOINT_SECONDS", "").strip()
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is None or not math.isfinite(seconds) or seconds <= 0:
+        print(
+            f"warning: ignoring APOLOGIES_CHECKPOINT_SECONDS={value!r}, expected a "
+            f"positive number; using {default:g} seconds",
+            file=sys.stderr,
+        )
+        return default
+    return seconds
+
+
+CHECKPOINT_SECONDS = _checkpoint_seconds_from_env()
+# Where liveness cannot be asked of the OS, an owner that has not checkpointed
+# for this long is taken to be gone.
+STALE_SECONDS = max(3 * CHECKPOINT_SECONDS, 120)
+
+_owned = set()  # session ids journaled by this process
+
+
+@dataclass
+class ActiveSession:
+    session_id: int
+    task_name: str
+    start_time: datetime
+    duration_seconds: float
+    elapsed_seconds: float
+    reminder_index: int
+    distractions: int
+    pid: int
+    checkpoint_time: datetime
+
+    @property
+    def end_time(self):
+        """Start plus the checkpointed focus time."""
+        return self.start_time + timedelta(seconds=self.elapsed_seconds)
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        return None  # os.kill would terminate it; fall back to staleness
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _is_orphan(session, now):
+    if session.session_id in _owned:
+        return False
+    silent = now - session.checkpoint_time
+    alive = _pid_alive(session.pid)
+    if alive is None:
+        return silent.total_seconds() > STALE_SECONDS
+    # A live pid that has not checkpointed for a day belongs to someone else.
+    return not alive or silent > timedelta(days=1)
+
+
+def find_orphans():
+    """Journaled sessions whose process is no longer running, oldest first."""
+    now = datetime.now()
+    sessions = [
+        ActiveSession(
+            session_id,
+            task_name,
+            datetime.fromisoformat(start_time),
+            duration,
+            elapsed,
+            reminder_index,
+            distractions,
+            pid,
+            datetime.fromisoformat(checkpoint_time),
+        )
+        for (
+            session_id,
+            task_name,
+            start_time,
+            duration,
+            elapsed,
+            reminder_index,
+            distractions,
+            pid,
+            checkpoint_time,
+        ) in db.connect_db().execute(
+            "SELECT session_id, task_name, start_time, duration_seconds, "
+            "elapsed_seconds, reminder_index, distractions, pid, checkpoint_time "
+            "FROM active_sessions ORDER BY session_id"
+        )
+    ]
+    return [session for session in sessions if _is_orphan(session, now)]
+
+
+class SessionJournal:
+    """The journal row of one running session.
+
+    Call checkpoint() as often as convenient (every timer tick is fine); it
+    only writes once `interval` seconds have passed since the last write.
+    """
+
+    def __init__(self, session_id, task_name, start_time, interval, clock):
+        self.session_id = session_id
+        self.task_name = task_name
+        self.start_time = start_time
+        self.interval = interval
+        self.clock = clock
+        self.writes = 0
+        self._last_write = clock()
+        _owned.add(session_id)
+
+    @classmethod
+    def begin(
+        cls,
+        task_name,
+        duration_seconds,
+        start_time=None,
+        interval=CHECKPOINT_SECONDS,
+        clock=time.monotonic,
+    ):
+        start_time = start_time or datetime.now()
+        with transaction(db.connect_db()) as conn:
+            session_id = conn.execute(
+                "INSERT INTO active_sessions (task_name, start_time, "
+                "duration_seconds, pid, checkpoint_time) VALUES (?, ?, ?, ?, ?)",
+                (
+                    task_name,
+                    start_time.isoformat(),
+                    duration_seconds,
+                    os.getpid(),
+                    datetime.now().isoformat(),
+                ),
+            ).lastrowid
+        return cls(session_id, task_name, start_time, interval, clock)
+
+    @classmethod
+    def adopt(cls, session, interval=CHECKPOINT_SECONDS, clock=time.monotonic):
+        """Take over an orphan to resume it in this process."""
+        with transaction(db.connect_db()) as conn:
+            conn.execute(
+                "UPDATE active_sessions SET pid = ?, checkpoint_time = ? "
+                "WHERE session_id = ?",
+                (os.getpid(), datetime.now().isoformat(), session.session_id),
+            )
+        return cls(
+            session.session_id, session.task_name, session.start_time, interval, clock
+        )
+
+    def checkpoint(self, elapsed, reminder_index=0, distractions=0, force=False):
+        """Record progress if the interval has passed (or `force`)."""
+        now = self.clock()
+        if not force and now - self._last_write < self.interval:
+            return False
+        db.connect_db().execute(
+            "UPDATE active_sessions SET elapsed_seconds = ?, reminder_index = ?, "
+            "distractions = ?, checkpoint_time = ? WHERE session_id = ?",
+            (
+                elapsed,
+                reminder_index,
+                distractions,
+                datetime.now().isoformat(),
+                self.session_id,
+            ),
+        )
+        self._last_write = now
+        self.writes += 1
+        return True
+
+    def finish(self, elapsed, distractions):
+        """Log the session and drop its journal row in one transaction.
+
+        Returns the logged end time, or None when another launch already
+        finalized this session as an orphan.
+        """
+        end_time = self.start_time + timedelta(seconds=elapsed)
+        with transaction(db.connect_db()) as conn:
+            deleted = conn.execute(
+                "DELETE FROM active_sessions WHERE session_id = ?", (self.session_id,)
+            ).rowcount
+            if deleted:
+                db.log_task(self.task_name, self.start_time, end_time, distractions)
+        _owned.discard(self.session_id)
+        return end_time if deleted else None
+
+    def discard(self):
+        """Forget the session without logging it."""
+        db.connect_db().execute(
+            "DELETE FROM active_sessions WHERE session_id = ?", (self.session_id,)
+        )
+        _owned.discard(self.session_id)
+
+
+class JournaledSession:
+    """One focus session as every front end runs it: the timer, its journal
+    row and the quote prefetcher for its reminders.
+
+    Iterate ticks() to run it; each tick is checkpointed with the elapsed
+    time, the reminder position and `distractions`, the running count that
+    starts from a resumed session's and that callers may raise at any time.
+    stop() freezes the elapsed time and checkpoints it, finish() logs it.
+    """
+
+    def __init__(
+        self,
+        task_name,
+        duration_seconds,
+        resume=None,
+        distractions=0,
+        refresh_hz=DEFAULT_REFRESH_HZ,
+        quotes=True,
+        clock=None,
+        sleep=time.sleep,
+    ):
+        self.task_name = task_name
+        self.duration_seconds = duration_seconds
+        timings = reminder_timings(duration_seconds)
+        self.timer = SessionTimer(
+            duration_seconds, timings, refresh_hz=refresh_hz, clock=clock, sleep=sleep
+        )
+        journal_clock = clock or time.monotonic
+        if resume is None:
+            self.journal = SessionJournal.begin(
+                task_name, duration_seconds, clock=journal_clock
+            )
+            self.timer.start()
+        else:
+            self.journal = SessionJournal.adopt(resume, clock=journal_clock)
+            self.timer.start(resume.elapsed_seconds)
+            self.timer.next_reminder_index = resume.reminder_index
+            distractions += resume.distractions
+        self.distractions = distractions
+        self.quotes = None
+        if quotes:
+            from apologies_for_being_human.quote_provider import QuoteProvider
+
+            needed = len(timings) - self.timer.next_reminder_index
+            self.quotes = QuoteProvider(needed=needed).start()
+        self._stopped_at = None
+
+    def ticks(self):
+        """The timer's ticks, each checkpointed before it is handed out."""
+        for tick in self.timer.ticks():
+            self.journal.checkpoint(
+                tick.elapsed, self.timer.next_reminder_index, self.distractions
+            )
+            yield tick
+
+    def reminder(self):
+        """Reminder text for a tick that fired one."""
+        from apologies_for_being_human.prompts import gentle_prompt
+
+        return gentle_prompt(self.task_name, return_str=True, provider=self.quotes)
+
+    def elapsed(self):
+        """Seconds focused so far; fixed once the session is stopped."""
+        if self._stopped_at is not None:
+            return self._stopped_at
+        return self.timer.elapsed()
+
+    def stop(self):
+        """Freeze the elapsed time, stop prefetching quotes and checkpoint, so
+        the time is safe while the caller asks questions; returns it."""
+        if self._stopped_at is None:
+            self._stopped_at = self.timer.elapsed()
+            if self.quotes is not None:
+                self.quotes.stop()
+            self.journal.checkpoint(
+                self._stopped_at,
+                self.timer.next_reminder_index,
+                self.distractions,
+                force=True,
+            )
+        return self._stopped_at
+
+    def finish(self):
+        """Stop and log the session; see SessionJournal.finish()."""
+        return self.journal.finish(self.stop(), self.distractions)
+
+
+def finalize_orphan(session):
+    """Log an orphan with the time up to its last checkpoint."""
+    return SessionJournal.adopt(session).finish(
+        session.elapsed_seconds, session.distractions
+    )
+
+
+def discard_orphan(session):
+    db.connect_db().execute(
+        "DELETE FROM active_sessions WHERE session_id = ?", (session.session_id,)
+    )
+
+
+def describe_orphan(session):
+    minutes = session.elapsed_seconds / 60
+    return (
+        f"{session.task_name}: {minutes:.1f} of "
+        f"{session.duration_seconds / 60:g} min, started "
+        f"{session.start_time:%Y-%m-%d %H:%M}"
+    )
@@ -1,25 +1,122 @@
 """assistant/llm_quotes.py"""
 
+import http.client
+import re
 import subprocess
+import time
 
+from apologies_for_being_human.instrumentation import count, timed
+from apologies_for_being_human.ollama_client import OllamaUnavailable, get_client
 
-def get_llm_quote():
+LLM_TIMEOUT = 120
+_POLL_INTERVAL = 0.2
+
+PROMPT = "Give me a short motivational message for someone who has severe procrastination and is afraid of failure."
+BATCH_PROMPT = (
+    "Give me {n} different short motivational messages for someone who has severe "
+    "procrastination and is afraid of failure. Write one message per line, numbered, "
+    "with no other text."
+)
+BATCH_SIZE = 12
+
+# What a model call can raise: RuntimeError for ollama errors, cancellation
+# and empty answers, OSError for sockets, timeouts and a missing binary,
+# ValueError for a garbled stream.
+LLM_ERRORS = (RuntimeError, OSError, ValueError, http.client.HTTPException)
+
+_LIST_MARKER_RE = re.compile(r"^\s*(?:\d+\s*[.):-]|[-*•])\s*")
+
+
+@timed()
+def get_llm_quote(cancel=None):
     """
     Uses Ollama + tinyllama to generate a motivational quote.
-    Make sure Ollama is running and the model is pulled (e.g. `ollama run tinyllama` once beforehand).
+    Talks to the Ollama HTTP server when it is running, otherwise falls back to
+    the `ollama run` CLI (e.g. `ollama run tinyllama` once beforehand).
+    `cancel` is an optional threading.Event that aborts the call in flight.
+    """
+    try:
+        return _last_line(_generate(PROMPT, cancel))
+    except LLM_ERRORS as e:
+        raise RuntimeError(f"LLM call failed: {e}") from e
+
+
+@timed()
+def get_llm_quotes(n=BATCH_SIZE, cancel=None):
+    """
+    Generates `n` quotes with a single model call and returns them as a list.
+    Fewer may come back if the model ignores the requested format.
     """
-    prompt = "Give me a short motivational message for someone who has severe procrastination and is afraid of failure."
+    prompt = BATCH_PROMPT.format(n=n)
     try:
-        # "ollama" is an external command-line tool for running language models, and "tinyllama" is the model name.
-        result = subprocess.run(
-            ["ollama", "run", "tinyllama"],
-            input=prompt.encode("utf-8"),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=120,
-            check=True,  # Explicitly set check to True to raise an error on non-zero exit
-        )
-        output = result.stdout.decode("utf-8").strip()
-        return output.split("\n")[-1]  # Return the last line in case of verbose output
-    except Exception as e:
-        raise RuntimeError(f"LLM call failed: {e}")
+        output = _generate(prompt, cancel)
+    except LLM_ERRORS as e:
+        raise RuntimeError(f"LLM call failed: {e}") from e
+    quotes = parse_quotes(output)
+    if not quotes:
+        raise RuntimeError("LLM call failed: no quotes in response")
+    return quotes[:n]
+
+
+def _generate(prompt, cancel=None):
+    try:
+        try:
+            return get_client().generate(prompt, cancel=cancel)
+        except OllamaUnavailable:
+            count("llm.fallback_cli")
+            return _run_cli(prompt, cancel)
+    except TimeoutError:
+        count("llm.timeouts")
+        raise
+    except Exception:
+        count("llm.errors")
+        raise
+
+
+def parse_quotes(output):
+    """Split a numbered or bulleted model answer into individual quotes."""
+    quotes = []
+    for line in output.splitlines():
+        text = _LIST_MARKER_RE.sub("", line).strip().strip("\"'“”").strip()
+        # Skip preambles such as "Here are 12 messages:" and stray fragments.
+        if len(text) < 12 or text.endswith(":"):
+            continue
+        quotes.append(text)
+    return quotes
+
+
+def _last_line(output):
+    lines = [line.strip() for line in output.strip().split("\n") if line.strip()]
+    if not lines:
+        raise RuntimeError("empty response")
+    return lines[-1]  # Return the last line in case of verbose output
+
+
+def _run_cli(prompt, cancel=None):
+    # "ollama" is an external command-line tool for running language models, and "tinyllama" is the model name.
+    process = subprocess.Popen(
+        ["ollama", "run", "tinyllama"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + LLM_TIMEOUT
+    # The prompt can be sent only once; later polls just wait for the output.
+    data = prompt.encode("utf-8")
+    while True:
+        try:
+            stdout, stderr = process.communicate(input=data, timeout=_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            data = None
+            if cancel is not None and cancel.is_set():
+                process.kill()
+                process.communicate()
+                raise RuntimeError("cancelled")
+            if time.monotonic() >= deadline:
+                process.kill()
+                process.communicate()
+                raise TimeoutError(f"timed out after {LLM_TIMEOUT} seconds")
+    if process.returncode != 0:
+        raise RuntimeError(stderr.decode("utf-8", errors="replace").strip())
+    return stdout.decode("utf-8")
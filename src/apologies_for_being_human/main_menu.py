@@ -6,17 +6,11 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
 
-
-from apologies_for_being_human.core import (
-    start_focus_session,
-    view_log,
-    create_checkin_task,
-    checkin,
-    view_checkin_records,
-)
+# Feature modules (core, statistics, analytics) are imported inside the menu
+# branches that use them, so launching only pays for what gets opened.
 from apologies_for_being_human.db import init_db
+from apologies_for_being_human.journal import find_orphans
 from apologies_for_being_human.utils import ultimate_clear
-from apologies_for_being_human.statistics import display_checkin_statistics
 
 console = Console(force_terminal=True, force_interactive=True)
 
@@ -27,7 +21,14 @@ def wait_and_clear():
 
 
 def main_menu():
-    init_db()
+    try:
+        init_db()
+    except ValueError as e:  # a bad profile name or config file
+        raise SystemExit(f"error: {e}") from None
+    if find_orphans():
+        from apologies_for_being_human.core import recover_sessions
+
+        recover_sessions(console)
     while True:
         ultimate_clear(console)
         panel = Panel(
@@ -37,7 +38,11 @@ def main_menu():
             "[bold cyan]4.[/bold cyan] Check-in\n"
             "[bold cyan]5.[/bold cyan] View check-in records\n"
             "[bold cyan]6.[/bold cyan] View Check-in Statistics\n"
-            "[bold cyan]7.[/bold cyan] Exit",
+            "[bold cyan]7.[/bold cyan] Import history (CSV/JSONL)\n"
+            "[bold cyan]8.[/bold cyan] Export data (CSV/JSONL)\n"
+            "[bold cyan]9.[/bold cyan] Focus analytics\n"
+            "[bold cyan]10.[/bold cyan] Search tasks and notes\n"
+            "[bold cyan]11.[/bold cyan] Exit",
             title="[bold magenta]Apologies for Being Human[/bold magenta]",
             border_style="bright_blue",
         )
@@ -45,36 +50,77 @@ def main_menu():
 
         choice = Prompt.ask(
             "[yellow]Choose an option[/yellow]",
-            choices=["1", "2", "3", "4", "5", "6", "7"],
+            # "d" opens the diagnostics screen; it is left out of the menu.
+            choices=["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "d"],
             default="1",
+            show_choices=False,
         )
         if choice == "1":
-            task_name = Prompt.ask("Enter your task name")
+            from apologies_for_being_human.task_index import ask_task_name
+
+            task_name = ask_task_name(console, "Enter your task name (Tab completes)")
             try:
                 duration = int(
                     Prompt.ask("Enter session duration in minutes", default="25")
                 )
+                from apologies_for_being_human.core import start_focus_session
+
                 start_focus_session(task_name, duration, console=console)
                 wait_and_clear()
             except ValueError:
                 console.print("[red]Invalid duration. Try again.[/red]")
                 wait_and_clear()
         elif choice == "2":
+            from apologies_for_being_human.core import view_log
+
             view_log(console=console)
             wait_and_clear()
         elif choice == "3":
+            from apologies_for_being_human.core import create_checkin_task
+
             create_checkin_task(console=console)
             wait_and_clear()
         elif choice == "4":
+            from apologies_for_being_human.core import checkin
+
             checkin(console=console)
             wait_and_clear()
         elif choice == "5":
+            from apologies_for_being_human.core import view_checkin_records
+
             view_checkin_records(console=console)
             wait_and_clear()
         elif choice == "6":
+            from apologies_for_being_human.statistics import display_checkin_statistics
+
             display_checkin_statistics(console=console)
             wait_and_clear()
         elif choice == "7":
+            from apologies_for_being_human.core import import_history
+
+            import_history(console=console)
+            wait_and_clear()
+        elif choice == "8":
+            from apologies_for_being_human.core import export_data
+
+            export_data(console=console)
+            wait_and_clear()
+        elif choice == "9":
+            from apologies_for_being_human.analytics import display_focus_analytics
+
+            display_focus_analytics(console=console)
+            wait_and_clear()
+        elif choice == "d":
+            from apologies_for_being_human.instrumentation import display_diagnostics
+
+            display_diagnostics(console=console)
+            wait_and_clear()
+        elif choice == "10":
+            from apologies_for_being_human.search import display_search
+
+            display_search(console=console)
+            wait_and_clear()
+        elif choice == "11":
             console.print("[green]Goodbye. Stay mindful and consistent.[/green]")
             break
 
@@ -0,0 +1,165 @@
+"""assistant/ollama_client.py
+Minimal Ollama HTTP client that keeps one connection and the model warm.
+"""
+
+import http.client
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "127.0.0.1:11434")
+MODEL = "tinyllama"
+KEEP_ALIVE = "30m"  # keep tinyllama resident between reminders
+CALL_DEADLINE = 20.0  # seconds per generation, including streaming
+
+
+class OllamaUnavailable(RuntimeError):
+    """The Ollama server could not be reached; callers may fall back to the CLI."""
+
+
+class OllamaTimeout(TimeoutError):
+    """The server took the request but did not answer in time.
+
+    Not a reason to fall back to the CLI: it would wait on the same busy model.
+    """
+
+
+class OllamaClient:
+    """Streams generations from /api/generate over a single keep-alive connection."""
+
+    def __init__(
+        self, host=None, model=MODEL, keep_alive=KEEP_ALIVE, deadline=CALL_DEADLINE
+    ):
+        host = host or OLLAMA_HOST
+        if "://" not in host:
+            host = f"http://{host}"
+        parts = urlsplit(host)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 11434
+        self.model = model
+        self.keep_alive = keep_alive
+        self.deadline = deadline
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=self.deadline
+            )
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def generate(self, prompt, cancel=None, on_token=None, options=None):
+        """Return the full response text, streaming tokens to `on_token` as they arrive."""
+        body = json.dumps(
+            {
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "keep_alive": self.keep_alive,
+                "options": options or {},
+            }
+        ).encode("utf-8")
+        with self._lock:
+            deadline = time.monotonic() + self.deadline
+            try:
+                response = self._request(body)
+                if response.status != 200:
+                    detail = response.read().decode("utf-8", errors="replace").strip()
+                    raise RuntimeError(
+                        f"ollama returned HTTP {response.status}: {detail}"
+                    )
+                return self._read_stream(response, deadline, cancel, on_token)
+            except Exception:
+                # A half-read stream cannot be reused, start fresh next time.
+                self.close()
+                raise
+
+    def _request(self, body):
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn = self._connection()
+            reused = conn.sock is not None
+            try:
+                conn.request("POST", "/api/generate", body=body, headers=headers)
+            except OSError as e:
+                self.close()
+                if reused and not attempt and _is_disconnect(e):
+                    continue  # the server closed an idle keep-alive connection
+                raise OllamaUnavailable(
+                    f"cannot reach ollama at {self.host}:{self.port}: {e}"
+                ) from e
+            try:
+                return conn.getresponse()
+            except TimeoutError as e:
+                raise OllamaTimeout(
+                    f"ollama sent no response within {self.deadline} seconds"
+                ) from e
+            except OSError as e:
+                # A keep-alive connection can also be found closed only once the
+                # request is out; reconnect once. Anything else is the server's.
+                if not (reused and not attempt and _is_disconnect(e)):
+                    raise
+                self.close()
+
+    def _read_stream(self, response, deadline, cancel, on_token):
+        tokens = []
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError("cancelled")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise OllamaTimeout(
+                    f"no complete answer within {self.deadline} seconds"
+                )
+            if self._conn is not None and self._conn.sock is not None:
+                self._conn.sock.settimeout(remaining)
+            try:
+                line = response.readline()
+            except TimeoutError as e:
+                raise OllamaTimeout(
+                    f"no complete answer within {self.deadline} seconds"
+                ) from e
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            token = chunk.get("response", "")
+            if token:
+                tokens.append(token)
+                if on_token is not None:
+                    on_token(token)
+            if chunk.get("done"):
+                # Drain the terminating chunk so the connection can be reused.
+                response.read()
+                break
+        return "".join(tokens)
+
+
+def _is_disconnect(error):
+    return isinstance(
+        error,
+        (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError),
+    )
+
+
+_client = None
+
+
+def get_client():
+    """Return the shared process-wide client."""
+    global _client
+    if _client is None:
+        _client = OllamaClient()
+    return _client
@@ -0,0 +1,142 @@
+"""assistant/ollama_stub.py
+Local stand-in for the Ollama HTTP API, for testing without a real model.
+
+Run it with `python -m apologies_for_being_human.ollama_stub --port 11434`
+and point the app at it through OLLAMA_HOST. Latency and failures are
+configurable so slow or flaky models can be simulated.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Small steps still move you forward. Begin with the next five minutes."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        stub.requests.append(request)
+
+        if stub.fail_rate and stub.random.random() < stub.fail_rate:
+            body = json.dumps({"error": "simulated failure"}).encode("utf-8")
+            self.send_response(500)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+
+        time.sleep(stub.first_token_latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        model = request.get("model", "tinyllama")
+        try:
+            for word in stub.reply.split(" "):
+                self._chunk({"model": model, "response": word + " ", "done": False})
+                time.sleep(stub.token_latency)
+            self._chunk({"model": model, "response": "", "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (deadline or cancellation) mid-stream.
+            self.close_connection = True
+
+    def _chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubOllamaServer:
+    """Threaded fake Ollama server; use as a context manager in tests."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        reply=DEFAULT_REPLY,
+        first_token_latency=0.0,
+        token_latency=0.0,
+        fail_rate=0.0,
+        seed=None,
+    ):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ollama-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument("--first-token-latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    server = StubOllamaServer(
+        args.host,
+        args.port,
+        reply=args.reply,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    print(f"Stub Ollama listening on http://{server.address}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@
 
 import random
 
+from apologies_for_being_human.instrumentation import count, timed
 from apologies_for_being_human.llm_quotes import get_llm_quote
+from apologies_for_being_human.quote_cache import get_quote_cache
 
 STATIC_QUOTES = [
     "Start where you are. Use what you have. Do what you can. – Arthur Ashe",
@@ -13,11 +15,21 @@ STATIC_QUOTES = [
 ]
 
 
-def gentle_prompt(task_name: str, return_str: bool = False):
-    try:
-        quote = get_llm_quote()
-    except Exception:
-        quote = random.choice(STATIC_QUOTES)
+@timed()
+def gentle_prompt(task_name: str, return_str: bool = False, provider=None):
+    if provider is not None:
+        quote = provider.pop()
+    else:
+        cache = get_quote_cache()
+        quote = cache.take()
+        if quote is not None:
+            cache.flush()
+        else:
+            try:
+                quote = get_llm_quote()
+            except Exception:
+                count("prompts.static_fallback")
+                quote = random.choice(STATIC_QUOTES)
 
     message = f"⏰ Stay focused on {task_name} — {quote} 💪"
     if return_str:
@@ -0,0 +1,175 @@
+"""assistant/query_cache.py
+In-process read-through cache for db.py read functions.
+
+Results are keyed by function, database and arguments, kept in an LRU of
+MAX_ENTRIES, and returned as copies so callers may mutate them. Each result
+remembers the generation of the tables it read; the write functions declared
+with `writes()` bump those generations, which drops only the results that
+could have changed.
+
+Writes made behind the cache's back are caught as well. Every thread's
+connection is stamped with PRAGMA data_version, which moves when another
+connection (another thread, another process, the sync or import tools)
+commits, and with total_changes, which moves on any write through the
+connection itself. A stamp that moved without a declared write clears the
+whole cache.
+
+Set APOLOGIES_QUERY_CACHE=0 to turn it off.
+"""
+
+import dataclasses
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.instrumentation import count
+
+ENABLED = os.environ.get("APOLOGIES_QUERY_CACHE", "1") != "0"
+MAX_ENTRIES = 256
+MAX_ROWS = 5000  # larger results are not kept; they would pin whole histories
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (generations, value)
+_generations = {}  # table -> counter, bumped by declared writes
+_epoch = 0  # bumped by clear(), so results read before it never match
+_local = threading.local()  # path -> (connection, data_version, total_changes)
+_db = None
+
+
+def _database():
+    global _db
+    if _db is None:
+        from apologies_for_being_human import db
+
+        _db = db
+    return _db
+
+
+def clear():
+    """Forget every cached result."""
+    global _epoch
+    with _lock:
+        _entries.clear()
+        _epoch += 1
+
+
+def invalidate(*tables):
+    """Drop the results that read any of `tables`."""
+    with _lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+
+
+def _stamp(conn):
+    return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+
+def _check(path, conn):
+    """Clear the cache if this connection has seen a write nobody declared."""
+    stamps = getattr(_local, "stamps", None)
+    if stamps is None:
+        stamps = _local.stamps = {}
+    current = (conn, *_stamp(conn))
+    seen = stamps.get(path)
+    # `is` rather than ==: a reopened connection has fresh counters.
+    if seen is None or seen[0] is not conn or seen[1:] != current[1:]:
+        if seen is not None or _entries:
+            clear()
+            count("query_cache.external_writes")
+        stamps[path] = current
+
+
+def _copy(value):
+    if isinstance(value, (list, dict, set)):
+        return value.copy()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.replace(
+            value,
+            **{
+                field.name: getattr(value, field.name).copy()
+                for field in dataclasses.fields(value)
+                if isinstance(getattr(value, field.name), (list, dict, set))
+            },
+        )
+    return value
+
+
+def _size(value):
+    rows = getattr(value, "rows", value)
+    return len(rows) if isinstance(rows, (list, dict, set, tuple)) else 1
+
+
+def cached(*tables):
+    """Cache a read function whose result depends only on its arguments and
+    the contents of `tables`."""
+
+    def decorate(func):
+        if not ENABLED:
+            return func
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            db = _database()
+            conn = db.connect_db()
+            path = db.database_path()
+            key = (name, path, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            if conn.in_transaction:
+                # Inside a write the rows may still be rolled back.
+                return func(*args, **kwargs)
+            _check(path, conn)
+            with _lock:
+                generations = (_epoch, *(_generations.get(t, 0) for t in tables))
+                entry = _entries.get(key)
+                if entry is not None and entry[0] == generations:
+                    _entries.move_to_end(key)
+                    count("query_cache.hits")
+                    return _copy(entry[1])
+            count("query_cache.misses")
+            value = func(*args, **kwargs)
+            if _size(value) <= MAX_ROWS:
+                with _lock:
+                    _entries[key] = (generations, value)
+                    _entries.move_to_end(key)
+                    while len(_entries) > MAX_ENTRIES:
+                        _entries.popitem(last=False)
+            return _copy(value)
+
+        return wrapper
+
+    return decorate
+
+
+def writes(*tables):
+    """Declare that a function writes `tables`; cached reads of them are
+    dropped once it commits."""
+
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            db = _database()
+            conn = db.connect_db()
+            path = db.database_path()
+            with transaction(conn):
+                # Under the write lock nobody else can commit, so a stamp
+                # taken here accounts for this write and nothing else.
+                _check(path, conn)
+                result = func(*args, **kwargs)
+                _local.stamps[path] = (conn, *_stamp(conn))
+            # Bumped after the commit: a result another thread read before
+            # it carries the old generation.
+            invalidate(*tables)
+            return result
+
+        return wrapper
+
+    return decorate
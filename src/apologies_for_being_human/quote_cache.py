@@ -0,0 +1,146 @@
+"""assistant/quote_cache.py
+Persistent quote cache kept next to the SQLite DB, with TTL and LRU eviction.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+from apologies_for_being_human import db
+
+CACHE_FILENAME = "quote_cache.json"
+MAX_ENTRIES = 200
+TTL_SECONDS = 14 * 24 * 3600
+REUSE_AFTER_SECONDS = 12 * 3600  # a quote shown this recently is not "available"
+DUPLICATE_THRESHOLD = 0.7
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _fingerprint(text):
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _similar(a, b):
+    """Jaccard similarity of two word sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class QuoteCache:
+    """Quote store that rotates through least-recently-shown entries."""
+
+    def __init__(
+        self,
+        path=None,
+        max_entries=MAX_ENTRIES,
+        ttl=TTL_SECONDS,
+        clock=time.time,
+    ):
+        self.path = path or os.path.join(
+            os.path.dirname(db.database_path()), CACHE_FILENAME
+        )
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        self._entries = [e for e in entries if isinstance(e, dict) and e.get("text")]
+        self._expire()
+
+    def _expire(self):
+        cutoff = self.clock() - self.ttl
+        before = len(self._entries)
+        self._entries = [e for e in self._entries if e["created"] >= cutoff]
+        if len(self._entries) != before:
+            self._dirty = True
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def available(self):
+        """Number of fresh quotes that have not been shown recently."""
+        with self._lock:
+            self._load()
+            self._expire()
+            cutoff = self.clock() - REUSE_AFTER_SECONDS
+            return sum(1 for e in self._entries if e["last_used"] < cutoff)
+
+    def add_many(self, quotes):
+        """Add quotes, skipping near-duplicates; returns how many were stored."""
+        added = 0
+        with self._lock:
+            self._load()
+            now = self.clock()
+            prints = [_fingerprint(e["text"]) for e in self._entries]
+            for text in quotes:
+                text = text.strip()
+                fp = _fingerprint(text)
+                if not fp or any(
+                    _similar(fp, other) >= DUPLICATE_THRESHOLD for other in prints
+                ):
+                    continue
+                self._entries.append({"text": text, "created": now, "last_used": 0})
+                prints.append(fp)
+                added += 1
+            if len(self._entries) > self.max_entries:
+                # LRU eviction: drop whatever was touched (added or shown) longest ago.
+                self._entries.sort(
+                    key=lambda e: max(e["created"], e["last_used"]), reverse=True
+                )
+                del self._entries[self.max_entries :]
+            self._dirty = self._dirty or added > 0
+        return added
+
+    def take(self):
+        """Return the least recently shown fresh quote, or None if the cache is empty."""
+        with self._lock:
+            self._load()
+            self._expire()
+            if not self._entries:
+                return None
+            entry = min(self._entries, key=lambda e: (e["last_used"], -e["created"]))
+            entry["last_used"] = self.clock()
+            self._dirty = True
+            return entry["text"]
+
+    def flush(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+_cache = None
+
+
+def get_quote_cache():
+    """Return the shared cache for the current DB location."""
+    global _cache
+    path = os.path.join(os.path.dirname(db.database_path()), CACHE_FILENAME)
+    if _cache is None or _cache.path != path:
+        if _cache is not None:
+            _cache.flush()
+        _cache = QuoteCache(path)
+    return _cache
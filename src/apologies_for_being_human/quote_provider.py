@@ -0,0 +1,80 @@
+"""assistant/quote_provider.py
+Background quote prefetcher, so reminders never wait on the LLM.
+"""
+
+import random
+import threading
+
+from apologies_for_being_human.instrumentation import count
+from apologies_for_being_human.llm_quotes import BATCH_SIZE, LLM_ERRORS, get_llm_quotes
+from apologies_for_being_human.prompts import STATIC_QUOTES
+from apologies_for_being_human.quote_cache import get_quote_cache
+
+
+class QuoteProvider:
+    """Serves quotes from the on-disk cache and tops it up from a worker thread.
+
+    The worker only calls the model when the cache holds fewer unshown quotes
+    than the session needs, and then asks for a whole batch in one call. A
+    refill makes at most that one call: when it fails the session runs on
+    whatever is cached plus the static quotes, and the next session tries
+    again.
+    """
+
+    def __init__(
+        self,
+        needed=BATCH_SIZE,
+        cache=None,
+        fetch=get_llm_quotes,
+        batch_size=BATCH_SIZE,
+    ):
+        self.needed = needed
+        self.cache = cache if cache is not None else get_quote_cache()
+        self._fetch = fetch
+        self._batch_size = max(batch_size, needed)
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None  # why the latest refill attempt failed
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="quote-provider", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """Cancel the worker, killing any in-flight LLM call, and persist the cache."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.cache.flush()
+
+    def pop(self):
+        """Return a cached quote, or a static one when the cache is empty."""
+        quote = self.cache.take()
+        if quote is None:
+            count("prompts.static_fallback")
+            quote = random.choice(STATIC_QUOTES)
+        return quote
+
+    def _run(self):
+        if self._stop.is_set() or self.cache.available() >= self.needed:
+            return
+        try:
+            quotes = self._fetch(self._batch_size, cancel=self._stop)
+        except LLM_ERRORS as e:
+            self.last_error = e
+            count("prompts.refill_errors")
+            return
+        # Even a short batch is kept; the next session tops the cache up again.
+        self.cache.add_many(quotes)
+        self.cache.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,136 @@
+"""assistant/reporting.py
+Cross-profile reports: ATTACH every profile database to one connection and
+run the statistics and rollup queries across all of them in a single pass.
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from apologies_for_being_human import db
+from apologies_for_being_human.config import list_profiles
+from apologies_for_being_human.connection import open_connection
+
+
+def _prepare(path):
+    """Bring an older profile database up to the current schema before it is
+    attached read-only."""
+    conn = open_connection(path)
+    try:
+        if db.get_schema_version(conn) < db.SCHEMA_VERSION:
+            db.migrate(conn)
+    finally:
+        conn.close()
+
+
+@contextmanager
+def attached_profiles(profiles=None):
+    """Yield (conn, [(schema, profile name)]) with each profile attached
+    read-only as p0, p1, ...; profiles whose file does not exist are skipped.
+    """
+    profiles = list_profiles() if profiles is None else profiles
+    profiles = {name: path for name, path in profiles.items() if os.path.exists(path)}
+    conn = sqlite3.connect(":memory:", uri=True, isolation_level=None)
+    try:
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(profiles) > limit:
+            raise ValueError(
+                f"{len(profiles)} profiles, but SQLite can attach at most {limit}"
+            )
+        schemas = []
+        for i, (name, path) in enumerate(sorted(profiles.items())):
+            _prepare(path)
+            schema = f"p{i}"
+            uri = "file:" + path.replace("?", "%3f").replace("#", "%23") + "?mode=ro"
+            conn.execute("ATTACH DATABASE ? AS " + schema, (uri,))
+            schemas.append((schema, name))
+        yield conn, schemas
+    finally:
+        conn.close()
+
+
+def _union(schemas, select):
+    """UNION ALL of `select` over every attached schema; `{s}` is the schema."""
+    return " UNION ALL ".join(select.format(s=schema) for schema, _ in schemas)
+
+
+def _names(schemas):
+    return [name for _, name in schemas]
+
+
+def get_focus_by_profile(conn, schemas, start, end):
+    """[(profile, minutes, sessions, distractions)] between two dates plus a
+    final ("all", ...) total row."""
+    if not schemas:
+        return []
+    inner = _union(
+        schemas,
+        "SELECT ? AS profile, minutes, sessions, distractions FROM {s}.focus_daily "
+        "WHERE day BETWEEN ? AND ?",
+    )
+    params = []
+    for name in _names(schemas):
+        params += [name, start, end]
+    sql = (
+        "WITH per_profile AS (SELECT profile, round(SUM(minutes), 2) AS minutes, "
+        "SUM(sessions) AS sessions, SUM(distractions) AS distractions "
+        f"FROM ({inner}) GROUP BY profile) "
+        "SELECT * FROM per_profile UNION ALL "
+        "SELECT 'all', round(SUM(minutes), 2), SUM(sessions), SUM(distractions) "
+        "FROM per_profile"
+    )
+    return conn.execute(sql, params).fetchall()
+
+
+def get_daily_focus_all(conn, schemas, start, end):
+    """{day: minutes} summed over all profiles."""
+    if not schemas:
+        return {}
+    inner = _union(
+        schemas,
+        "SELECT day, minutes FROM {s}.focus_daily WHERE day BETWEEN ? AND ?",
+    )
+    params = [start, end] * len(schemas)
+    sql = f"SELECT day, SUM(minutes) FROM ({inner}) GROUP BY day ORDER BY day"
+    return dict(conn.execute(sql, params).fetchall())
+
+
+def get_checkin_stats_by_profile(conn, schemas):
+    """[(profile, task name, total, completed, rate, current streak, longest)]
+    from each profile's checkin_task_stats summary."""
+    if not schemas:
+        return []
+    inner = _union(
+        schemas,
+        """SELECT ? AS profile, ct.checkin_task_name AS name,
+                  coalesce(s.total, 0) AS total,
+                  coalesce(s.completed, 0) AS completed,
+                  CASE WHEN s.last_success_date >= date('now', 'localtime', '-1 day')
+                       THEN s.current_streak ELSE 0 END AS current_streak,
+                  coalesce(s.longest_streak, 0) AS longest_streak
+           FROM {s}.checkin_tasks ct
+           LEFT JOIN {s}.checkin_task_stats s
+                  ON ct.checkin_task_id = s.checkin_task_id""",
+    )
+    sql = (
+        "SELECT profile, name, total, completed, "
+        "coalesce(completed * 100.0 / nullif(total, 0), 0.0), "
+        f"current_streak, longest_streak FROM ({inner}) ORDER BY name, profile"
+    )
+    return conn.execute(sql, _names(schemas)).fetchall()
+
+
+def cross_profile_report(profiles=None, start=None, end=None):
+    """Everything the report screen and `report --json` show, as plain data."""
+    end = end or date.today().isoformat()
+    start = start or (date.fromisoformat(end) - timedelta(days=6)).isoformat()
+    with attached_profiles(profiles) as (conn, schemas):
+        return {
+            "profiles": _names(schemas),
+            "start": start,
+            "end": end,
+            "focus": get_focus_by_profile(conn, schemas, start, end),
+            "daily": get_daily_focus_all(conn, schemas, start, end),
+            "checkins": get_checkin_stats_by_profile(conn, schemas),
+        }
@@ -0,0 +1,153 @@
+"""assistant/search.py
+Ranked full-text search over task names, check-in notes and check-in tasks.
+"""
+
+import re
+from dataclasses import dataclass
+
+from apologies_for_being_human.db import connect_db, has_search_index
+
+KINDS = ("task", "note", "checkin_task")
+HIGHLIGHT = ("\x02", "\x03")  # private markers; callers restyle them
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    kind: str  # "task", "note" or "checkin_task"
+    ref: object  # task name, checkin_record_id or checkin_task_id
+    snippet: str  # matched text with HIGHLIGHT markers around each match
+    score: float  # bm25; lower is better
+    detail: dict
+
+
+def to_match_query(text):
+    """Turn free text into an FTS5 query: every word, as a prefix, must match."""
+    words = _WORD_RE.findall(text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _task_detail(conn, name):
+    sessions, minutes, last_day = conn.execute(
+        "SELECT coalesce(SUM(sessions), 0), coalesce(SUM(minutes), 0), MAX(day) "
+        "FROM focus_daily WHERE task_name = ?",
+        (name,),
+    ).fetchone()
+    return {"sessions": sessions, "minutes": round(minutes, 2), "last_day": last_day}
+
+
+def _note_detail(conn, record_id):
+    row = conn.execute(
+        "SELECT ct.checkin_task_name, cr.checkin_time, cr.success "
+        "FROM checkin_records cr "
+        "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
+        "WHERE cr.checkin_record_id = ?",
+        (record_id,),
+    ).fetchone()
+    if row is None:
+        return {}
+    return {
+        "checkin_task_name": row[0],
+        "checkin_time": row[1],
+        "success": bool(row[2]),
+    }
+
+
+def _checkin_task_detail(conn, checkin_task_id):
+    row = conn.execute(
+        "SELECT checkin_task_name, description FROM checkin_tasks "
+        "WHERE checkin_task_id = ?",
+        (checkin_task_id,),
+    ).fetchone()
+    return {"name": row[0], "description": row[1]} if row else {}
+
+
+_DETAILS = {
+    "task": _task_detail,
+    "note": _note_detail,
+    "checkin_task": _checkin_task_detail,
+}
+
+
+def search(text, kinds=KINDS, limit=20, markers=HIGHLIGHT):
+    """Best matches for `text`, ranked by bm25, with highlighted snippets.
+
+    Each word matches as a prefix ("thes" finds "thesis") and all words must
+    occur. Only the top `limit` documents are looked up in their tables.
+    """
+    conn = connect_db()
+    if not has_search_index(conn):
+        raise RuntimeError(
+            "Full-text search is unavailable (SQLite was built without FTS5)."
+        )
+    query = to_match_query(text)
+    kinds = [kind for kind in kinds if kind in KINDS]
+    if not query or not kinds:
+        return []
+    placeholders = ", ".join("?" * len(kinds))
+    rows = conn.execute(
+        f"""
+        SELECT kind, ref, snippet(search_index, 0, ?, ?, '…', 16),
+               bm25(search_index)
+        FROM search_index
+        WHERE search_index MATCH ? AND kind IN ({placeholders})
+        ORDER BY rank
+        LIMIT ?
+        """,
+        (*markers, query, *kinds, limit),
+    ).fetchall()
+    return [
+        SearchHit(kind, ref, snippet, score, _DETAILS[kind](conn, ref))
+        for kind, ref, snippet, score in rows
+    ]
+
+
+def highlighted(snippet, style="bold yellow"):
+    """A Rich Text of a snippet with its HIGHLIGHT markers turned into style."""
+    from rich.text import Text
+
+    text = Text()
+    open_marker, close_marker = HIGHLIGHT
+    for i, part in enumerate(re.split(f"[{open_marker}{close_marker}]", snippet)):
+        text.append(part, style=style if i % 2 else None)
+    return text
+
+
+def describe(hit):
+    detail = hit.detail
+    if hit.kind == "task":
+        return (
+            f"{detail['sessions']} sessions, {detail['minutes']:g} min, "
+            f"last {detail['last_day'] or '-'}"
+        )
+    if hit.kind == "note":
+        done = "done" if detail.get("success") else "missed"
+        return (
+            f"{detail.get('checkin_task_name', '?')} · "
+            f"{detail.get('checkin_time', '')} · {done}"
+        )
+    return "check-in task"
+
+
+def display_search(console):
+    from rich.prompt import Prompt
+    from rich.table import Table
+
+    text = Prompt.ask("Search task names and notes")
+    try:
+        hits = search(text)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    if not hits:
+        console.print("[yellow]No matches.[/yellow]")
+        return
+    kind_labels = {"task": "Task", "note": "Note", "checkin_task": "Check-in task"}
+    table = Table(title=f"🔎 Results for {text!r}", title_style="bold green")
+    table.add_column("Kind")
+    table.add_column("Match")
+    table.add_column("Details")
+    for hit in hits:
+        table.add_row(kind_labels[hit.kind], highlighted(hit.snippet), describe(hit))
+    console.print(table)
@@ -0,0 +1,344 @@
+"""assistant/server.py
+Local read-only HTTP/JSON API for dashboards and editor plugins.
+
+    apologies_for_being_human serve --port 8765
+
+Endpoints (GET only):
+
+    /api/sessions          ?limit=&task=&date=&cursor=&direction=next|prev
+    /api/checkin-tasks
+    /api/checkin-records   ?limit=&task_id=&date=&cursor=&direction=next|prev
+    /api/stats             today's focus and per-task check-in stats
+    /api/health
+
+Requests are parsed on one asyncio loop and the queries run on a small
+thread pool whose threads hold read-only WAL connections, so many readers
+proceed while the CLI keeps writing. Every response carries an ETag built
+from SQLite's data_version; a client sending it back in If-None-Match gets a
+304 without any query running until something is committed.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import secrets
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+from apologies_for_being_human import db
+from apologies_for_being_human.connection import (
+    open_readonly_connection,
+    use_readonly_connections,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_HEADER_BYTES = 16 * 1024
+KEEP_ALIVE_TIMEOUT = 15  # seconds an idle client connection stays open
+
+SESSION_FIELDS = ("task_name", "start_time", "end_time", "duration", "distractions")
+CHECKIN_RECORD_FIELDS = ("checkin_task_name", "checkin_time", "success", "note")
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def encode_cursor(key):
+    if key is None:
+        return None
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        key = json.loads(raw)
+    except ValueError:
+        raise BadRequest("invalid cursor")
+    # A page key is (time, row id); anything else would reach the query.
+    if (
+        not isinstance(key, list)
+        or len(key) != 2
+        or not isinstance(key[0], str)
+        or not isinstance(key[1], int)
+        or isinstance(key[1], bool)
+    ):
+        raise BadRequest("invalid cursor")
+    return tuple(key)
+
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(query, name, default, maximum=None):
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if number < 1:
+        raise BadRequest(f"{name} must be positive")
+    return min(number, maximum) if maximum else number
+
+
+def _date_param(query, name):
+    value = _param(query, name)
+    if value is not None:
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            raise BadRequest(f"{name} must be YYYY-MM-DD")
+    return value
+
+
+def _page_payload(page, key, fields):
+    return {
+        key: [dict(zip(fields, row)) for row in page.rows],
+        "next": encode_cursor(page.last_key) if page.has_next else None,
+        "prev": encode_cursor(page.first_key) if page.has_previous else None,
+    }
+
+
+def _cursor_args(query):
+    direction = _param(query, "direction", "next")
+    if direction not in ("next", "prev"):
+        raise BadRequest("direction must be next or prev")
+    return decode_cursor(_param(query, "cursor")), direction == "prev"
+
+
+def sessions(query):
+    cursor, backward = _cursor_args(query)
+    page = db.get_session_page(
+        cursor,
+        backward,
+        page_size=_int_param(query, "limit", DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE),
+        task_name=_param(query, "task"),
+        date=_date_param(query, "date"),
+    )
+    return _page_payload(page, "sessions", SESSION_FIELDS)
+
+
+def checkin_tasks(query):
+    return {
+        "checkin_tasks": [
+            {"checkin_task_id": task_id, "name": name, "description": description}
+            for task_id, name, description in db.get_checkin_tasks()
+        ]
+    }
+
+
+def checkin_records(query):
+    cursor, backward = _cursor_args(query)
+    task_id = _param(query, "task_id")
+    if task_id is not None and not task_id.isdigit():
+        raise BadRequest("task_id must be an integer")
+    page = db.get_checkin_record_page(
+        cursor,
+        backward,
+        page_size=_int_param(query, "limit", DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE),
+        checkin_task_id=int(task_id) if task_id else None,
+        date=_date_param(query, "date"),
+    )
+    payload = _page_payload(page, "checkin_records", CHECKIN_RECORD_FIELDS)
+    for record in payload["checkin_records"]:
+        record["success"] = bool(record["success"])
+    return payload
+
+
+def stats(query):
+    from apologies_for_being_human.statistics import get_today_summary
+
+    return get_today_summary()
+
+
+def health(query):
+    return {"status": "ok", "schema_version": db.get_schema_version()}
+
+
+ROUTES = {
+    "/api/sessions": sessions,
+    "/api/checkin-tasks": checkin_tasks,
+    "/api/checkin-records": checkin_records,
+    "/api/stats": stats,
+    "/api/health": health,
+}
+
+
+class ApiServer:
+    """Serves ROUTES from db.database_path(); `workers` threads run the queries."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4):
+        self.path = db.database_path()
+        self.host = host
+        self.port = port
+        self.boot = secrets.token_hex(4)  # ETags never survive a restart
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="api",
+            initializer=use_readonly_connections,
+        )
+        # data_version is per connection, so one connection on the loop
+        # thread watches for commits made by anyone else.
+        self._watch = open_readonly_connection(self.path)
+        self._server = None
+
+    def generation(self):
+        """Changes whenever another connection commits to the database."""
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def etag(self, target):
+        # The date is part of the tag because streaks and "today" roll over.
+        tag = f"{self.boot}|{self.generation()}|{date.today().isoformat()}|{target}"
+        return f'W/"{hashlib.blake2b(tag.encode(), digest_size=12).hexdigest()}"'
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._client, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._watch.close()
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT
+                    )
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "headers too large"})
+                    return
+                except (asyncio.IncompleteReadError, TimeoutError):
+                    return
+                keep_alive = await self._handle(head, writer)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, head, writer):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._send(writer, 400, {"error": "bad request line"}, close=True)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (
+            version == "HTTP/1.1" or connection == "keep-alive"
+        )
+        if method != "GET":
+            await self._send(
+                writer, 405, {"error": "only GET is supported"}, close=not keep_alive
+            )
+            return keep_alive
+
+        url = urlsplit(target)
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            await self._send(writer, 404, {"error": "not found"}, close=not keep_alive)
+            return keep_alive
+
+        etag = self.etag(target)
+        if headers.get("if-none-match") == etag:
+            await self._send(writer, 304, None, etag=etag, close=not keep_alive)
+            return keep_alive
+        try:
+            payload = await asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(route, parse_qs(url.query))
+            )
+            status = 200
+        except BadRequest as e:
+            payload, status, etag = {"error": str(e)}, 400, None
+        except Exception:  # noqa: BLE001 - any failure must still get a response
+            # Database errors, and bugs in a route, become a generic 500 so
+            # the connection is not dropped. Details stay in the server's log;
+            # clients learn nothing about paths or schema from them.
+            print(f"error serving {target}:", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            payload, status, etag = {"error": "internal error"}, 500, None
+        await self._send(writer, status, payload, etag=etag, close=not keep_alive)
+        return keep_alive
+
+    async def _send(self, writer, status, payload, etag=None, close=False):
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {REASONS[status]}",
+            "Access-Control-Allow-Origin: *",
+            "Cache-Control: no-cache",
+            f"Content-Length: {len(body)}",
+        ]
+        if payload is not None:
+            head.append("Content-Type: application/json; charset=utf-8")
+        if etag:
+            head.append(f"ETag: {etag}")
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    """Run the API until interrupted."""
+    db.init_db()  # migrations need a writable connection; serving does not
+    server = ApiServer(
+        host=host, port=port, workers=workers or min(8, os.cpu_count() or 4)
+    )
+
+    async def main():
+        await server.start()
+        print(f"Serving {server.path} on http://{server.host}:{server.port}/api/")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
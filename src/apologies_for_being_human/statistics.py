@@ -1,22 +1,80 @@
-from apologies_for_being_human.db import connect_db
+import argparse
+from datetime import date
 
+from apologies_for_being_human.db import (
+    connect_db,
+    get_checked_in_task_ids,
+    get_checkin_tasks,
+    get_focus_totals,
+    rebuild_checkin_stats,
+)
+from apologies_for_being_human.query_cache import cached
 
-def get_checkin_task_statistics():
-    """Get statistics for check-in tasks, including task names"""
+
+def get_checkin_task_statistics(day=None):
+    """Get statistics for check-in tasks, including task names.
+
+    Reads the checkin_task_stats summary, one row per task. Each row is
+    (name, total, completed, completion rate, last check-in, current streak,
+    longest streak); the current streak counts only if it reaches the day
+    before `day` (default today).
+    """
+    return _checkin_task_statistics(day or date.today().isoformat())
+
+
+@cached("checkin_tasks", "checkin_task_stats")
+def _checkin_task_statistics(day):
     conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT ct.checkin_task_name, 
-               COUNT(c.checkin_record_id) as total_checkins, 
-               SUM(CASE WHEN c.success = 1 THEN 1 ELSE 0 END) as completed_checkins,
-               (SUM(CASE WHEN c.success = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(c.checkin_record_id)) as completion_rate
+    cursor = conn.execute(
+        """
+        SELECT ct.checkin_task_name,
+               coalesce(s.total, 0),
+               coalesce(s.completed, 0),
+               coalesce(s.completed * 100.0 / nullif(s.total, 0), 0.0),
+               s.last_checkin,
+               CASE WHEN s.last_success_date >= date(?, '-1 day')
+                    THEN s.current_streak ELSE 0 END,
+               coalesce(s.longest_streak, 0)
         FROM checkin_tasks ct
-        LEFT JOIN checkin_records c ON ct.checkin_task_id = c.checkin_task_id
-        GROUP BY ct.checkin_task_name;
-    """)
-    results = cursor.fetchall()
-    conn.close()
-    return results
+        LEFT JOIN checkin_task_stats s ON ct.checkin_task_id = s.checkin_task_id
+        ORDER BY ct.checkin_task_name
+    """,
+        (day,),
+    )
+    return cursor.fetchall()
+
+
+def get_today_summary(day=None):
+    """Today's focus totals and per-task check-in stats as plain JSON data."""
+    day = day or date.today().isoformat()
+    minutes, sessions, distractions = get_focus_totals(day)
+    done_ids = get_checked_in_task_ids(day)
+    checked_in = {
+        name for task_id, name, _ in get_checkin_tasks() if task_id in done_ids
+    }
+    return {
+        "today": {
+            "date": day,
+            "focus_minutes": round(minutes, 2),
+            "sessions": sessions,
+            "distractions": distractions,
+        },
+        "checkins": [
+            {
+                "name": name,
+                "total": total,
+                "completed": completed,
+                "completion_rate": round(rate, 1),
+                "last_checkin": last_checkin,
+                "current_streak": current,
+                "longest_streak": longest,
+                "checked_in_today": name in checked_in,
+            }
+            for name, total, completed, rate, last_checkin, current, longest in (
+                get_checkin_task_statistics(day)
+            )
+        ],
+    }
 
 
 def display_checkin_statistics(console):
@@ -27,9 +85,36 @@ def display_checkin_statistics(console):
     completion_rates = get_checkin_task_statistics()
     for task in completion_rates:
         console.print(
-            f"{task[0]}: Total check-ins {task[1]}, Completed {task[2]}, Completion rate {task[3]}%"
+            f"{task[0]}: Total check-ins {task[1]}, Completed {task[2]}, "
+            f"Completion rate {task[3]:.1f}%, Current streak {task[5]} days, "
+            f"Longest streak {task[6]} days"
         )
 
 
 if __name__ == "__main__":
-    display_checkin_statistics()
+    parser = argparse.ArgumentParser(description="Check-in statistics maintenance")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compare the stored summary with a full recompute",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="rebuild the stored summary from checkin_records",
+    )
+    args = parser.parse_args()
+    if args.verify or args.rebuild:
+        mismatches = rebuild_checkin_stats(verify_only=not args.rebuild)
+        for task_id, (stored, expected) in sorted(mismatches.items()):
+            print(f"task {task_id}: stored {stored}, expected {expected}")
+        if not mismatches:
+            print("Summary is consistent with checkin_records.")
+        elif args.rebuild:
+            print(f"Rebuilt summary; {len(mismatches)} tasks were out of date.")
+        else:
+            print(f"{len(mismatches)} tasks out of date; run with --rebuild.")
+    else:
+        from rich.console import Console
+
+        display_checkin_statistics(Console())
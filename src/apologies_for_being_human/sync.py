@@ -0,0 +1,529 @@
+"""assistant/sync.py
+Multi-machine sync through a shared folder (Syncthing, Dropbox, a USB stick).
+
+Every database has a device id. A push appends the rows created here since
+the last push to one new change-log segment, `<device>-<seq>.jsonl.gz`, and
+moves the device's high-water marks past them; a push with nothing new writes
+nothing. A pull ingests, per other device, only the segments numbered past
+the last one it took, all in one transaction. Each device writes only its
+own file names and never rewrites a segment, so no locking is needed, and
+the cost of a sync follows the number of new rows, not the database size.
+
+Rows are matched across machines by what they are, not by local id: a
+session by task name and start time, a check-in by task and check-in time,
+a check-in task by name. When both sides have the same row, the merge is
+the same whichever side runs it and in whatever order segments arrive:
+
+- sessions keep the longer duration (then more distractions, later end);
+- check-ins succeed if either side succeeded and keep the fuller note;
+- check-in tasks keep the earliest creation date and, of the non-empty
+  descriptions, the one created first.
+
+Rows that came from another device carry it in their `origin` column, in
+the database and in archive segments, and are never pushed again. Archived
+months are never rewritten; an incoming row that matches an archived one is
+skipped.
+"""
+
+import gzip
+import json
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from apologies_for_being_human import archive
+from apologies_for_being_human.connection import transaction
+from apologies_for_being_human.db import (
+    SESSIONS_FROM,
+    adjust_rollups,
+    apply_checkin_to_stats,
+    apply_sessions_to_rollups,
+    connect_db,
+    get_max_task_id,
+    refresh_checkin_stats,
+    resolve_task_names,
+)
+
+SYNC_DIR = os.environ.get("APOLOGIES_SYNC_DIR")
+FORMAT = 1
+
+_SEGMENT_RE = re.compile(r"^([0-9a-f]+)-(\d+)\.jsonl\.gz$")
+
+
+@dataclass
+class SyncReport:
+    device_id: str
+    pushed: dict = field(default_factory=dict)  # kind -> rows in our segment
+    segment: str | None = None  # file name of the pushed segment
+    pulled: dict = field(default_factory=dict)  # device -> segments ingested
+    inserted: dict = field(default_factory=dict)  # kind -> new rows
+    merged: dict = field(default_factory=dict)  # kind -> rows changed by a merge
+    skipped: dict = field(default_factory=dict)  # kind -> already here as-is
+
+
+def get_device(conn=None):
+    """(device_id, next_seq, last_task_id, last_checkin_task_id,
+    last_checkin_record_id) of this database."""
+    conn = conn or connect_db()
+    return conn.execute(
+        "SELECT device_id, next_seq, last_task_id, last_checkin_task_id, "
+        "last_checkin_record_id FROM sync_device"
+    ).fetchone()
+
+
+def new_device_id():
+    """Give this database a fresh device id, for a copy of another database
+    file that would otherwise push under the same id. Rows already pushed
+    under the old id are not pushed again."""
+    device_id = uuid.uuid4().hex[:12]
+    with transaction(connect_db()) as conn:
+        conn.execute("UPDATE sync_device SET device_id = ?, next_seq = 1", (device_id,))
+    return device_id
+
+
+def get_peers(conn=None):
+    """[(device_id, last_seq, updated_at)] of the devices pulled from."""
+    conn = conn or connect_db()
+    return conn.execute(
+        "SELECT device_id, last_seq, updated_at FROM sync_peers ORDER BY device_id"
+    ).fetchall()
+
+
+def list_segments(folder):
+    """{device_id: [(seq, file name)]} in the folder, each list by seq."""
+    segments = {}
+    for entry in os.scandir(folder):
+        match = _SEGMENT_RE.match(entry.name)
+        if match:
+            device, seq = match.groups()
+            segments.setdefault(device, []).append((int(seq), entry.name))
+    for found in segments.values():
+        found.sort()
+    return segments
+
+
+def _segment_name(device_id, seq):
+    return f"{device_id}-{seq:08d}.jsonl.gz"
+
+
+# ---- push -----------------------------------------------------------------
+
+
+def _new_rows(conn, device):
+    """The rows created here past the high-water marks, as segment lines,
+    and the new marks."""
+    _, _, last_task_id, last_checkin_task_id, last_record_id = device
+    lines = []
+    checkin_tasks = conn.execute(
+        "SELECT checkin_task_id, checkin_task_name, description, created_at "
+        "FROM checkin_tasks WHERE checkin_task_id > ? AND origin IS NULL "
+        "ORDER BY checkin_task_id",
+        (last_checkin_task_id,),
+    ).fetchall()
+    lines.extend(
+        ["task", name, description or "", created_at]
+        for _, name, description, created_at in checkin_tasks
+    )
+
+    sessions = []
+    if conn.execute(
+        "SELECT 1 FROM archive_segments WHERE kind = 'sessions' AND max_id > ?",
+        (last_task_id,),
+    ).fetchone():
+        sessions.extend(
+            archive.iter_archived(
+                conn, "sessions", after_id=last_task_id, local_only=True
+            )
+        )
+    sessions.extend(
+        conn.execute(
+            "SELECT t.task_id, n.task_name, t.start_time, t.end_time, t.duration, "
+            f"t.distractions FROM {SESSIONS_FROM} "
+            "WHERE t.task_id > ? AND t.origin IS NULL ORDER BY t.task_id",
+            (last_task_id,),
+        )
+    )
+    lines.extend(["session", *row[1:]] for row in sessions)
+
+    records = []
+    if conn.execute(
+        "SELECT 1 FROM archive_segments WHERE kind = 'checkins' AND max_id > ?",
+        (last_record_id,),
+    ).fetchone():
+        records.extend(
+            (row[0], row[2], row[3], row[4], row[5])
+            for row in archive.iter_archived(
+                conn, "checkins", after_id=last_record_id, local_only=True
+            )
+        )
+    records.extend(
+        conn.execute(
+            "SELECT cr.checkin_record_id, ct.checkin_task_name, cr.checkin_time, "
+            "cr.success, cr.note FROM checkin_records cr "
+            "JOIN checkin_tasks ct ON cr.checkin_task_id = ct.checkin_task_id "
+            "WHERE cr.checkin_record_id > ? AND cr.origin IS NULL "
+            "ORDER BY cr.checkin_record_id",
+            (last_record_id,),
+        )
+    )
+    lines.extend(["checkin", *row[1:3], bool(row[3]), row[4] or ""] for row in records)
+
+    # Marks move past synced-in and archived rows too; everything at or below
+    # them has been pushed or came from elsewhere.
+    archived_max = dict(
+        conn.execute(
+            "SELECT kind, max(max_id) FROM archive_segments GROUP BY kind"
+        ).fetchall()
+    )
+    marks = (
+        max(last_task_id, get_max_task_id(conn), archived_max.get("sessions", 0)),
+        max(
+            last_checkin_task_id,
+            conn.execute(
+                "SELECT coalesce(max(checkin_task_id), 0) FROM checkin_tasks"
+            ).fetchone()[0],
+        ),
+        max(
+            last_record_id,
+            conn.execute(
+                "SELECT coalesce(max(checkin_record_id), 0) FROM checkin_records"
+            ).fetchone()[0],
+            archived_max.get("checkins", 0),
+        ),
+    )
+    counts = {
+        "checkin_tasks": len(checkin_tasks),
+        "sessions": len(sessions),
+        "checkins": len(records),
+    }
+    return lines, marks, counts
+
+
+def _write_segment(path, header, lines):
+    tmp_path = path + ".part"
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(encode(header))
+        f.write("\n")
+        for start in range(0, len(lines), 10_000):
+            f.write(
+                "".join(f"{encode(line)}\n" for line in lines[start : start + 10_000])
+            )
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def push(folder, report=None):
+    """Write the rows created since the last push to a new segment.
+
+    The segment number is taken before the file is written and the marks
+    move only after it is in place, so a crash in between leaves a gap in
+    the numbering and sends the same rows again next time, which peers
+    merge away. A number is never written twice by one database.
+    """
+    conn = connect_db()
+    with transaction(conn):
+        device = get_device(conn)
+        lines, marks, counts = _new_rows(conn, device)
+        if lines:
+            conn.execute("UPDATE sync_device SET next_seq = next_seq + 1")
+    device_id, seq = device[:2]
+    report = report or SyncReport(device_id)
+    if not lines:
+        return report
+    name = _segment_name(device_id, seq)
+    path = os.path.join(folder, name)
+    if os.path.exists(path):
+        raise RuntimeError(
+            f"{name} already exists: another database pushes as device "
+            f"{device_id}. If this database is a copy of another one, run "
+            "`sync --new-device-id` once."
+        )
+    header = {
+        "format": FORMAT,
+        "device": device_id,
+        "seq": seq,
+        "created_at": datetime.now().isoformat(),
+        "counts": counts,
+    }
+    _write_segment(path, header, lines)
+    with transaction(conn):
+        conn.execute(
+            "UPDATE sync_device SET last_task_id = max(last_task_id, ?), "
+            "last_checkin_task_id = max(last_checkin_task_id, ?), "
+            "last_checkin_record_id = max(last_checkin_record_id, ?)",
+            marks,
+        )
+    report.segment = name
+    report.pushed = counts
+    return report
+
+
+# ---- pull -----------------------------------------------------------------
+
+
+def _read_segment(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise RuntimeError(
+                f"{os.path.basename(path)} has sync format {header.get('format')}; "
+                "this program reads format 1. Please upgrade."
+            )
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _session_rank(duration, distractions, end_time):
+    return (duration, distractions, end_time)
+
+
+def _note_rank(note):
+    return (bool(note), len(note), note)
+
+
+def _description_rank(description, created_at):
+    # Smaller wins: any description over none, then the one created first.
+    return (not description, created_at, description)
+
+
+class _Ingest:
+    """Applies segment lines to the database inside one transaction."""
+
+    def __init__(self, conn, report):
+        self.conn = conn
+        self.report = report
+        self.origin = None
+        self.task_name_ids = {}
+        self.checkin_tasks = {
+            name.lower(): [task_id, description or "", created_at]
+            for task_id, name, description, created_at in conn.execute(
+                "SELECT checkin_task_id, checkin_task_name, description, created_at "
+                "FROM checkin_tasks"
+            )
+        }
+        self.first_task_id = get_max_task_id(conn)
+        self.new_checkins = {}  # checkin_task_id -> [(time, success)]
+        self.stale_stats = set()  # tasks whose summary needs a recount
+        self.archived_until = {
+            kind: conn.execute(
+                "SELECT max(max_date) FROM archive_segments WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+            or ""
+            for kind in archive.KINDS
+        }
+        self._archived_keys = {}
+
+    def _count(self, outcome, kind):
+        counts = getattr(self.report, outcome)
+        counts[kind] = counts.get(kind, 0) + 1
+
+    def _is_archived(self, kind, key, day):
+        if day > self.archived_until[kind]:
+            return False
+        for _, path in archive.find_segments(self.conn, kind, day, day):
+            keys = self._archived_keys.get(path)
+            if keys is None:
+                task_column = 1 if kind == "checkins" else archive.TASK_COLUMN[kind]
+                time_column = archive.TIME_COLUMN[kind]
+                keys = self._archived_keys[path] = {
+                    (row[task_column], row[time_column])
+                    for row in archive.load_segment(path)
+                }
+            if key in keys:
+                return True
+        return False
+
+    def checkin_task(self, name, description, created_at):
+        description = description or ""
+        known = self.checkin_tasks.get(name.lower())
+        if known is None:
+            task_id = self.conn.execute(
+                "INSERT INTO checkin_tasks (checkin_task_name, description, "
+                "created_at, origin) VALUES (?, ?, ?, ?)",
+                (name, description, created_at, self.origin),
+            ).lastrowid
+            self.checkin_tasks[name.lower()] = [task_id, description, created_at]
+            self._count("inserted", "checkin_tasks")
+            return task_id
+        task_id, old_description, old_created_at = known
+        best = min(
+            _description_rank(old_description, old_created_at),
+            _description_rank(description, created_at),
+        )[2]
+        first_created = min(old_created_at, created_at)
+        if (best, first_created) == (old_description, old_created_at):
+            self._count("skipped", "checkin_tasks")
+            return task_id
+        self.conn.execute(
+            "UPDATE checkin_tasks SET description = ?, created_at = ? "
+            "WHERE checkin_task_id = ?",
+            (best, first_created, task_id),
+        )
+        known[1:] = [best, first_created]
+        self._count("merged", "checkin_tasks")
+        return task_id
+
+    def session(self, name, start_time, end_time, duration, distractions):
+        name_id = resolve_task_names(self.conn, [name], self.task_name_ids)[name]
+        row = self.conn.execute(
+            "SELECT task_id, end_time, duration, distractions FROM tasks "
+            "WHERE task_name_id = ? AND start_time = ?",
+            (name_id, start_time),
+        ).fetchone()
+        if row is None:
+            if self._is_archived("sessions", (name, start_time), start_time[:10]):
+                self._count("skipped", "sessions")
+                return
+            self.conn.execute(
+                "INSERT INTO tasks (task_name_id, start_time, end_time, duration, "
+                "distractions, origin) VALUES (?, ?, ?, ?, ?, ?)",
+                (name_id, start_time, end_time, duration, distractions, self.origin),
+            )
+            self._count("inserted", "sessions")
+            return
+        task_id, old_end, old_duration, old_distractions = row
+        if _session_rank(duration, distractions, end_time) <= _session_rank(
+            old_duration, old_distractions, old_end
+        ):
+            self._count("skipped", "sessions")
+            return
+        self.conn.execute(
+            "UPDATE tasks SET end_time = ?, duration = ?, distractions = ? "
+            "WHERE task_id = ?",
+            (end_time, duration, distractions, task_id),
+        )
+        if task_id <= self.first_task_id:
+            # Already counted in the rollups; rows new in this pull are
+            # counted at the end with their final values.
+            adjust_rollups(
+                self.conn,
+                name,
+                start_time[:10],
+                duration - old_duration,
+                0,
+                distractions - old_distractions,
+            )
+        self._count("merged", "sessions")
+
+    def checkin(self, task_name, checkin_time, success, note):
+        known = self.checkin_tasks.get(task_name.lower())
+        task_id = known[0] if known else self.checkin_task(task_name, "", checkin_time)
+        row = self.conn.execute(
+            "SELECT checkin_record_id, success, note FROM checkin_records "
+            "WHERE checkin_task_id = ? AND checkin_time = ?",
+            (task_id, checkin_time),
+        ).fetchone()
+        if row is None:
+            if self._is_archived(
+                "checkins", (task_id, checkin_time), checkin_time[:10]
+            ):
+                self._count("skipped", "checkins")
+                return
+            self.conn.execute(
+                "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, "
+                "note, origin) VALUES (?, ?, ?, ?, ?)",
+                (task_id, checkin_time, success, note, self.origin),
+            )
+            self.new_checkins.setdefault(task_id, []).append((checkin_time, success))
+            self._count("inserted", "checkins")
+            return
+        record_id, old_success, old_note = row
+        old_note = old_note or ""
+        merged_success = bool(old_success) or bool(success)
+        merged_note = max(_note_rank(old_note), _note_rank(note))[2]
+        if (merged_success, merged_note) == (bool(old_success), old_note):
+            self._count("skipped", "checkins")
+            return
+        self.conn.execute(
+            "UPDATE checkin_records SET success = ?, note = ? "
+            "WHERE checkin_record_id = ?",
+            (merged_success, merged_note, record_id),
+        )
+        if merged_success != bool(old_success):
+            self.stale_stats.add(task_id)
+        self._count("merged", "checkins")
+
+    def apply(self, line):
+        kind, *values = line
+        if kind == "task":
+            self.checkin_task(*values)
+        elif kind == "session":
+            self.session(*values)
+        elif kind == "checkin":
+            self.checkin(*values)
+
+    def finish(self):
+        """Bring the rollups and check-in summaries up to date."""
+        apply_sessions_to_rollups(self.conn, after_task_id=self.first_task_id)
+        for task_id, checkins in self.new_checkins.items():
+            if task_id in self.stale_stats:
+                continue
+            row = self.conn.execute(
+                "SELECT last_success_date FROM checkin_task_stats "
+                "WHERE checkin_task_id = ?",
+                (task_id,),
+            ).fetchone()
+            last_success = row[0] if row else None
+            if last_success and any(
+                success and checkin_time[:10] < last_success
+                for checkin_time, success in checkins
+            ):
+                self.stale_stats.add(task_id)  # back-dated; recount once
+                continue
+            for checkin_time, success in sorted(checkins):
+                apply_checkin_to_stats(self.conn, task_id, checkin_time, success)
+        if self.stale_stats:
+            refresh_checkin_stats(self.conn, self.stale_stats)
+
+
+def pull(folder, report=None):
+    """Ingest the other devices' segments not seen yet, in one transaction."""
+    conn = connect_db()
+    device_id = get_device(conn)[0]
+    report = report or SyncReport(device_id)
+    with transaction(conn):
+        seen = {device: seq for device, seq, _ in get_peers(conn)}
+        pending = [
+            (device, seq, name)
+            for device, found in sorted(list_segments(folder).items())
+            if device != device_id
+            for seq, name in found
+            if seq > seen.get(device, 0)
+        ]
+        if not pending:
+            return report
+        ingest = _Ingest(conn, report)
+        for device, seq, name in pending:
+            ingest.origin = device
+            for line in _read_segment(os.path.join(folder, name)):
+                ingest.apply(line)
+            seen[device] = seq
+            report.pulled[device] = report.pulled.get(device, 0) + 1
+        ingest.finish()
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT INTO sync_peers (device_id, last_seq, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (device_id) DO UPDATE SET "
+            "last_seq = excluded.last_seq, updated_at = excluded.updated_at",
+            [(device, seen[device], now) for device in report.pulled],
+        )
+    return report
+
+
+def sync(folder=None, send=True, receive=True):
+    """Pull, then push. Returns a SyncReport."""
+    folder = folder or SYNC_DIR
+    if not folder:
+        raise ValueError("No sync folder given (pass one or set APOLOGIES_SYNC_DIR).")
+    os.makedirs(folder, exist_ok=True)
+    report = SyncReport(get_device()[0])
+    if receive:
+        pull(folder, report)
+    if send:
+        push(folder, report)
+    return report
@@ -0,0 +1,187 @@
+"""assistant/task_index.py
+In-memory index of task names for instant completion and "did you mean".
+
+Names come from the task_names catalog and are kept as a sorted list of
+casefolded keys (prefix completion is one bisect plus a short scan) and a
+trigram index (fuzzy matches look only at names sharing a trigram with the
+input). The catalog only ever grows, so refreshing reads just the names added
+since the last refresh.
+"""
+
+import bisect
+from collections import defaultdict
+from contextlib import contextmanager
+
+from apologies_for_being_human import db
+
+FUZZY_THRESHOLD = 0.3  # minimum trigram similarity for a suggestion
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TaskIndex:
+    def __init__(self, names=()):
+        self.last_id = 0
+        self._keys = []  # sorted (casefolded name, name)
+        self._folded = {}  # casefolded name -> first name seen with that key
+        self._grams = defaultdict(set)  # trigram -> names containing it
+        self._gram_counts = {}  # name -> number of distinct trigrams
+        self.add(names)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, names):
+        new = [(name.casefold(), name) for name in names]
+        for key, name in new:
+            self._folded.setdefault(key, name)
+            grams = _trigrams(key)
+            self._gram_counts[name] = len(grams)
+            for gram in grams:
+                self._grams[gram].add(name)
+        self._keys.extend(new)
+        self._keys.sort()
+
+    def refresh(self, conn=None):
+        """Add catalog names created since the last refresh."""
+        conn = conn or db.connect_db()
+        rows = conn.execute(
+            "SELECT task_name_id, task_name FROM task_names "
+            "WHERE task_name_id > ? ORDER BY task_name_id",
+            (self.last_id,),
+        ).fetchall()
+        if rows:
+            self.add(name for _, name in rows)
+            self.last_id = rows[-1][0]
+        return self
+
+    def lookup(self, text):
+        """The catalogued spelling of `text`, ignoring case, or None."""
+        text = text.strip()
+        if text in self._gram_counts:  # exact names win over case variants
+            return text
+        return self._folded.get(text.casefold())
+
+    def complete(self, prefix, limit=10):
+        """Names starting with `prefix` (ignoring case), alphabetically."""
+        key = prefix.casefold()
+        matches = []
+        for folded, name in self._keys[bisect.bisect_left(self._keys, (key, "")) :]:
+            if not folded.startswith(key) or len(matches) >= limit:
+                break
+            matches.append(name)
+        return matches
+
+    def fuzzy(self, text, limit=5, threshold=FUZZY_THRESHOLD):
+        """Names most similar to `text` by trigram overlap, best first."""
+        grams = _trigrams(text.strip().casefold())
+        shared = defaultdict(int)
+        for gram in grams:
+            for name in self._grams.get(gram, ()):
+                shared[name] += 1
+        scored = []
+        for name, count in shared.items():
+            score = count / (len(grams) + self._gram_counts[name] - count)
+            if score >= threshold:
+                scored.append((-score, name))
+        scored.sort()
+        return [name for _, name in scored[:limit]]
+
+    def suggest(self, text, limit=5):
+        """Prefix completions first, then fuzzy matches, without repeats."""
+        suggestions = self.complete(text, limit)
+        for name in self.fuzzy(text, limit):
+            if len(suggestions) >= limit:
+                break
+            if name not in suggestions:
+                suggestions.append(name)
+        return suggestions
+
+
+_index = None
+_index_db = None
+
+
+def get_task_index():
+    """The process-wide index for the current database, brought up to date."""
+    global _index, _index_db
+    path = db.database_path()
+    if _index is None or _index_db != path:
+        _index, _index_db = TaskIndex(), path
+    return _index.refresh()
+
+
+@contextmanager
+def task_name_completion(index):
+    """While active, Tab in input() (and so in Rich prompts) completes task
+    names. Does nothing where the readline module is unavailable."""
+    try:
+        import readline
+    except ImportError:
+        yield
+        return
+    matches = []
+
+    def complete(text, state):
+        if state == 0:
+            matches[:] = index.complete(text, limit=50)
+        return matches[state] if state < len(matches) else None
+
+    saved = readline.get_completer(), readline.get_completer_delims()
+    readline.set_completer(complete)
+    readline.set_completer_delims("")  # names contain spaces
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    try:
+        yield
+    finally:
+        readline.set_completer(saved[0])
+        readline.set_completer_delims(saved[1])
+
+
+def ask_task_name(console, prompt="Task name", existing_only=False, allow_empty=False):
+    """Prompt for a task name with Tab completion.
+
+    Input matching a catalogued name up to case uses the catalogued spelling.
+    Anything else is answered with numbered suggestions; picking a number
+    selects one. Unless `existing_only`, Enter keeps the input as a new task.
+    Returns None for empty input when `allow_empty`.
+    """
+    from rich.prompt import Prompt
+
+    index = get_task_index()
+    with task_name_completion(index):
+        while True:
+            text = Prompt.ask(prompt, default="" if allow_empty else ...).strip()
+            if not text:
+                if allow_empty:
+                    return None
+                console.print("[red]Task name cannot be empty.[/red]")
+                continue
+            known = index.lookup(text)
+            if known is not None:
+                return known
+            suggestions = index.suggest(text)
+            if not suggestions:
+                if existing_only:
+                    console.print(f"[red]No task matches {text!r}.[/red]")
+                    continue
+                return text
+            for number, name in enumerate(suggestions, 1):
+                console.print(f"  [cyan]{number}[/cyan]. {name}")
+            keep = "" if existing_only else f", or Enter to start {text!r}"
+            answer = Prompt.ask(
+                f"Did you mean one of these? Pick a number{keep}",
+                choices=[""] + [str(n) for n in range(1, len(suggestions) + 1)],
+                default="",
+                show_choices=False,
+            )
+            if answer:
+                return suggestions[int(answer) - 1]
+            if not existing_only:
+                return text
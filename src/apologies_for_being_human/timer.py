@@ -0,0 +1,128 @@
+"""assistant/timer.py
+Drift-free session timer driven by monotonic deadlines.
+"""
+
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+
+def _refresh_hz_from_env(default=1.0):
+    """APOLOGIES_REFRESH_HZ, or `default` with a warning when it is unusable."""
+    value = os.environ.get("APOLOGIES_REFRESH_HZ", "").strip()
+    if not value:
+        return default
+    try:
+        hz = float(value)
+    except ValueError:
+        hz = None
+    if hz is None or not math.isfinite(hz) or hz <= 0:
+        print(
+            f"warning: ignoring APOLOGIES_REFRESH_HZ={value!r}, expected a positive "
+            f"number; using {default:g} Hz",
+            file=sys.stderr,
+        )
+        return default
+    return hz
+
+
+DEFAULT_REFRESH_HZ = _refresh_hz_from_env()
+
+
+def _default_clock():
+    """Pick a monotonic clock that keeps counting while the machine is suspended."""
+    if hasattr(time, "CLOCK_BOOTTIME"):  # Linux: CLOCK_MONOTONIC stops during suspend
+        return lambda: time.clock_gettime(time.CLOCK_BOOTTIME)
+    if sys.platform == "darwin":  # time.monotonic() excludes sleep on macOS
+        return lambda: time.clock_gettime(time.CLOCK_MONOTONIC)
+    return time.monotonic
+
+
+def reminder_timings(duration_seconds):
+    """Offsets (seconds) at which reminders fire, spread evenly over the session."""
+    default_interval = 2 * 60
+    prompts_count = max(1, int(duration_seconds / default_interval))
+    return [
+        duration_seconds / (prompts_count + 1) * (i + 1) for i in range(prompts_count)
+    ]
+
+
+@dataclass
+class Tick:
+    elapsed: float
+    remaining: float
+    reminder: int | None = None  # index into reminder_offsets that just fired
+    finished: bool = False
+
+
+class SessionTimer:
+    """Yields UI frames at a fixed rate and reminders at exact offsets.
+
+    Every wake-up recomputes elapsed time from the clock instead of counting
+    loop iterations, so rendering cost or a suspended machine never makes the
+    session run long. `clock` and `sleep` are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        duration,
+        reminder_offsets=(),
+        refresh_hz=DEFAULT_REFRESH_HZ,
+        clock=None,
+        sleep=time.sleep,
+    ):
+        if refresh_hz <= 0:
+            raise ValueError("refresh_hz must be positive")
+        self.duration = float(duration)
+        self.reminder_offsets = sorted(reminder_offsets)
+        self.frame_interval = 1.0 / refresh_hz
+        self.clock = clock or _default_clock()
+        self.sleep = sleep
+        self.next_reminder_index = 0
+        self._start = None
+
+    def start(self, already_elapsed=0.0):
+        self._start = self.clock() - already_elapsed
+        return self
+
+    def elapsed(self):
+        if self._start is None:
+            return 0.0
+        return min(self.clock() - self._start, self.duration)
+
+    def ticks(self):
+        """Generate ticks until the session duration has passed."""
+        if self._start is None:
+            self.start()
+        frame = 0
+        while True:
+            now = self.clock() - self._start
+            if now >= self.duration:
+                yield Tick(self.duration, 0.0, self._due(self.duration), True)
+                return
+            yield Tick(now, self.duration - now, self._due(now))
+
+            # Next frame on the fixed grid; after a stall (slow render or system
+            # sleep) skip the missed frames instead of replaying them.
+            frame = max(frame + 1, int(now / self.frame_interval) + 1)
+            deadline = min(frame * self.frame_interval, self.duration)
+            if self.next_reminder_index < len(self.reminder_offsets):
+                deadline = min(
+                    deadline, self.reminder_offsets[self.next_reminder_index]
+                )
+            delay = deadline - (self.clock() - self._start)
+            if delay > 0:
+                self.sleep(delay)
+
+    def _due(self, elapsed):
+        """Fire the latest reminder whose offset has passed, skipping stale ones."""
+        fired = None
+        while (
+            self.next_reminder_index < len(self.reminder_offsets)
+            and elapsed >= self.reminder_offsets[self.next_reminder_index]
+        ):
+            fired = self.next_reminder_index
+            self.next_reminder_index += 1
+        return fired
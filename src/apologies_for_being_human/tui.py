@@ -0,0 +1,723 @@
+"""assistant/tui.py
+Full-screen mode: one long-lived Rich Live layout instead of clearing the
+terminal between screens.
+
+The screen is split into a main pane (menu and views) and side panes for the
+running focus session, the latest reminder and today's stats. Keys and timer
+ticks arrive on one event queue; each event marks only the panes it affects
+as dirty, and only those are rebuilt before the single refresh. The focus
+timer runs on its own thread, so browsing logs does not pause the session.
+"""
+
+import os
+import queue
+import sys
+import threading
+from datetime import date
+from functools import partial
+
+from rich.console import Console, Group
+from rich.layout import Layout
+from rich.live import Live
+from rich.panel import Panel
+from rich.segment import Segment
+from rich.table import Table
+from rich.text import Text
+
+from apologies_for_being_human import db
+from apologies_for_being_human.core import (
+    PAGE_SIZE,
+    _checkin_record_table,
+    _session_table,
+)
+from apologies_for_being_human.instrumentation import measure
+from apologies_for_being_human.journal import (
+    JournaledSession,
+    describe_orphan,
+    discard_orphan,
+    finalize_orphan,
+    find_orphans,
+)
+from apologies_for_being_human.task_index import get_task_index
+
+ESCAPE_KEYS = {
+    "\x1b[A": "up",
+    "\x1b[B": "down",
+    "\x1b[C": "right",
+    "\x1b[D": "left",
+    "\x1bOA": "up",
+    "\x1bOB": "down",
+}
+SIDE_PANES = ("session", "reminder", "stats")
+
+
+def _split_keys(chunk):
+    """Turn raw terminal input into key names ("up", "enter", "a", ...)."""
+    keys = []
+    i = 0
+    while i < len(chunk):
+        for sequence, name in ESCAPE_KEYS.items():
+            if chunk.startswith(sequence, i):
+                keys.append(name)
+                i += len(sequence)
+                break
+        else:
+            char = chunk[i]
+            if char in "\r\n":
+                keys.append("enter")
+            elif char in "\x7f\x08":
+                keys.append("backspace")
+            elif char == "\x1b":
+                keys.append("escape")
+            elif char == "\x03":
+                keys.append("ctrl-c")
+            elif char == "\t":
+                keys.append("tab")
+            elif char.isprintable():
+                keys.append(char)
+            i += 1
+    return keys
+
+
+class KeyReader:
+    """Reads keys on a daemon thread and posts ("key", name) events."""
+
+    def __init__(self, events):
+        self.events = events
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._saved = None
+
+    def __enter__(self):
+        if os.name != "nt":
+            import termios
+            import tty
+
+            fd = sys.stdin.fileno()
+            self._saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=0.5)
+        if self._saved is not None:
+            import termios
+
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._saved)
+
+    def _run(self):
+        if os.name == "nt":
+            import msvcrt
+
+            while not self._stop.is_set():
+                if msvcrt.kbhit():
+                    char = msvcrt.getwch()
+                    if char in "\x00\xe0":  # arrow keys arrive as two characters
+                        char = {"H": "\x1b[A", "P": "\x1b[B"}.get(msvcrt.getwch(), "")
+                    self._post(char)
+                else:
+                    self._stop.wait(0.02)
+            return
+
+        import select
+
+        fd = sys.stdin.fileno()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], 0.1)
+            if ready:
+                self._post(os.read(fd, 64).decode(errors="ignore"))
+
+    def _post(self, chunk):
+        for key in _split_keys(chunk):
+            self.events.put(("key", key))
+
+
+class CachedPane:
+    """Keeps the rendered lines of a pane until its content is replaced.
+
+    Rich re-renders every region of a Layout on each refresh; wrapping the
+    panes means a timer tick only rebuilds the session pane, while the menu,
+    tables and stats reuse the lines rendered last time.
+    """
+
+    def __init__(self, renderable):
+        self.renderable = renderable
+        self._size = None
+        self._lines = None
+
+    def __rich_console__(self, console, options):
+        size = (options.max_width, options.height)
+        if size != self._size:
+            self._lines = console.render_lines(self.renderable, options, pad=True)
+            self._size = size
+        new_line = Segment.line()
+        for line in self._lines:
+            yield from line
+            yield new_line
+
+
+class FocusRunner:
+    """A focus session that runs on a background thread and logs itself.
+
+    `on_change(panes)` is called from the timer thread with the names of the
+    side panes that need a redraw. `resume` is an orphaned
+    journal.ActiveSession to continue.
+    """
+
+    def __init__(self, task_name, duration_minutes, on_change, resume=None):
+        self.task_name = task_name
+        self.duration_seconds = duration_minutes * 60
+        self.on_change = on_change
+        self.elapsed = resume.elapsed_seconds if resume else 0.0
+        self.reminder = "Stay focused..."
+        self.logged_minutes = None
+        self._stop = threading.Event()
+        # Event.wait doubles as an interruptible sleep for the timer.
+        self.focus = JournaledSession(
+            task_name, self.duration_seconds, resume=resume, sleep=self._stop.wait
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    @property
+    def distractions(self):
+        return self.focus.distractions
+
+    @distractions.setter
+    def distractions(self, value):
+        self.focus.distractions = value  # checkpointed with the next tick
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """End the session early; the elapsed time is still logged."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            for tick in self.focus.ticks():
+                if self._stop.is_set():
+                    break
+                self.elapsed = tick.elapsed
+                if tick.reminder is not None:
+                    self.reminder = self.focus.reminder()
+                    self.on_change(("session", "reminder"))
+                else:
+                    self.on_change(("session",))
+        finally:
+            self.focus.finish()
+            self.logged_minutes = round(self.focus.elapsed() / 60, 2)
+            self.on_change(SIDE_PANES)
+
+
+class MenuView:
+    title = "Menu"
+    hint = "↑/↓ or number, Enter to open, q to quit"
+    captures_text = False
+
+    ITEMS = (
+        ("Start focus session", "start"),
+        ("Task log", "log"),
+        ("Check-in", "checkin"),
+        ("Check-in records", "records"),
+        ("Check-in statistics", "stats"),
+        ("Quit", "quit"),
+    )
+
+    def __init__(self):
+        self.cursor = 0
+
+    def render(self):
+        lines = []
+        for i, (label, _) in enumerate(self.ITEMS):
+            style = "reverse bold cyan" if i == self.cursor else ""
+            lines.append(Text(f" {i + 1}. {label} ", style=style))
+        return Group(*lines)
+
+    def handle(self, app, key):
+        if key in ("up", "k"):
+            self.cursor = (self.cursor - 1) % len(self.ITEMS)
+        elif key in ("down", "j"):
+            self.cursor = (self.cursor + 1) % len(self.ITEMS)
+        elif key.isdigit() and 1 <= int(key) <= len(self.ITEMS):
+            self.cursor = int(key) - 1
+            app.open(self.ITEMS[self.cursor][1])
+        elif key == "enter":
+            app.open(self.ITEMS[self.cursor][1])
+        elif key == "q":
+            app.open("quit")
+        else:
+            return False
+        return True
+
+
+class FormView:
+    """Line-edited fields; Enter moves to the next field, then submits.
+
+    Typing into a field that still shows its default replaces the default.
+    `completions` maps a field index to a function returning suggestions for
+    the current text; Tab takes the first one.
+    """
+
+    hint = "Type, Tab to complete, Enter for next field, Esc to cancel"
+    captures_text = True
+
+    def __init__(self, title, fields, on_submit, completions=None):
+        self.title = title
+        self.fields = [[label, default] for label, default in fields]
+        self.on_submit = on_submit
+        self.completions = completions or {}
+        self.index = 0
+        self.touched = set()
+        self.error = ""
+
+    def render(self):
+        lines = []
+        for i, (label, value) in enumerate(self.fields):
+            cursor = "█" if i == self.index else ""
+            style = "bold" if i == self.index else "dim"
+            lines.append(Text(f"{label}: {value}{cursor}", style=style))
+            if i == self.index and value and i in self.completions:
+                suggestions = self.completions[i](value)
+                if suggestions:
+                    lines.append(Text("  " + " · ".join(suggestions), style="dim"))
+        if self.error:
+            lines.append(Text(self.error, style="red"))
+        return Group(*lines)
+
+    def handle(self, app, key):
+        field = self.fields[self.index]
+        if key == "escape":
+            app.back()
+        elif key == "backspace":
+            field[1] = field[1][:-1]
+            self.touched.add(self.index)
+        elif key == "tab":
+            if self.index not in self.completions:
+                return False
+            suggestions = self.completions[self.index](field[1])
+            if suggestions:
+                field[1] = suggestions[0]
+                self.touched.add(self.index)
+        elif key == "enter":
+            if self.index + 1 < len(self.fields):
+                self.index += 1
+            else:
+                self.error = self.on_submit(app, [value for _, value in self.fields])
+        elif len(key) == 1:
+            if self.index not in self.touched:
+                field[1] = ""
+                self.touched.add(self.index)
+            field[1] += key
+        else:
+            return False
+        return True
+
+
+class PagedView:
+    """Keyset-paged table; `fetch_page(cursor, backward)` returns a db.Page."""
+
+    hint = "n next page, p previous page, Esc back"
+    captures_text = False
+
+    def __init__(self, title, fetch_page, render_rows):
+        self.title = title
+        self.fetch_page = fetch_page
+        self.render_rows = render_rows
+        self.page = fetch_page(None, False)
+
+    def render(self):
+        if not self.page.rows:
+            return Text("No matching records.", style="yellow")
+        return self.render_rows(self.page.rows)
+
+    def handle(self, app, key):
+        if key == "n" and self.page.has_next:
+            self.page = self.fetch_page(self.page.last_key, False)
+        elif key == "p" and self.page.has_previous:
+            self.page = self.fetch_page(self.page.first_key, True)
+        elif key in ("escape", "q"):
+            app.back()
+        else:
+            return False
+        return True
+
+
+class CheckinView:
+    title = "Check-in"
+    hint = "↑/↓ to pick, Enter = done, m = missed, Esc back"
+    captures_text = False
+
+    def __init__(self):
+        self.tasks = db.get_checkin_tasks()
+        self.done = db.get_checked_in_task_ids(date.today().isoformat())
+        self.cursor = 0
+
+    def render(self):
+        if not self.tasks:
+            return Text("No check-in tasks found. Please create one first.")
+        lines = []
+        for i, (task_id, name, _) in enumerate(self.tasks):
+            mark = "✓" if task_id in self.done else "·"
+            style = "reverse bold cyan" if i == self.cursor else ""
+            lines.append(Text(f" {mark} {name} ", style=style))
+        return Group(*lines)
+
+    def handle(self, app, key):
+        if key in ("escape", "q"):
+            app.back()
+        elif not self.tasks:
+            return False
+        elif key in ("up", "k"):
+            self.cursor = (self.cursor - 1) % len(self.tasks)
+        elif key in ("down", "j"):
+            self.cursor = (self.cursor + 1) % len(self.tasks)
+        elif key in ("enter", "m"):
+            task_id, name, _ = self.tasks[self.cursor]
+            db.log_checkin(task_id, key == "enter", "")
+            self.done.add(task_id)
+            app.status = (
+                f"Checked in: {name} ({'done' if key == 'enter' else 'missed'})"
+            )
+            app.mark_dirty("stats", "footer")
+        else:
+            return False
+        return True
+
+
+class RecoverView:
+    """Sessions a crash left unfinished: resume, log or discard each one."""
+
+    title = "Unfinished sessions"
+    hint = "↑/↓ to pick, r resume, l log time so far, d discard, Esc later"
+    captures_text = False
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.cursor = 0
+
+    def render(self):
+        lines = [Text("These sessions were cut short by a crash or a closed window.")]
+        for i, session in enumerate(self.sessions):
+            style = "reverse bold cyan" if i == self.cursor else ""
+            lines.append(Text(f" {describe_orphan(session)} ", style=style))
+        return Group(*lines)
+
+    def handle(self, app, key):
+        if key in ("escape", "q"):
+            app.back()
+            return True
+        if key in ("up", "k"):
+            self.cursor = (self.cursor - 1) % len(self.sessions)
+            return True
+        if key in ("down", "j"):
+            self.cursor = (self.cursor + 1) % len(self.sessions)
+            return True
+        if key not in ("r", "l", "d"):
+            return False
+        session = self.sessions[self.cursor]
+        if key == "r":
+            if app.session is not None and app.session.running:
+                app.status = "A session is already running (s to stop it)."
+                return True
+            app.session = FocusRunner(
+                session.task_name,
+                session.duration_seconds / 60,
+                app._session_changed,
+                resume=session,
+            ).start()
+            app.status = f"Session resumed: {session.task_name}"
+            app.mark_dirty(*SIDE_PANES)
+        elif key == "l":
+            finalize_orphan(session)
+            app.status = (
+                f"Logged {session.elapsed_seconds / 60:.1f} min on {session.task_name}"
+            )
+            app.mark_dirty("stats")
+        else:
+            discard_orphan(session)
+            app.status = f"Discarded: {session.task_name}"
+        self.sessions.pop(self.cursor)
+        self.cursor = min(self.cursor, max(len(self.sessions) - 1, 0))
+        if not self.sessions:
+            app.back()
+        app.mark_dirty("footer")
+        return True
+
+
+class StatsView:
+    title = "Check-in statistics"
+    hint = "Esc back"
+    captures_text = False
+
+    def render(self):
+        from apologies_for_being_human.statistics import get_checkin_task_statistics
+
+        table = Table(expand=True)
+        table.add_column("Task")
+        table.add_column("Done", justify="right")
+        table.add_column("Rate", justify="right")
+        table.add_column("Streak", justify="right")
+        table.add_column("Best", justify="right")
+        for (
+            name,
+            total,
+            completed,
+            rate,
+            _,
+            current,
+            longest,
+        ) in get_checkin_task_statistics():
+            table.add_row(
+                name, f"{completed}/{total}", f"{rate:.0f}%", str(current), str(longest)
+            )
+        return table
+
+    def handle(self, app, key):
+        if key in ("escape", "q"):
+            app.back()
+            return True
+        return False
+
+
+class App:
+    def __init__(self, console):
+        self.console = console
+        self.events = queue.Queue()
+        self.views = [MenuView()]
+        self.session = None
+        self.status = ""
+        self.running = True
+        self.dirty = set()
+        self.layout = Layout(name="root")
+        self.layout.split_column(Layout(name="main"), Layout(name="footer", size=1))
+        self.layout["main"].split_row(
+            Layout(name="view", ratio=2), Layout(name="side", ratio=1)
+        )
+        self.layout["side"].split_column(
+            Layout(name="session", size=7),
+            Layout(name="reminder", size=6),
+            Layout(name="stats"),
+        )
+        self.mark_dirty("view", "footer", *SIDE_PANES)
+
+    @property
+    def view(self):
+        return self.views[-1]
+
+    def mark_dirty(self, *panes):
+        self.dirty.update(panes)
+
+    def open(self, name):
+        if name == "quit":
+            self.running = False
+        elif name == "start":
+            if self.session is not None and self.session.running:
+                self.status = "A session is already running (s to stop it)."
+            else:
+                self.views.append(
+                    FormView(
+                        "Start focus session",
+                        [("Task name", ""), ("Minutes", "25")],
+                        App._start_session,
+                        {0: lambda text: get_task_index().suggest(text, limit=3)},
+                    )
+                )
+        elif name == "log":
+            self.views.append(
+                PagedView(
+                    "Task log",
+                    partial(db.get_session_page, page_size=PAGE_SIZE),
+                    _session_table,
+                )
+            )
+        elif name == "records":
+            self.views.append(
+                PagedView(
+                    "Check-in records",
+                    partial(db.get_checkin_record_page, page_size=PAGE_SIZE),
+                    _checkin_record_table,
+                )
+            )
+        elif name == "checkin":
+            self.views.append(CheckinView())
+        elif name == "stats":
+            self.views.append(StatsView())
+        self.mark_dirty("view", "footer")
+
+    def back(self):
+        if len(self.views) > 1:
+            self.views.pop()
+        self.mark_dirty("view", "footer")
+
+    @staticmethod
+    def _start_session(app, values):
+        task_name, minutes = values
+        if not task_name.strip():
+            return "Task name cannot be empty."
+        try:
+            minutes = float(minutes)
+        except ValueError:
+            return "Minutes must be a number."
+        if minutes <= 0:
+            return "Minutes must be positive."
+        task_name = get_task_index().lookup(task_name) or task_name.strip()
+        app.session = FocusRunner(task_name, minutes, app._session_changed)
+        app.session.start()
+        app.status = f"Session started: {task_name}"
+        app.back()
+        app.mark_dirty(*SIDE_PANES)
+        return ""
+
+    def _session_changed(self, panes):
+        # Called from the timer thread; the UI thread does the drawing.
+        self.events.put(("dirty", panes))
+
+    def handle_key(self, key):
+        if key == "ctrl-c":
+            self.running = False
+            return
+        self.status = ""
+        if self.view.handle(self, key):
+            self.mark_dirty("view", "footer")
+            return
+        session = self.session
+        if session is not None and session.running and not self.view.captures_text:
+            if key == "x":
+                session.distractions += 1
+                self.mark_dirty("session")
+            elif key == "s":
+                session.stop()
+        self.mark_dirty("footer")
+
+    def render_view(self):
+        return Panel(self.view.render(), title=self.view.title, border_style="cyan")
+
+    def render_session(self):
+        session = self.session
+        if session is None:
+            body = Text("No session running.\nPress 1 to start one.", style="dim")
+        elif session.logged_minutes is None:
+            remaining = max(0, session.duration_seconds - session.elapsed)
+            minutes, seconds = divmod(int(remaining + 0.5), 60)
+            done = session.elapsed / session.duration_seconds if remaining else 1
+            width = 20
+            bar = "█" * int(done * width) + "░" * (width - int(done * width))
+            body = Text.assemble(
+                (session.task_name + "\n", "bold"),
+                (f"{minutes:02d}:{seconds:02d} left\n", "green"),
+                (bar + "\n", "green"),
+                (f"distractions: {session.distractions} (x to add, s to stop)", "dim"),
+            )
+        else:
+            body = Text(
+                f"✅ {session.task_name}\nLogged {session.logged_minutes:g} min, "
+                f"{session.distractions} distractions.",
+                style="green",
+            )
+        return Panel(body, title="Session", border_style="green")
+
+    def render_reminder(self):
+        text = self.session.reminder if self.session else "Stay focused..."
+        return Panel(Text(text, style="italic"), title="Reminder", border_style="blue")
+
+    def render_stats(self):
+        today = date.today().isoformat()
+        minutes, sessions, distractions = db.get_focus_totals(today)
+        done = len(db.get_checked_in_task_ids(today))
+        total = len(db.get_checkin_tasks())
+        body = Text.assemble(
+            ("Focus today\n", "bold"),
+            f"{minutes:g} min in {sessions} sessions\n",
+            f"{distractions} distractions\n\n",
+            ("Check-ins\n", "bold"),
+            f"{done}/{total} done today",
+        )
+        return Panel(body, title=today, border_style="magenta")
+
+    def render_footer(self):
+        return Text(f" {self.view.hint}   {self.status}", style="dim", no_wrap=True)
+
+    def redraw(self):
+        """Rebuild the dirty panes; returns False if nothing changed."""
+        if not self.dirty:
+            return False
+        for pane in self.dirty:
+            self.layout[pane].update(CachedPane(getattr(self, f"render_{pane}")()))
+        self.dirty.clear()
+        return True
+
+    def _watch_resize(self):
+        try:
+            import signal
+
+            signal.signal(
+                signal.SIGWINCH,
+                lambda *_: self.events.put(("dirty", ("view", "footer", *SIDE_PANES))),
+            )
+        except (ImportError, AttributeError, ValueError):
+            pass  # no SIGWINCH on Windows; the next event redraws at the new size
+
+    def _loop(self, live):
+        while self.running:
+            event = self.events.get()
+            while True:  # apply everything queued before drawing once
+                kind, value = event
+                if kind == "key":
+                    self.handle_key(value)
+                else:
+                    self.mark_dirty(*value)
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+            with measure("render.tui_frame"):
+                if self.redraw():
+                    live.refresh()
+
+    def run(self):
+        self._watch_resize()
+        self.redraw()
+        with (
+            KeyReader(self.events),
+            Live(
+                self.layout,
+                console=self.console,
+                screen=True,
+                auto_refresh=False,
+                redirect_stdout=False,
+                redirect_stderr=False,
+            ) as live,
+        ):
+            live.refresh()
+            try:
+                self._loop(live)
+            except KeyboardInterrupt:
+                pass
+        if self.session is not None and self.session.running:
+            self.session.stop()
+            self.console.print(
+                f"Session ended early: logged {self.session.logged_minutes:g} min "
+                f"on {self.session.task_name}."
+            )
+
+
+def run_tui():
+    db.init_db()
+    app = App(Console())
+    orphans = find_orphans()
+    if orphans:
+        app.views.append(RecoverView(orphans))
+    app.run()
+
+
+if __name__ == "__main__":
+    run_tui()
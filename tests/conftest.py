@@ -0,0 +1,15 @@
+import pytest
+
+from apologies_for_being_human import db, query_cache
+from apologies_for_being_human.connection import close_connections
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh database file in tmp_path; its path is returned, unmigrated."""
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(db, "DB_FILE", path)
+    query_cache.clear()
+    yield path
+    close_connections()
+    query_cache.clear()
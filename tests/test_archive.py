@@ -0,0 +1,158 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import archive, db
+from apologies_for_being_human.connection import transaction
+
+
+def _log(name, start, minutes=25, distractions=0):
+    db.log_task(name, start, start + timedelta(minutes=minutes), distractions)
+
+
+def _checkin(task_id, when, success):
+    with transaction(db.connect_db()) as conn:
+        conn.execute(
+            "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, "
+            "note) VALUES (?, ?, ?, '')",
+            (task_id, when.isoformat(), success),
+        )
+        db.apply_checkin_to_stats(conn, task_id, when.isoformat(), success)
+
+
+def _history():
+    """Sessions over four months, several at the same minute, and check-ins."""
+    names = ("Read", "Write", "Code")
+    for i in range(40):
+        start = datetime(2025, 1, 1, 9) + timedelta(days=i * 3, minutes=i % 2)
+        _log(names[i % 3], start, minutes=10 + i, distractions=i % 4)
+        if i % 5 == 0:
+            _log(names[(i + 1) % 3], start)  # same start_time, next task_id
+    for i in range(90):
+        _checkin(1 + i % 2, datetime(2025, 1, 1, 20) + timedelta(days=i), i % 7 != 3)
+
+
+def _rollups(conn):
+    return {
+        table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+        for table in ("focus_daily", "focus_weekly")
+    }
+
+
+def _stats(conn):
+    return conn.execute("SELECT * FROM checkin_task_stats ORDER BY 1").fetchall()
+
+
+def test_archive_month_moves_rows_and_replaces_the_segment(database):
+    db.init_db()
+    conn = db.connect_db()
+    _log("Read", datetime(2025, 1, 5, 9))
+    _log("Read", datetime(2025, 1, 3, 9))
+    _log("Write", datetime(2025, 2, 1, 9))
+
+    assert archive.archive_month(conn, "sessions", "2025-01") == 2
+    assert conn.execute("SELECT count(*) FROM tasks").fetchone() == (1,)
+    [(kind, month, first, rows, min_date, max_date)] = archive.get_segments(conn)
+    assert (kind, month, rows, min_date, max_date) == (
+        "sessions",
+        "2025-01",
+        2,
+        "2025-01-03",
+        "2025-01-05",
+    )
+    path = os.path.join(archive.archive_dir(conn), first)
+    assert [row[0] for row in archive.load_segment(path)] == [2, 1]  # time order
+
+    # A late arrival for an archived month goes into a new generation.
+    _log("Write", datetime(2025, 1, 4, 9))
+    assert archive.archive_month(conn, "sessions", "2025-01") == 1
+    [(_, _, second, rows, _, _)] = archive.get_segments(conn)
+    assert rows == 3 and second != first
+    assert not os.path.exists(path)
+    assert archive.archive_month(conn, "sessions", "2025-01") == 0
+
+
+def test_page_rows_seeks_from_any_cursor(database):
+    db.init_db()
+    _history()
+    conn = db.connect_db()
+    archive.archive_old_data(conn, 30, today=date(2025, 6, 15))
+    segments = archive.find_segments(conn, "sessions")
+    assert len(segments) == 4
+    key = archive._sort_key("sessions")
+    rows = sorted(
+        (row for _, path in segments for row in archive.load_segment(path)), key=key
+    )
+
+    for i, row in enumerate(rows):
+        cursor = key(row)
+        assert (
+            archive.page_rows(conn, "sessions", cursor, False, 5) == rows[i + 1 :][:5]
+        )
+        assert (
+            archive.page_rows(conn, "sessions", cursor, True, 5) == rows[:i][::-1][:5]
+        )
+    assert archive.page_rows(conn, "sessions", None, False, 3) == rows[:3]
+    bound = key(rows[4])
+    assert archive.page_rows(conn, "sessions", None, False, 10, bound) == rows[:4]
+    write = [row for row in rows if row[1] == "Write"]
+    found = archive.page_rows(conn, "sessions", None, True, 99, task="Write")
+    assert found == write[::-1]
+
+
+@pytest.mark.parametrize("task_name", [None, "Read"])
+def test_session_pages_span_hot_and_archived_rows(database, task_name):
+    db.init_db()
+    _history()
+    expected = list(db.iter_sessions(page_size=1000, task_name=task_name))
+
+    archive.archive_old_data(db.connect_db(), 30, today=date(2025, 4, 15))
+    assert db.connect_db().execute("SELECT count(*) FROM tasks").fetchone()[0] > 0
+
+    forward, pages, cursor = [], [], None
+    while True:
+        page = db.get_session_page(cursor, page_size=4, task_name=task_name)
+        forward.extend(page.rows)
+        pages.append(page)
+        if not page.has_next:
+            break
+        cursor = page.last_key
+    assert forward == expected
+
+    backward = []
+    for page in reversed(pages[1:]):
+        previous = db.get_session_page(
+            page.first_key, backward=True, page_size=4, task_name=task_name
+        )
+        backward[:0] = previous.rows
+    assert backward == expected[: len(backward)]
+    assert backward == forward[: len(forward) - len(pages[-1].rows)]
+
+
+def test_rollups_and_checkin_stats_count_archived_rows(database):
+    db.init_db()
+    _history()
+    conn = db.connect_db()
+    rollups, stats = _rollups(conn), _stats(conn)
+
+    moved = archive.archive_old_data(conn, 30, today=date(2025, 6, 15))
+    assert sum(moved["sessions"].values()) == 48
+    assert sum(moved["checkins"].values()) == 90
+    assert _rollups(conn) == rollups
+    assert _stats(conn) == stats
+
+    db.rebuild_rollups()
+    assert _rollups(conn) == rollups
+    assert db.rebuild_checkin_stats(verify_only=True) == {}
+    db.refresh_checkin_stats()
+    assert _stats(conn) == stats
+
+
+@pytest.mark.parametrize("value", ["abc", "0", "-30", "1.5"])
+def test_bad_retention_env_is_rejected_when_archiving(monkeypatch, value):
+    monkeypatch.setenv("APOLOGIES_ARCHIVE_DAYS", value)
+    with pytest.raises(ValueError, match="APOLOGIES_ARCHIVE_DAYS"):
+        archive.retention_cutoff()
+    monkeypatch.setenv("APOLOGIES_ARCHIVE_DAYS", " 90 ")
+    assert archive.retention_cutoff(today=date(2025, 6, 15)) == "2025-03-01"
@@ -0,0 +1,87 @@
+from datetime import date, datetime
+
+import pytest
+
+from apologies_for_being_human import archive, db
+from apologies_for_being_human.connection import transaction
+
+
+def _checkin(when, success, task_id=1):
+    with transaction(db.connect_db()) as conn:
+        conn.execute(
+            "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, "
+            "note) VALUES (?, ?, ?, '')",
+            (task_id, when, success),
+        )
+        db.apply_checkin_to_stats(conn, task_id, when, success)
+
+
+def _stored(conn):
+    return {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
+            f"SELECT checkin_task_id, {', '.join(db.CHECKIN_STATS_FIELDS)} "
+            "FROM checkin_task_stats"
+        )
+    }
+
+
+# (checkin_time, success, task_id), applied one at a time.
+MIXED = [
+    ("2025-03-03T20:00:00", 1, 1),
+    ("2025-03-04T20:00:00", 1, 1),
+    ("2025-03-04T21:00:00", 1, 1),  # same-day duplicate
+    ("2025-03-05T20:00:00", 0, 1),  # failure after a success
+    ("2025-03-05T21:00:00", 1, 1),  # success after the failure, same day
+    ("2025-03-01T20:00:00", 0, 1),  # back-dated failure
+    ("2025-03-02T20:00:00", 1, 1),  # back-dated success that joins the run
+    ("2025-03-08T20:00:00", 1, 1),  # a gap starts a new run
+    ("2025-03-07T09:00:00", 1, 1),  # back-dated success that extends it
+    ("2025-03-07T10:00:00", 0, 1),
+    ("2025-03-06T20:00:00", 0, 2),
+    ("2025-03-06T08:00:00", 1, 2),  # earlier the same day than the failure
+    ("2025-03-06T09:00:00", 1, 2),
+]
+
+
+def test_incremental_stats_match_a_recompute_at_every_step(database):
+    db.init_db()
+    conn = db.connect_db()
+    for when, success, task_id in MIXED:
+        _checkin(when, success, task_id)
+        assert _stored(conn) == db.compute_checkin_stats(conn)
+    # Runs 03-02..03-05 and 03-07..03-08.
+    assert _stored(conn)[1] == (10, 7, "2025-03-08T20:00:00", "2025-03-08", 2, 4)
+    assert _stored(conn)[2] == (3, 2, "2025-03-06T20:00:00", "2025-03-06", 1, 1)
+
+
+@pytest.mark.parametrize("split", [3, 6, 9])
+def test_incremental_stats_match_a_recompute_over_archived_history(database, split):
+    db.init_db()
+    conn = db.connect_db()
+    old = [
+        (f"2025-01-{day:02d}T20:00:00", day % 4 != 0, 1 + day % 2)
+        for day in range(1, 29)
+    ]
+    for when, success, task_id in old:
+        _checkin(when, success, task_id)
+    moved = archive.archive_old_data(conn, 30, today=date(2025, 3, 15))
+    assert sum(moved["checkins"].values()) == len(old)
+    assert conn.execute("SELECT count(*) FROM checkin_records").fetchone() == (0,)
+
+    # New check-ins, interleaved with back-dated ones that land before,
+    # between and next to the archived days.
+    for when, success, task_id in (
+        MIXED[:split]
+        + [
+            ("2025-01-29T20:00:00", 1, 1),  # extends an archived run
+            ("2025-01-15T12:00:00", 1, 2),  # back-dated into archived history
+            ("2025-01-04T12:00:00", 1, 1),  # fills a gap in the archived runs
+            ("2025-02-01T08:00:00", 0, 2),
+        ]
+        + MIXED[split:]
+    ):
+        _checkin(when, success, task_id)
+        assert _stored(conn) == db.compute_checkin_stats(conn)
+    assert db.rebuild_checkin_stats(verify_only=True) == {}
+    assert datetime.fromisoformat(_stored(conn)[1][2]) == datetime(2025, 3, 8, 20)
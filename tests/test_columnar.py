@@ -0,0 +1,225 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import db
+from apologies_for_being_human.connection import transaction
+
+columnar = pytest.importorskip("apologies_for_being_human.columnar")  # needs NumPy
+
+WEEKDAY = "(CAST(strftime('%w', {}) AS INTEGER) + 6) % 7"  # Monday is 0
+
+
+def _history():
+    names = ("Read", "Write", "Code")
+    start = datetime(2024, 12, 28, 7, 15)
+    for i in range(60):
+        minutes = (5, 20, 45, 75, 120)[i % 5] + i % 3
+        db.log_task(names[i % 3], start, start + timedelta(minutes=minutes), i % 4)
+        start += timedelta(hours=13, minutes=7 * i)
+    conn = db.connect_db()
+    with transaction(conn):
+        for i in range(50):
+            when = (datetime(2025, 1, 1, 20) + timedelta(hours=17 * i)).isoformat()
+            task_id = 1 + i % 3
+            conn.execute(
+                "INSERT INTO checkin_records (checkin_task_id, checkin_time, "
+                "success, note) VALUES (?, ?, ?, '')",
+                (task_id, when, i % 4 != 1),
+            )
+            db.apply_checkin_to_stats(conn, task_id, when, i % 4 != 1)
+
+
+def _grouped(conn, sql, params, size):
+    values = [0.0] * size
+    for key, value in conn.execute(sql, params):
+        values[key] = round(value, 2)
+    return values
+
+
+def _sql_session_report(conn, since=None, until=None, task=None):
+    where, params = ["1"], []
+    if since:
+        where.append("t.start_date >= ?")
+        params.append(since)
+    if until:
+        where.append("t.start_date <= ?")
+        params.append(until)
+    if task:
+        where.append("n.task_name = ?")
+        params.append(task)
+    source = f"{db.SESSIONS_FROM} WHERE {' AND '.join(where)}"
+    sessions, minutes, distractions = conn.execute(
+        f"SELECT count(*), total(t.duration), total(t.distractions) FROM {source}",
+        params,
+    ).fetchone()
+    by_task_year = {}
+    for name, year, total in conn.execute(
+        "SELECT n.task_name, substr(t.start_time, 1, 4), total(t.duration) "
+        f"FROM {source} GROUP BY 1, 2",
+        params,
+    ):
+        by_task_year.setdefault(name, {})[year] = round(total, 2)
+    lengths = {
+        bucket: (count, total)
+        for bucket, count, total in conn.execute(
+            "SELECT CASE WHEN duration < 15 THEN 0 WHEN duration < 30 THEN 1 "
+            "WHEN duration < 60 THEN 2 WHEN duration < 90 THEN 3 ELSE 4 END, "
+            f"count(*), total(t.distractions) FROM {source} GROUP BY 1",
+            params,
+        )
+    }
+    return {
+        "sessions": sessions,
+        "minutes": round(minutes, 2),
+        "distractions": int(distractions),
+        "minutes_by_hour": _grouped(
+            conn,
+            "SELECT CAST(substr(t.start_time, 12, 2) AS INTEGER), "
+            f"total(t.duration) FROM {source} GROUP BY 1",
+            params,
+            24,
+        ),
+        "minutes_by_weekday": _grouped(
+            conn,
+            f"SELECT {WEEKDAY.format('t.start_time')}, total(t.duration) "
+            f"FROM {source} GROUP BY 1",
+            params,
+            7,
+        ),
+        "distractions_by_length": [
+            (label, *lengths.get(bucket, (0, 0)))
+            for bucket, label in enumerate(columnar.LENGTH_LABELS)
+        ],
+        "minutes_by_task_year": by_task_year,
+    }
+
+
+def _sql_checkin_report(conn, since=None, until=None):
+    where, params = ["1"], []
+    if since:
+        where.append("cr.checkin_date >= ?")
+        params.append(since)
+    if until:
+        where.append("cr.checkin_date <= ?")
+        params.append(until)
+    source = (
+        "checkin_records cr JOIN checkin_tasks ct USING (checkin_task_id) "
+        f"WHERE {' AND '.join(where)}"
+    )
+    checkins, completed = conn.execute(
+        f"SELECT count(*), total(cr.success) FROM {source}", params
+    ).fetchone()
+    by_weekday = [0.0] * 7
+    for day, total, done in conn.execute(
+        f"SELECT {WEEKDAY.format('cr.checkin_time')}, count(*), total(cr.success) "
+        f"FROM {source} GROUP BY 1",
+        params,
+    ):
+        by_weekday[day] = round(done / total, 4)
+    return {
+        "checkins": checkins,
+        "success_rate": round(completed / checkins, 4) if checkins else 0.0,
+        "success_rate_by_weekday": by_weekday,
+        "success_rate_by_task": {
+            name: round(done / total, 4)
+            for name, total, done in conn.execute(
+                "SELECT ct.checkin_task_name, count(*), total(cr.success) "
+                f"FROM {source} GROUP BY 1",
+                params,
+            )
+        },
+    }
+
+
+def _comparable(report):
+    report = dict(report)
+    report["distractions_by_length"] = [
+        (row["length"], row["sessions"], row["distractions_per_session"])
+        for row in report["distractions_by_length"]
+    ]
+    return report
+
+
+def _expected(sql):
+    sql = dict(sql)
+    sql["distractions_by_length"] = [
+        (label, count, round(total / count, 3) if count else 0.0)
+        for label, count, total in sql["distractions_by_length"]
+    ]
+    return sql
+
+
+def _close(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_close(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(map(_close, a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, abs_tol=0.011)
+    return a == b
+
+
+@pytest.mark.parametrize(
+    ("since", "until", "task"),
+    [
+        (None, None, None),
+        ("2025-01-05", None, None),
+        (None, "2025-01-20", "Write"),
+        ("2025-01-03", "2025-01-25", "Code"),
+        (None, None, "No such task"),
+    ],
+)
+def test_reports_match_sql(database, since, until, task):
+    db.init_db()
+    _history()
+    conn = db.connect_db()
+    snapshot = columnar.load(conn)
+    assert len(snapshot) == 60
+
+    focus = _comparable(columnar.session_report(snapshot, since, until, task))
+    assert _close(focus, _expected(_sql_session_report(conn, since, until, task)))
+    checkins = columnar.checkin_report(snapshot, since, until)
+    assert _close(checkins, _sql_checkin_report(conn, since, until))
+
+
+def _generation(conn):
+    return columnar._read_meta(columnar.snapshot_dir(conn))["generation"]
+
+
+def test_refresh_appends_new_rows_and_rebuilds_after_edits(database):
+    db.init_db()
+    _history()
+    conn = db.connect_db()
+    assert columnar.refresh(conn) == {"sessions": 60, "checkins": 50}
+    assert columnar.refresh(conn) == {"sessions": 0, "checkins": 0}
+
+    start = datetime(2025, 2, 1, 9)
+    db.log_task("Read", start, start + timedelta(minutes=30), 0)
+    assert columnar.refresh(conn) == {"sessions": 1, "checkins": 0}
+    assert _generation(conn) == 1
+
+    # What a sync merge of equal sessions does: only the end time moves, so
+    # every total stays the same.
+    conn.execute(
+        "UPDATE tasks SET end_time = '2025-02-01T09:31:00' "
+        "WHERE start_time = '2025-02-01T09:00:00'"
+    )
+    assert columnar.refresh(conn) == {"sessions": 61, "checkins": 50}
+    assert _generation(conn) == 2
+    snapshot = columnar.load(conn, refresh_first=False)
+    assert (
+        snapshot.sessions["end"][-1]
+        == columnar._epoch_seconds(["2025-02-01T09:31:00"])[0]
+    )
+
+    # Rewriting a value unchanged, like a merge that only fills a note, is
+    # not an edit.
+    conn.execute("UPDATE checkin_records SET success = success, note = 'later'")
+    assert columnar.refresh(conn) == {"sessions": 0, "checkins": 0}
+
+    conn.execute("DELETE FROM tasks WHERE start_time = '2025-02-01T09:00:00'")
+    db.rebuild_rollups()
+    assert columnar.refresh(conn) == {"sessions": 60, "checkins": 50}
+    assert _generation(conn) == 3
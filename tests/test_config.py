@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import config, db, reporting
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    """Empty config/data dirs and working directory, with no APOLOGIES_* set."""
+    for name in ("APOLOGIES_DB", "APOLOGIES_PROFILE", "APOLOGIES_CONFIG"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(sys, "platform", "linux")
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _write_config(dirs, text):
+    path = dirs / "config" / config.APP_NAME / "config.toml"
+    path.parent.mkdir(parents=True)
+    path.write_text(text)
+
+
+def test_resolve_order(dirs, monkeypatch):
+    data = dirs / "data" / config.APP_NAME
+    assert config.resolve_db_path() == str(data / config.DB_FILENAME)
+
+    (dirs / "logs").mkdir()
+    (dirs / "logs" / config.DB_FILENAME).touch()
+    assert config.resolve_db_path() == str(dirs / "logs" / config.DB_FILENAME)
+
+    _write_config(dirs, 'profile = "home"\n[profiles]\nwork = "~/focus/work.db"\n')
+    assert config.resolve_db_path() == str(data / "profiles" / "home.db")
+
+    monkeypatch.setenv("APOLOGIES_PROFILE", "work")
+    expected = os.path.join(os.path.expanduser("~"), "focus", "work.db")
+    assert config.resolve_db_path() == expected
+
+    monkeypatch.setenv("APOLOGIES_DB", "explicit.db")
+    assert config.resolve_db_path() == str(dirs / "explicit.db")
+    # An explicit profile argument (the --profile flag) beats APOLOGIES_DB.
+    assert config.resolve_db_path("home") == str(data / "profiles" / "home.db")
+
+
+def test_profile_mapping(dirs, monkeypatch):
+    monkeypatch.setenv("FOCUS_HOME", str(dirs / "elsewhere"))
+    settings = {"profiles": {"work": "$FOCUS_HOME/work.db"}}
+    data = dirs / "data" / config.APP_NAME
+
+    assert config.profile_path("work", settings) == str(dirs / "elsewhere" / "work.db")
+    assert config.profile_path("side-1", settings) == str(
+        data / "profiles" / "side-1.db"
+    )
+    with pytest.raises(ValueError, match="invalid profile name"):
+        config.profile_path("bad name", settings)
+    with pytest.raises(ValueError, match="invalid profile name"):
+        config.profile_path("../escape", settings)
+
+    (data / "profiles").mkdir(parents=True)
+    (data / "profiles" / "home.db").touch()
+    (data / "profiles" / "notes.txt").touch()
+    assert config.list_profiles(settings) == {
+        "home": str(data / "profiles" / "home.db"),
+        "work": str(dirs / "elsewhere" / "work.db"),
+    }
+
+
+def test_malformed_config_is_a_value_error(dirs):
+    _write_config(dirs, "profile = [\n")
+    with pytest.raises(ValueError, match="invalid config file"):
+        config.resolve_db_path()
+
+
+@pytest.mark.parametrize(
+    ("env", "message"),
+    [
+        ({"APOLOGIES_PROFILE": "bad name"}, "invalid profile name"),
+        ({"APOLOGIES_CONFIG": "broken.toml"}, "invalid config file"),
+    ],
+)
+def test_bad_settings_fail_commands_with_one_line(dirs, env, message):
+    (dirs / "broken.toml").write_text("profile = [\n")
+    src = os.path.dirname(os.path.dirname(config.__file__))
+    result = subprocess.run(
+        [sys.executable, "-m", "apologies_for_being_human", "stats"],
+        env=dict(os.environ, PYTHONPATH=src, **env),
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert result.stderr.startswith("error: ") and message in result.stderr
+    assert "Traceback" not in result.stderr
+
+
+def _make_profile(path, minutes, day):
+    db.use_database(str(path))
+    db.init_db()
+    start = datetime.fromisoformat(f"{day}T09:00:00")
+    db.log_task("Write", start, start + timedelta(minutes=minutes), 1)
+
+
+def test_attached_profiles_report_across_databases(database, tmp_path):
+    profiles = {
+        "work": tmp_path / "work.db",
+        "home": tmp_path / "home.db",
+        "gone": tmp_path / "missing.db",
+    }
+    _make_profile(profiles["work"], 30, "2025-03-03")
+    _make_profile(profiles["work"], 15, "2025-03-04")
+    _make_profile(profiles["home"], 20, "2025-03-04")
+    paths = {name: str(path) for name, path in profiles.items()}
+
+    with reporting.attached_profiles(paths) as (conn, schemas):
+        assert schemas == [("p0", "home"), ("p1", "work")]
+        assert conn.execute("SELECT count(*) FROM p1.tasks").fetchone() == (2,)
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM p0.tasks")
+
+    report = reporting.cross_profile_report(paths, "2025-03-01", "2025-03-07")
+    assert report["profiles"] == ["home", "work"]
+    assert report["focus"] == [
+        ("home", 20.0, 1, 1),
+        ("work", 45.0, 2, 2),
+        ("all", 65.0, 3, 3),
+    ]
+    assert report["daily"] == {"2025-03-03": 30.0, "2025-03-04": 35.0}
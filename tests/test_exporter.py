@@ -0,0 +1,52 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import db, exporter
+
+
+def _log(name, day):
+    start = datetime(2025, 1, day, 9)
+    db.log_task(name, start, start + timedelta(minutes=25), 0)
+
+
+def _ids(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line)["task_id"] for line in f]
+
+
+def test_incremental_marks_are_kept_per_filter_set(database, tmp_path):
+    db.init_db()
+    _log("Read", 1)
+    _log("Write", 2)
+    out = str(tmp_path / "out.jsonl.gz")
+
+    report = exporter.export("sessions", out, task="Write", incremental=True)
+    assert report.rows == 1 and _ids(out) == [2]
+    # The filtered export must not advance the unfiltered mark past "Read".
+    assert exporter.export("sessions", out, incremental=True).rows == 2
+    assert _ids(out) == [1, 2]
+
+    _log("Read", 3)
+    assert exporter.export("sessions", out, incremental=True).rows == 1
+    assert exporter.export("sessions", out, task="Write", incremental=True).rows == 0
+    assert exporter.get_high_water("sessions") == 3
+    assert exporter.get_high_water(exporter.state_key("sessions", task="Write")) == 2
+
+
+def test_failed_export_leaves_no_partial_file(database, tmp_path, monkeypatch):
+    db.init_db()
+    _log("Read", 1)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    def broken(*args, **kwargs):
+        yield (1, "Read")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(exporter, "iter_rows", broken)
+    with pytest.raises(OSError):
+        exporter.export("sessions", str(out_dir / "out.csv"))
+    assert list(out_dir.iterdir()) == []
@@ -0,0 +1,121 @@
+import gzip
+
+import pytest
+
+from apologies_for_being_human import db, importer
+
+
+def _sessions(*names):
+    return [
+        (line, (name, f"2025-01-0{line}T09:00:00", f"2025-01-0{line}T09:30:00", 30, 0))
+        for line, name in enumerate(names, start=2)
+    ]
+
+
+def test_unknown_checkin_task_reports_its_line(database, tmp_path):
+    db.init_db()
+    path = tmp_path / "checkins.csv"
+    path.write_text(
+        "checkin_task_name,checkin_time,success\n"
+        "Exercised as planned,2025-01-01T20:00:00,1\n"
+        "No such task,2025-01-02T20:00:00,1\n"
+    )
+    report = importer.import_file(str(path), create_missing_tasks=False)
+    assert report.inserted == 1
+    assert report.errors == [(3, "unknown check-in task: 'No such task'")]
+
+
+def test_gzipped_jsonl(database, tmp_path):
+    db.init_db()
+    path = tmp_path / "sessions.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(
+            '{"task_name": "Read", "start_time": "2025-01-01T09:00:00", '
+            '"end_time": "2025-01-01T09:30:00"}\n'
+        )
+    report = importer.import_file(str(path))
+    assert (report.kind, report.inserted) == ("sessions", 1)
+    assert db.get_distinct_tasks() == ["Read"]
+
+
+def test_rolled_back_batch_forgets_new_task_ids(database, monkeypatch):
+    db.init_db()
+    conn = db.connect_db()
+    report = importer.ImportReport(kind="sessions")
+    resolver = {}
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(importer, "apply_sessions_to_rollups", fail)
+        with pytest.raises(RuntimeError):
+            importer._write_batch(
+                conn, report, _sessions("Write"), resolver, True, False
+            )
+    assert resolver == {}
+    assert conn.execute("SELECT count(*) FROM task_names").fetchone() == (0,)
+
+    importer._write_batch(
+        conn, report, _sessions("Other", "Write"), resolver, True, False
+    )
+    assert conn.execute(
+        "SELECT count(*) FROM tasks t LEFT JOIN task_names n "
+        "ON n.task_name_id = t.task_name_id WHERE n.task_name_id IS NULL"
+    ).fetchone() == (0,)
+    assert report.inserted == 2
+
+
+def test_bad_durations_are_rejected_with_their_line(database, tmp_path):
+    db.init_db()
+    path = tmp_path / "sessions.csv"
+    path.write_text(
+        "task_name,start_time,end_time,duration\n"
+        "Read,2025-01-01T09:00:00,2025-01-01T09:30:00,30\n"
+        "Read,2025-01-02T09:00:00,2025-01-02T09:30:00,-30\n"
+        "Read,2025-01-03T09:00:00,2025-01-03T09:30:00,nan\n"
+    )
+    report = importer.import_file(str(path))
+    assert report.inserted == 1
+    assert report.errors == [
+        (3, "negative duration: '-30'"),
+        (4, "invalid duration: 'nan'"),
+    ]
+    assert db.connect_db().execute("SELECT minutes FROM focus_daily").fetchall() == [
+        (30.0,)
+    ]
+
+
+def test_checkin_stats_cover_batches_committed_before_a_failure(
+    database, tmp_path, monkeypatch
+):
+    db.init_db()
+    path = tmp_path / "checkins.csv"
+    path.write_text(
+        "checkin_task_name,checkin_time,success\n"
+        "Exercised as planned,2025-01-01T20:00:00,1\n"
+        "Exercised as planned,2025-01-02T20:00:00,1\n"
+        "Processed emails,2025-01-03T20:00:00,1\n"
+    )
+    write_checkins = importer._write_checkins
+    calls = []
+
+    def fail_second_batch(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return write_checkins(*args)
+
+    monkeypatch.setattr(importer, "_write_checkins", fail_second_batch)
+    with pytest.raises(OSError):
+        importer.import_file(str(path), batch_size=2)
+
+    conn = db.connect_db()
+    assert conn.execute("SELECT count(*) FROM checkin_records").fetchone() == (2,)
+    assert db.rebuild_checkin_stats(verify_only=True) == {}
+    total, streak = conn.execute(
+        "SELECT total, current_streak FROM checkin_task_stats s "
+        "JOIN checkin_tasks t USING (checkin_task_id) "
+        "WHERE checkin_task_name = 'Exercised as planned'"
+    ).fetchone()
+    assert (total, streak) == (2, 2)
@@ -0,0 +1,185 @@
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import db, journal
+
+
+class FakeClock:
+    """A clock that only moves when the timer sleeps or a test advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _row(session_id):
+    return (
+        db.connect_db()
+        .execute(
+            "SELECT elapsed_seconds, reminder_index, distractions "
+            "FROM active_sessions WHERE session_id = ?",
+            (session_id,),
+        )
+        .fetchone()
+    )
+
+
+def _orphan(pid, task_name="Write", elapsed=600.0, distractions=2, silent=0):
+    """A journal row left behind by `pid`, last checkpointed `silent` s ago."""
+    entry = journal.SessionJournal.begin(
+        task_name, 1500, start_time=datetime(2025, 3, 3, 9)
+    )
+    entry.checkpoint(elapsed, 4, distractions, force=True)
+    checkpoint_time = datetime.now() - timedelta(seconds=silent)
+    db.connect_db().execute(
+        "UPDATE active_sessions SET pid = ?, checkpoint_time = ? WHERE session_id = ?",
+        (pid, checkpoint_time.isoformat(), entry.session_id),
+    )
+    journal._owned.discard(entry.session_id)
+    return entry.session_id
+
+
+def _sessions():
+    return (
+        db.connect_db()
+        .execute(
+            "SELECT n.task_name, t.start_time, t.end_time, t.duration, t.distractions "
+            f"FROM {db.SESSIONS_FROM}"
+        )
+        .fetchall()
+    )
+
+
+def test_checkpoint_writes_at_most_once_per_interval(database):
+    db.init_db()
+    clock = FakeClock()
+    entry = journal.SessionJournal.begin("Write", 1500, interval=30, clock=clock)
+
+    assert entry.checkpoint(1.0, 0, 0) is False
+    clock.now += 29.9
+    assert entry.checkpoint(29.9, 0, 1) is False
+    clock.now += 0.1
+    assert entry.checkpoint(30.0, 1, 1) is True
+    assert _row(entry.session_id) == (30.0, 1, 1)
+    clock.now += 5
+    assert entry.checkpoint(35.0, 1, 2, force=True) is True
+    assert entry.writes == 2
+    assert _row(entry.session_id) == (35.0, 1, 2)
+
+
+def test_finish_logs_once(database):
+    db.init_db()
+    start = datetime(2025, 3, 3, 9)
+    entry = journal.SessionJournal.begin("Write", 1500, start_time=start)
+
+    assert entry.finish(600, 3) == start + timedelta(minutes=10)
+    assert _row(entry.session_id) is None
+    assert _sessions() == [
+        ("Write", "2025-03-03T09:00:00", "2025-03-03T09:10:00", 10.0, 3)
+    ]
+    # Already logged, for example by another launch finalizing the orphan.
+    assert entry.finish(600, 3) is None
+    assert len(_sessions()) == 1
+
+
+def test_find_orphans_asks_whether_the_owner_is_alive(database, dead_pid):
+    db.init_db()
+    journal.SessionJournal.begin("Mine", 1500)  # owned by this process
+    alive = _orphan(journal.os.getpid())
+    dead = _orphan(dead_pid)
+    silent = _orphan(journal.os.getpid(), silent=2 * 86400)
+
+    orphans = journal.find_orphans()
+    assert [s.session_id for s in orphans] == [dead, silent]
+    assert alive not in [s.session_id for s in orphans]
+    assert (orphans[0].elapsed_seconds, orphans[0].distractions) == (600.0, 2)
+    assert orphans[0].reminder_index == 4
+
+
+def test_find_orphans_without_pid_liveness_uses_staleness(database, monkeypatch):
+    db.init_db()
+    monkeypatch.setattr(journal, "_pid_alive", lambda pid: None)
+    _orphan(1, silent=journal.STALE_SECONDS - 10)
+    stale = _orphan(1, silent=journal.STALE_SECONDS + 10)
+    assert [s.session_id for s in journal.find_orphans()] == [stale]
+
+
+def test_finalize_and_discard_orphans(database, dead_pid):
+    db.init_db()
+    _orphan(dead_pid, "Write", elapsed=900.0, distractions=5)
+    _orphan(dead_pid, "Read")
+    logged, dropped = journal.find_orphans()
+
+    assert journal.finalize_orphan(logged) == datetime(2025, 3, 3, 9, 15)
+    journal.discard_orphan(dropped)
+    assert journal.find_orphans() == []
+    assert _sessions() == [
+        ("Write", "2025-03-03T09:00:00", "2025-03-03T09:15:00", 15.0, 5)
+    ]
+
+
+def test_session_checkpoints_the_running_distraction_count(database, dead_pid):
+    db.init_db()
+    clock = FakeClock()
+    run = journal.JournaledSession(
+        "Write", 120, quotes=False, clock=clock, sleep=clock.sleep
+    )
+    for tick in run.ticks():
+        if tick.elapsed >= 45 and run.distractions == 0:
+            run.distractions = 2
+        if tick.elapsed >= 70:
+            break
+    session_id = run.journal.session_id
+    # Checkpointed at 30 s with none yet and at 60 s, the one reminder
+    # fired, with the two.
+    assert _row(session_id) == (60.0, 1, 2)
+    assert run.stop() == 70.0
+    assert _row(session_id) == (70.0, 1, 2)
+    clock.now += 500  # time spent answering questions is not focus time
+    assert run.elapsed() == 70.0
+
+    # A crash here leaves the row; resuming carries its count forward.
+    db.connect_db().execute(
+        "UPDATE active_sessions SET pid = ? WHERE session_id = ?",
+        (dead_pid, session_id),
+    )
+    journal._owned.discard(session_id)
+    [orphan] = journal.find_orphans()
+    resumed = journal.JournaledSession(
+        "Write", 120, resume=orphan, distractions=1, quotes=False, clock=clock
+    )
+    assert resumed.distractions == 3
+    assert resumed.elapsed() == pytest.approx(70.0)
+    assert resumed.timer.next_reminder_index == orphan.reminder_index
+    assert next(resumed.ticks()).elapsed == pytest.approx(70.0)
+    resumed.stop()
+    assert _row(session_id) == (pytest.approx(70.0), 1, 3)
+    resumed.finish()
+    assert _sessions()[0][4] == 3
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "abc", "nan", "inf"])
+def test_bad_checkpoint_env_falls_back(monkeypatch, capsys, value):
+    monkeypatch.setenv("APOLOGIES_CHECKPOINT_SECONDS", value)
+    assert journal._checkpoint_seconds_from_env() == 30.0
+    assert "APOLOGIES_CHECKPOINT_SECONDS" in capsys.readouterr().err
+
+
+def test_checkpoint_env(monkeypatch):
+    monkeypatch.setenv("APOLOGIES_CHECKPOINT_SECONDS", "2.5")
+    assert journal._checkpoint_seconds_from_env() == 2.5
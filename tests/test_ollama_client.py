@@ -0,0 +1,97 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from apologies_for_being_human import llm_quotes
+from apologies_for_being_human.ollama_client import (
+    OllamaClient,
+    OllamaTimeout,
+    OllamaUnavailable,
+)
+from apologies_for_being_human.ollama_stub import DEFAULT_REPLY, StubOllamaServer
+
+
+def test_reuses_one_keep_alive_connection():
+    with StubOllamaServer() as stub:
+        client = OllamaClient(stub.address)
+        assert client.generate("one").strip() == DEFAULT_REPLY
+        sock = client._conn.sock
+        assert client.generate("two").strip() == DEFAULT_REPLY
+        assert client._conn.sock is sock
+        assert [r["prompt"] for r in stub.requests] == ["one", "two"]
+        assert stub.requests[0]["keep_alive"] == client.keep_alive
+        client.close()
+
+
+def test_deadline_stops_a_slow_stream():
+    with StubOllamaServer(token_latency=0.2) as stub:
+        client = OllamaClient(stub.address, deadline=0.5)
+        start = time.monotonic()
+        with pytest.raises(OllamaTimeout):
+            client.generate("slow")
+        assert time.monotonic() - start < 1.5
+        assert client._conn is None  # the half-read stream is dropped
+
+
+def test_cancel_stops_the_stream():
+    with StubOllamaServer(token_latency=0.1) as stub:
+        client = OllamaClient(stub.address)
+        cancel = threading.Event()
+        with pytest.raises(RuntimeError, match="cancelled"):
+            client.generate("x", cancel=cancel, on_token=lambda token: cancel.set())
+
+
+def test_server_error_then_recovery():
+    with StubOllamaServer(fail_rate=1.0) as stub:
+        client = OllamaClient(stub.address)
+        with pytest.raises(RuntimeError, match="HTTP 500"):
+            client.generate("x")
+        stub.fail_rate = 0.0
+        assert client.generate("x").strip() == DEFAULT_REPLY
+
+
+def test_unreachable_server_falls_back_to_cli(monkeypatch):
+    stub = StubOllamaServer().start()
+    address = stub.address
+    stub.stop()
+    monkeypatch.setattr(llm_quotes, "get_client", lambda: OllamaClient(address))
+    monkeypatch.setattr(llm_quotes, "_run_cli", lambda prompt, cancel=None: "from cli")
+    with pytest.raises(OllamaUnavailable):
+        OllamaClient(address).generate("x")
+    assert llm_quotes.get_llm_quote() == "from cli"
+
+
+def test_http_error_is_reported_as_llm_failure(monkeypatch):
+    with StubOllamaServer(fail_rate=1.0) as stub:
+        monkeypatch.setattr(
+            llm_quotes, "get_client", lambda: OllamaClient(stub.address)
+        )
+        with pytest.raises(RuntimeError, match="LLM call failed"):
+            llm_quotes.get_llm_quotes(3)
+
+
+def test_slow_reachable_server_does_not_fall_back_to_cli(monkeypatch):
+    cli_calls = []
+    monkeypatch.setattr(
+        llm_quotes, "_run_cli", lambda prompt, cancel=None: cli_calls.append(prompt)
+    )
+    with StubOllamaServer(first_token_latency=1.0) as stub:
+        client = OllamaClient(stub.address, deadline=0.3)
+        with pytest.raises(OllamaTimeout, match="no response"):
+            client.generate("x")
+        assert client._conn is None
+        monkeypatch.setattr(llm_quotes, "get_client", lambda: client)
+        with pytest.raises(RuntimeError, match="LLM call failed"):
+            llm_quotes.get_llm_quote()
+    assert cli_calls == []
+
+
+def test_reconnects_once_after_an_idle_keep_alive_is_closed():
+    with StubOllamaServer() as stub:
+        client = OllamaClient(stub.address)
+        client.generate("one")
+        client._conn.sock.shutdown(socket.SHUT_RDWR)  # as if the server hung up
+        assert client.generate("two").strip() == DEFAULT_REPLY
+        assert len(stub.requests) == 2
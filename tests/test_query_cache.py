@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+from apologies_for_being_human import db, query_cache
+from apologies_for_being_human.connection import transaction
+
+calls = []
+
+
+@query_cache.cached("tasks")
+def _sessions_named(name):
+    calls.append(("tasks", name))
+    return [
+        row[0]
+        for row in db.connect_db().execute(
+            "SELECT t.start_time FROM tasks t JOIN task_names n "
+            "USING (task_name_id) WHERE n.task_name = ? ORDER BY 1",
+            (name,),
+        )
+    ]
+
+
+@query_cache.cached("checkin_tasks")
+def _checkin_task_count():
+    calls.append(("checkin_tasks",))
+    return db.connect_db().execute("SELECT count(*) FROM checkin_tasks").fetchone()[0]
+
+
+@query_cache.writes("tasks", "task_names")
+def _add_session(name, start_time):
+    conn = db.connect_db()
+    name_id = db.resolve_task_names(conn, [name])[name]
+    conn.execute(
+        "INSERT INTO tasks (task_name_id, start_time, end_time, duration, "
+        "distractions) VALUES (?, ?, ?, 25, 0)",
+        (name_id, start_time, start_time),
+    )
+
+
+@pytest.fixture
+def cache(database):
+    if not query_cache.ENABLED:
+        pytest.skip("APOLOGIES_QUERY_CACHE=0")
+    db.init_db()
+    calls.clear()
+
+
+def test_declared_writes_drop_only_the_tables_they_write(cache):
+    _add_session("Read", "2025-03-03T09:00:00")
+    assert _sessions_named("Read") == ["2025-03-03T09:00:00"]
+    assert _checkin_task_count() == 8
+    assert len(calls) == 2
+
+    result = _sessions_named("Read")
+    result.append("mutated by the caller")
+    assert _sessions_named("Read") == ["2025-03-03T09:00:00"]
+    assert _checkin_task_count() == 8
+    assert len(calls) == 2
+
+    _add_session("Read", "2025-03-04T09:00:00")
+    assert _sessions_named("Read") == ["2025-03-03T09:00:00", "2025-03-04T09:00:00"]
+    assert _checkin_task_count() == 8
+    assert calls[2:] == [("tasks", "Read")]
+
+
+def test_least_recently_used_results_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(query_cache, "MAX_ENTRIES", 2)
+    _sessions_named("a")
+    _sessions_named("b")
+    _sessions_named("a")  # hit; "b" is now the oldest
+    _sessions_named("c")  # evicts "b"
+    assert calls == [("tasks", "a"), ("tasks", "b"), ("tasks", "c")]
+    _sessions_named("a")
+    _sessions_named("c")
+    assert len(calls) == 3
+    _sessions_named("b")
+    assert calls[3:] == [("tasks", "b")]
+
+
+def test_writes_behind_the_cache_are_detected(cache, database):
+    assert _sessions_named("Read") == []
+    assert _checkin_task_count() == 8
+
+    # Another process, or anything else with its own connection.
+    other = sqlite3.connect(database, isolation_level=None)
+    other.execute(
+        "INSERT INTO checkin_tasks (checkin_task_name, created_at) "
+        "VALUES ('Stretch', '2025-03-03T09:00:00')"
+    )
+    other.close()
+    assert _checkin_task_count() == 9
+    assert _sessions_named("Read") == []  # the whole cache was cleared
+    assert len(calls) == 4
+
+    # An undeclared write through this thread's own connection.
+    db.connect_db().execute(
+        "DELETE FROM checkin_tasks WHERE checkin_task_name = 'Stretch'"
+    )
+    assert _checkin_task_count() == 8
+    assert len(calls) == 5
+    assert _checkin_task_count() == 8
+    assert len(calls) == 5
+
+
+def test_reads_inside_a_transaction_bypass_the_cache(cache):
+    assert _sessions_named("Read") == []
+    with transaction(db.connect_db()):
+        _add_session("Read", "2025-03-03T09:00:00")
+        assert _sessions_named("Read") == ["2025-03-03T09:00:00"]
+        assert len(calls) == 2
+    assert _sessions_named("Read") == ["2025-03-03T09:00:00"]
@@ -0,0 +1,56 @@
+import pytest
+
+from apologies_for_being_human import llm_quotes
+from apologies_for_being_human.quote_cache import QuoteCache
+from apologies_for_being_human.quote_provider import QuoteProvider
+
+
+def _run(cache, fetch, needed=3):
+    provider = QuoteProvider(needed=needed, cache=cache, fetch=fetch, batch_size=3)
+    provider.start()
+    provider._thread.join(5)
+    return provider
+
+
+@pytest.mark.parametrize(
+    "error", [RuntimeError("ollama: model not found"), TimeoutError("slow")]
+)
+def test_failed_refill_makes_one_call(tmp_path, error):
+    calls = []
+
+    def fetch(n, cancel=None):
+        calls.append(n)
+        raise error
+
+    provider = _run(QuoteCache(str(tmp_path / "quotes.json")), fetch)
+    assert calls == [3]
+    assert provider.last_error is error
+    assert provider.pop()  # a static quote
+
+
+def test_refill_only_when_the_cache_runs_short(tmp_path):
+    cache = QuoteCache(str(tmp_path / "quotes.json"))
+    calls = []
+
+    def fetch(n, cancel=None):
+        calls.append(n)
+        return [
+            "Start with five minutes; momentum does the rest.",
+            "Done is kinder to you than perfect.",
+            "Failing at a draft is how a good one gets written.",
+        ][:n]
+
+    _run(cache, fetch)
+    assert calls == [3]
+    assert cache.available() == 3
+    _run(cache, fetch)
+    assert calls == [3]
+
+
+def test_llm_errors_are_wrapped(monkeypatch):
+    def broken(prompt, cancel=None):
+        raise ConnectionResetError("reset by peer")
+
+    monkeypatch.setattr(llm_quotes, "_generate", broken)
+    with pytest.raises(RuntimeError, match="LLM call failed: reset by peer"):
+        llm_quotes.get_llm_quotes(3)
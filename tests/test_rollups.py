@@ -0,0 +1,122 @@
+import io
+from datetime import datetime, timedelta
+
+from rich.console import Console
+
+from apologies_for_being_human import analytics, db, importer
+from apologies_for_being_human.connection import transaction
+
+FROM_SCRATCH = {
+    "focus_daily": "t.start_date",
+    "focus_weekly": "date(t.start_date, 'weekday 0', '-6 days')",
+}
+
+
+def _rollups(conn):
+    return {
+        table: [
+            (key, name, round(minutes, 6), sessions, distractions)
+            for key, name, minutes, sessions, distractions in conn.execute(
+                f"SELECT * FROM {table} ORDER BY 1, 2"
+            )
+        ]
+        for table in FROM_SCRATCH
+    }
+
+
+def _aggregate(conn):
+    """The rollups computed straight from the tasks table."""
+    return {
+        table: [
+            (key, name, round(minutes, 6), sessions, distractions)
+            for key, name, minutes, sessions, distractions in conn.execute(
+                f"SELECT {key}, n.task_name, SUM(t.duration), COUNT(*), "
+                f"SUM(t.distractions) FROM {db.SESSIONS_FROM} "
+                f"GROUP BY {key}, n.task_name ORDER BY 1, 2"
+            )
+        ]
+        for table, key in FROM_SCRATCH.items()
+    }
+
+
+def test_rollups_match_a_from_scratch_aggregate(database, tmp_path):
+    db.init_db()
+    conn = db.connect_db()
+    # Sunday 2025-03-09 and Monday 2025-03-10 fall in different ISO weeks.
+    for day, name, minutes in [
+        (9, "Read", 25),
+        (9, "Read", 12.5),
+        (10, "Read", 30),
+        (10, "Write", 45),
+    ]:
+        start = datetime(2025, 3, day, 9)
+        db.log_task(name, start, start + timedelta(minutes=minutes), day % 3)
+    assert _rollups(conn) == _aggregate(conn)
+    weeks = [row[0] for row in _rollups(conn)["focus_weekly"]]
+    assert weeks == ["2025-03-03", "2025-03-10", "2025-03-10"]
+
+    path = tmp_path / "sessions.csv"
+    path.write_text(
+        "task_name,start_time,end_time,duration,distractions\n"
+        "Read,2025-03-09T20:00:00,2025-03-09T20:10:00,,1\n"
+        "Code,2025-03-11T08:00:00,2025-03-11T09:00:00,55.5,0\n"
+        "Write,2025-03-16T23:50:00,2025-03-17T00:20:00,,2\n"
+    )
+    assert importer.import_file(str(path), batch_size=2).inserted == 3
+    assert _rollups(conn) == _aggregate(conn)
+
+    # A session edited after it was counted is corrected with adjust_rollups.
+    with transaction(conn):
+        task_id, minutes, distractions = conn.execute(
+            "SELECT task_id, duration, distractions FROM tasks "
+            "WHERE start_time = '2025-03-10T09:00:00'"
+        ).fetchone()
+        conn.execute(
+            "UPDATE tasks SET duration = 20, distractions = 4 WHERE task_id = ?",
+            (task_id,),
+        )
+        db.adjust_rollups(
+            conn, "Read", "2025-03-10", 20 - minutes, distractions=4 - distractions
+        )
+        conn.execute("DELETE FROM tasks WHERE start_time = '2025-03-11T08:00:00'")
+        db.adjust_rollups(conn, "Code", "2025-03-11", -55.5, sessions=-1)
+    conn.execute("DELETE FROM focus_daily WHERE sessions = 0")
+    conn.execute("DELETE FROM focus_weekly WHERE sessions = 0")
+    assert _rollups(conn) == _aggregate(conn)
+
+    expected = _aggregate(conn)
+    conn.execute("DELETE FROM focus_daily WHERE task_name = 'Read'")
+    conn.execute("UPDATE focus_weekly SET minutes = minutes * 2")
+    db.rebuild_rollups()
+    assert _rollups(conn) == expected
+
+
+def test_apply_sessions_to_rollups_reads_only_new_rows(database):
+    db.init_db()
+    conn = db.connect_db()
+    start = datetime(2025, 3, 10, 9)
+    db.log_task("Read", start, start + timedelta(minutes=25), 0)
+    with transaction(conn):
+        last = db.get_max_task_id(conn)
+        conn.execute(
+            "INSERT INTO tasks (task_name_id, start_time, end_time, duration, "
+            "distractions) SELECT task_name_id, '2025-03-10T10:00:00', "
+            "'2025-03-10T10:10:00', 10, 1 FROM task_names"
+        )
+        db.apply_sessions_to_rollups(conn, after_task_id=last)
+    assert _rollups(conn)["focus_daily"] == [("2025-03-10", "Read", 35.0, 2, 1)]
+
+
+def test_analytics_prompt_asks_again_for_days_out_of_range(database, monkeypatch):
+    db.init_db()
+    answers = iter([0, -3, analytics.MAX_DAYS + 1, 30])
+    monkeypatch.setattr(analytics, "ask_task_name", lambda *args, **kwargs: None)
+    monkeypatch.setattr(
+        analytics.IntPrompt, "ask", classmethod(lambda cls, *a, **k: next(answers))
+    )
+    console = Console(file=io.StringIO(), width=120)
+
+    analytics.display_focus_analytics(console)
+    output = console.file.getvalue()
+    assert output.count("Please enter a number from 1") == 3
+    assert "Focus over the last 30 days" in output
@@ -0,0 +1,96 @@
+import sqlite3
+
+from apologies_for_being_human import db
+
+# The schema of the first release, before PRAGMA user_version was used.
+BASELINE_SCHEMA = """
+    CREATE TABLE tasks (
+        task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_name TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        duration REAL NOT NULL,
+        distractions INTEGER NOT NULL
+    );
+    CREATE TABLE checkin_tasks (
+        checkin_task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        checkin_task_name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE checkin_records (
+        checkin_record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        checkin_task_id INTEGER NOT NULL,
+        checkin_time TEXT NOT NULL,
+        success BOOLEAN NOT NULL,
+        note TEXT,
+        FOREIGN KEY (checkin_task_id) REFERENCES checkin_tasks (checkin_task_id)
+    );
+    INSERT INTO tasks (task_name, start_time, end_time, duration, distractions)
+    VALUES ('Write report', '2025-03-01T09:00:00', '2025-03-01T09:25:00', 25, 1),
+           ('Read', '2025-03-02T21:30:00.123456', '2025-03-02T22:00:00', 30, 0),
+           ('Write report', '2025-03-03T10:00:00', '2025-03-03T10:50:00', 50, 2);
+    INSERT INTO checkin_tasks (checkin_task_name, description, created_at)
+    VALUES ('Exercised as planned', '', '2025-03-01T08:00:00');
+    INSERT INTO checkin_records (checkin_task_id, checkin_time, success, note)
+    VALUES (1, '2025-03-01T20:00:00', 1, 'a short run'),
+           (1, '2025-03-02T20:00:00', 0, '');
+"""
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+
+def _indexes(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA index_list({table})")}
+
+
+def test_fresh_database_serves_hot_queries_from_indexes(database):
+    db.init_db()
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.find_unindexed_queries() == {}
+
+
+def test_baseline_database_is_upgraded_in_place(database):
+    with sqlite3.connect(database) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+
+    db.init_db()
+
+    conn = db.connect_db()
+    assert db.get_schema_version(conn) == db.SCHEMA_VERSION
+    assert {"start_date", "task_name_id"} <= _columns(conn, "tasks")
+    assert "checkin_date" in _columns(conn, "checkin_records")
+    assert {
+        "idx_tasks_start_time",
+        "idx_tasks_start_date",
+        "idx_tasks_task_name_id_start_time",
+    } <= _indexes(conn, "tasks")
+    assert {
+        "idx_checkin_records_task_time",
+        "idx_checkin_records_time",
+        "idx_checkin_records_date",
+    } <= _indexes(conn, "checkin_records")
+
+    # Rows keep their ids, names and dates.
+    assert conn.execute(
+        f"SELECT t.task_id, n.task_name, t.start_date FROM {db.SESSIONS_FROM} "
+        "ORDER BY t.task_id"
+    ).fetchall() == [
+        (1, "Write report", "2025-03-01"),
+        (2, "Read", "2025-03-02"),
+        (3, "Write report", "2025-03-03"),
+    ]
+    assert [
+        row[0]
+        for row in conn.execute(
+            "SELECT checkin_date FROM checkin_records ORDER BY checkin_record_id"
+        )
+    ] == ["2025-03-01", "2025-03-02"]
+    assert db.get_sessions_by_date("2025-03-02")[0][0] == "Read"
+    assert db.find_unindexed_queries() == {}
+
+    # Running it again is a no-op.
+    db.init_db()
+    assert db.get_schema_version(conn) == db.SCHEMA_VERSION
@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import http.client
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from apologies_for_being_human import db, server
+
+
+@pytest.fixture
+def api(database):
+    """An ApiServer on a free port, run on its own loop thread."""
+    db.init_db()
+    start = datetime(2025, 3, 3, 9)
+    for minutes in (10, 20, 30):
+        db.log_task("Write", start, start + timedelta(minutes=minutes), 0)
+        start += timedelta(hours=1)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def serve():
+        # The server's data_version watcher belongs to the loop thread.
+        return await server.ApiServer(port=0, workers=2).start()
+
+    async def stop():
+        api.close()
+        await api._server.wait_closed()  # lets open client handlers finish
+
+    api = asyncio.run_coroutine_threadsafe(serve(), loop).result(5)
+    yield api
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def _get(api, target, headers=None):
+    conn = http.client.HTTPConnection(api.host, api.port, timeout=5)
+    try:
+        conn.request("GET", target, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+        return response.status, response.getheader("ETag"), body
+    finally:
+        conn.close()
+
+
+def _cursor(key):
+    raw = json.dumps(key).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_pages_and_etags(api):
+    status, etag, body = _get(api, "/api/sessions?limit=2")
+    page = json.loads(body)
+    assert status == 200 and etag
+    assert [s["duration"] for s in page["sessions"]] == [30.0, 20.0]  # newest first
+    assert page["prev"] is None
+
+    status, _, body = _get(api, f"/api/sessions?limit=2&cursor={page['next']}")
+    assert [s["duration"] for s in json.loads(body)["sessions"]] == [10.0]
+
+    status, same, body = _get(
+        api, "/api/sessions?limit=2", headers={"If-None-Match": etag}
+    )
+    assert (status, same, body) == (304, etag, b"")
+
+    start = datetime(2025, 3, 4, 9)
+    db.log_task("Read", start, start + timedelta(minutes=5), 0)
+    status, changed, _ = _get(
+        api, "/api/sessions?limit=2", headers={"If-None-Match": etag}
+    )
+    assert status == 200 and changed != etag
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        "/api/sessions?limit=0",
+        "/api/sessions?limit=ten",
+        "/api/sessions?date=03/03/2025",
+        "/api/sessions?direction=sideways",
+        "/api/sessions?cursor=%%%",
+        f"/api/sessions?cursor={_cursor(['2025-03-03T09:00:00'])}",
+        f"/api/sessions?cursor={_cursor([1, 2])}",
+        f"/api/sessions?cursor={_cursor(['2025-03-03T09:00:00', 'x'])}",
+        f"/api/sessions?cursor={_cursor(['2025-03-03T09:00:00', True])}",
+        "/api/checkin-records?task_id=-1",
+    ],
+)
+def test_bad_params_are_400(api, target):
+    status, etag, body = _get(api, target)
+    assert status == 400 and etag is None
+    assert "error" in json.loads(body)
+
+
+def test_unexpected_errors_are_500(api, monkeypatch, capsys):
+    def broken(query):
+        raise TypeError("a bug")
+
+    monkeypatch.setitem(server.ROUTES, "/api/health", broken)
+    status, _, body = _get(api, "/api/health")
+    assert (status, json.loads(body)) == (500, {"error": "internal error"})
+    assert "TypeError: a bug" in capsys.readouterr().err
+    assert _get(api, "/api/checkin-tasks")[0] == 200
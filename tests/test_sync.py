@@ -0,0 +1,198 @@
+import os
+from datetime import date, datetime, timedelta
+
+from apologies_for_being_human import archive, db, sync
+from apologies_for_being_human.connection import transaction
+
+
+def _use(path):
+    db.use_database(str(path))
+    db.init_db()
+
+
+def _session(name, start, minutes, distractions=0):
+    start = datetime.fromisoformat(start)
+    db.log_task(name, start, start + timedelta(minutes=minutes), distractions)
+
+
+def _checkin(name, when, success, note=""):
+    with transaction(db.connect_db()) as conn:
+        (task_id,) = conn.execute(
+            "SELECT checkin_task_id FROM checkin_tasks WHERE checkin_task_name = ?",
+            (name,),
+        ).fetchone()
+        conn.execute(
+            "INSERT INTO checkin_records (checkin_task_id, checkin_time, success, "
+            "note) VALUES (?, ?, ?, ?)",
+            (task_id, when, success, note),
+        )
+        db.apply_checkin_to_stats(conn, task_id, when, success)
+
+
+def _snapshot():
+    """Everything a sync should make equal, hot and archived, by content."""
+    conn = db.connect_db()
+    sessions = conn.execute(
+        "SELECT n.task_name, t.start_time, t.end_time, t.duration, t.distractions "
+        f"FROM {db.SESSIONS_FROM}"
+    ).fetchall()
+    sessions += [row[1:] for row in archive.iter_archived(conn, "sessions")]
+    checkins = conn.execute(
+        "SELECT ct.checkin_task_name, cr.checkin_time, cr.success, cr.note "
+        "FROM checkin_records cr JOIN checkin_tasks ct USING (checkin_task_id)"
+    ).fetchall()
+    checkins += [row[2:] for row in archive.iter_archived(conn, "checkins")]
+    return {
+        "sessions": sorted(sessions),
+        "checkins": sorted(checkins),
+        "checkin_tasks": conn.execute(
+            "SELECT checkin_task_name, description, created_at FROM checkin_tasks "
+            "ORDER BY 1"
+        ).fetchall(),
+        "focus_daily": conn.execute(
+            "SELECT * FROM focus_daily ORDER BY 1, 2"
+        ).fetchall(),
+        "stats": conn.execute(
+            f"SELECT ct.checkin_task_name, {', '.join(db.CHECKIN_STATS_FIELDS)} "
+            "FROM checkin_task_stats JOIN checkin_tasks ct USING (checkin_task_id) "
+            "ORDER BY 1"
+        ).fetchall(),
+    }
+
+
+def _origins():
+    conn = db.connect_db()
+    return {
+        table: dict(
+            conn.execute(f"SELECT origin, count(*) FROM {table} GROUP BY origin")
+        )
+        for table in ("tasks", "checkin_records")
+    }
+
+
+def test_two_databases_converge(database, tmp_path):
+    folder = str(tmp_path / "sync")
+    os.makedirs(folder)
+    a, b = tmp_path / "a.db", tmp_path / "b.db"
+
+    _use(a)
+    _session("Read", "2025-03-03T09:00:00", 25)
+    _session("Write", "2025-03-04T09:00:00", 30)
+    _checkin("Exercised as planned", "2025-03-03T20:00:00", 0, "tired")
+    db.create_checkin_task("Stretch")
+    device_a = sync.get_device()[0]
+    # B, offline, logs some of the same things differently.
+    _use(b)
+    _session("Write", "2025-03-04T09:00:00", 45, distractions=1)
+    _session("Code", "2025-03-05T09:00:00", 50)
+    _checkin("Exercised as planned", "2025-03-03T20:00:00", 1)
+    db.create_checkin_task("Stretch", "five minutes")
+    device_b = sync.get_device()[0]
+
+    _use(a)
+    first = sync.sync(folder)
+    assert first.pushed == {"checkin_tasks": 9, "sessions": 2, "checkins": 1}
+    _use(b)
+    report = sync.sync(folder)
+    assert report.pulled == {device_a: 1}
+    # A created the seeded check-in tasks first; "Stretch" keeps B's
+    # description; B's longer "Write" session stays as it is.
+    assert report.merged == {"checkin_tasks": 9, "checkins": 1}
+    assert report.skipped == {"sessions": 1}
+    # Only B's own rows go out; A's are marked with their origin.
+    assert report.pushed == {"checkin_tasks": 9, "sessions": 2, "checkins": 1}
+    assert _origins()["tasks"] == {None: 2, device_a: 1}
+    _use(a)
+    assert sync.sync(folder).pulled == {device_b: 1}
+    _use(b)
+    # A merged the same way B did, so nothing new went out: the marks hold.
+    again = sync.sync(folder)
+    assert (again.pulled, again.segment) == ({}, None)
+
+    _use(a)
+    merged = _snapshot()
+    assert [s for s in merged["sessions"] if s[0] == "Write"] == [
+        ("Write", "2025-03-04T09:00:00", "2025-03-04T09:45:00", 45.0, 1)
+    ]
+    assert merged["checkins"] == [
+        ("Exercised as planned", "2025-03-03T20:00:00", 1, "tired")
+    ]
+    assert ("Stretch", "five minutes") in [t[:2] for t in merged["checkin_tasks"]]
+    _use(b)
+    assert _snapshot() == merged
+    assert db.rebuild_checkin_stats(verify_only=True) == {}
+
+    # Both edit the same day again and sync in the other order.
+    _session("Read", "2025-03-06T09:00:00", 20)
+    _checkin("Processed emails", "2025-03-06T18:00:00", 0, "inbox zero tomorrow")
+    _use(a)
+    _session("Read", "2025-03-06T09:00:00", 20, distractions=3)
+    _checkin("Processed emails", "2025-03-06T18:00:00", 1, "done")
+    _checkin("Processed emails", "2025-03-05T18:00:00", 1)  # back-dated
+    _use(b)
+    sync.sync(folder)
+    _use(a)
+    sync.sync(folder)
+    _use(b)
+    sync.sync(folder)
+    merged = _snapshot()
+    _use(a)
+    assert _snapshot() == merged
+    assert db.rebuild_checkin_stats(verify_only=True) == {}
+    assert ("Read", "2025-03-06T09:00:00", "2025-03-06T09:20:00", 20.0, 3) in (
+        merged["sessions"]
+    )
+    assert (
+        "Processed emails",
+        "2025-03-06T18:00:00",
+        1,
+        "inbox zero tomorrow",
+    ) in merged["checkins"]
+    emails = [s for s in merged["stats"] if s[0] == "Processed emails"]
+    assert emails == [
+        ("Processed emails", 2, 2, "2025-03-06T18:00:00", "2025-03-06", 2, 2)
+    ]
+
+
+def test_archived_rows_from_another_device_are_not_pushed_back(database, tmp_path):
+    folder = str(tmp_path / "sync")
+    os.makedirs(folder)
+    a, b = tmp_path / "a.db", tmp_path / "b.db"
+    _use(a)
+    _session("Read", "2025-01-10T09:00:00", 25)
+    _checkin("Exercised as planned", "2025-01-10T20:00:00", 1)
+    device_a = sync.get_device()[0]
+    sync.push(folder)
+
+    _use(b)
+    sync.pull(folder)
+    _session("Write", "2025-01-11T09:00:00", 30)  # B's own, archived too
+    conn = db.connect_db()
+    archive.archive_old_data(conn, 30, today=date(2025, 6, 15))
+    [(_, path)] = archive.find_segments(conn, "sessions")
+    assert set(archive.segment_origins(path).values()) == {device_a}
+
+    report = sync.push(folder)
+    assert report.pushed["sessions"] == 1
+    assert report.pushed["checkins"] == 0
+    pushed = list(sync._read_segment(os.path.join(folder, report.segment)))
+    assert [line[1] for line in pushed if line[0] == "session"] == ["Write"]
+
+    # A row pulled into an archived month and archived again keeps its origin.
+    _use(a)
+    _session("Read", "2025-01-20T09:00:00", 15)
+    sync.push(folder)
+    _use(b)
+    assert sync.pull(folder).inserted == {"sessions": 1}
+    archive.archive_old_data(conn, 30, today=date(2025, 6, 15))
+    [(_, path)] = archive.find_segments(conn, "sessions")
+    assert sorted(archive.segment_origins(path).values()) == [device_a, device_a]
+    assert sync.push(folder).segment is None
+
+    _use(a)
+    assert sync.pull(folder).inserted == {"sessions": 1}
+    assert sorted(s[:2] for s in _snapshot()["sessions"]) == [
+        ("Read", "2025-01-10T09:00:00"),
+        ("Read", "2025-01-20T09:00:00"),
+        ("Write", "2025-01-11T09:00:00"),
+    ]
@@ -0,0 +1,116 @@
+import pytest
+
+from apologies_for_being_human.timer import SessionTimer, reminder_timings
+
+
+class FakeClock:
+    """A clock that only moves when the timer sleeps or a test advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_timer(duration, offsets=(), refresh_hz=1):
+    clock = FakeClock()
+    timer = SessionTimer(duration, offsets, refresh_hz, clock=clock, sleep=clock.sleep)
+    return timer, clock
+
+
+def test_no_drift_when_rendering_takes_time():
+    timer, clock = make_timer(100)
+    ticks = []
+    for tick in timer.ticks():
+        ticks.append(tick)
+        clock.now += 0.3  # render cost of every frame
+    assert [t.elapsed for t in ticks[:-1]] == pytest.approx(range(100))
+    assert ticks[-1].finished and ticks[-1].elapsed == 100
+    # The session ends on time, not 100 * 0.3 seconds late.
+    assert clock.now - 1000.0 == pytest.approx(100.3)
+
+
+def test_frames_after_a_clock_jump_are_skipped_not_replayed():
+    timer, clock = make_timer(100)
+    elapsed = []
+    for tick in timer.ticks():
+        elapsed.append(tick.elapsed)
+        if tick.elapsed == 5:
+            clock.now += 30.5  # suspended machine
+    assert elapsed[:7] == pytest.approx([0, 1, 2, 3, 4, 5, 35.5])
+    assert elapsed[7] == pytest.approx(36)
+    assert not any(5 < e < 35.5 for e in elapsed)
+    # 0..5, the late frame at 35.5, 36..99 and the final tick.
+    assert len(elapsed) == 6 + 1 + 64 + 1
+
+
+def test_reminders_fire_at_their_exact_offsets():
+    timer, _ = make_timer(10, offsets=(2.5, 7.25))
+    fired = [(t.elapsed, t.reminder) for t in timer.ticks() if t.reminder is not None]
+    assert fired == [(2.5, 0), (7.25, 1)]
+
+
+def test_stale_reminders_are_skipped():
+    timer, clock = make_timer(100, offsets=(10, 20, 30, 60))
+    fired = []
+    for tick in timer.ticks():
+        if tick.reminder is not None:
+            fired.append((tick.elapsed, tick.reminder))
+        if tick.elapsed == 5:
+            clock.now += 30  # passes the reminders at 10, 20 and 30
+    assert fired == [(35, 2), (60, 3)]
+
+
+def test_due_returns_only_the_latest_passed_reminder():
+    timer, _ = make_timer(100, offsets=(10, 20, 30))
+    assert timer._due(5) is None
+    assert timer._due(25) == 1
+    assert timer.next_reminder_index == 2
+    assert timer._due(25) is None
+    assert timer._due(100) == 2
+
+
+def test_resume_starts_from_the_elapsed_time():
+    timer, _ = make_timer(10)
+    timer.start(already_elapsed=8)
+    assert [t.elapsed for t in timer.ticks()] == pytest.approx([8, 9, 10])
+
+
+@pytest.mark.parametrize(
+    ("duration", "offsets"),
+    [
+        (60, [30]),
+        (120, [60]),
+        (250, [250 / 3, 500 / 3]),
+        (600, [100, 200, 300, 400, 500]),
+    ],
+)
+def test_reminder_timings(duration, offsets):
+    assert reminder_timings(duration) == pytest.approx(offsets)
+
+
+def test_refresh_hz_must_be_positive():
+    with pytest.raises(ValueError):
+        SessionTimer(10, refresh_hz=0)
+
+
+@pytest.mark.parametrize("value", ["abc", "0", "-2", "nan"])
+def test_bad_refresh_hz_env_falls_back(monkeypatch, capsys, value):
+    from apologies_for_being_human import timer
+
+    monkeypatch.setenv("APOLOGIES_REFRESH_HZ", value)
+    assert timer._refresh_hz_from_env() == 1.0
+    assert "APOLOGIES_REFRESH_HZ" in capsys.readouterr().err
+
+
+def test_refresh_hz_env(monkeypatch):
+    from apologies_for_being_human import timer
+
+    monkeypatch.setenv("APOLOGIES_REFRESH_HZ", "4")
+    assert timer._refresh_hz_from_env() == 4.0